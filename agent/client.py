@@ -0,0 +1,68 @@
+import json
+
+import requests
+
+from config.settings import Settings
+
+
+class IncompleteStreamError(RuntimeError):
+    """The answer stream ended without its final event (service restart, proxy timeout, ...)."""
+
+
+class AgentClient:
+    """
+    Thin client for agent.service (used by main_streamlit.py and main.py --rag).
+    One requests.Session per client keeps the HTTP connection to the service alive.
+    """
+
+    def __init__(self, base_url: str = None, timeout: float = None):
+        settings = Settings()
+        self.base_url = (base_url or settings.AGENT_SERVICE_URL).rstrip("/")
+        self.timeout = timeout or settings.AGENT_SERVICE_TIMEOUT
+        self.session = requests.Session()
+
+    def health(self) -> dict:
+        response = self.session.get(f"{self.base_url}/health", timeout=5)
+        response.raise_for_status()
+        return response.json()
+
+    def chat(self, messages: list) -> dict:
+        """
+        :param messages: Chat history [{"role": "user" | "assistant", "content"}], ending with the question
+        :return: {"answer", "documents", "intent"}
+        """
+        response = self.session.post(f"{self.base_url}/chat", json={"messages": messages}, timeout=self.timeout)
+        response.raise_for_status()
+        return response.json()
+
+    def stream(self, messages: list):
+        """
+        Streaming variant of chat().
+        Yields ("token", text) while the answer is generated, then ("final", result).
+        :raises IncompleteStreamError: If the stream ends before the final event; callers
+            can fall back to the tokens received so far
+        """
+        with self.session.post(f"{self.base_url}/chat", json={"messages": messages, "stream": True},
+                               stream=True, timeout=self.timeout) as response:
+            response.raise_for_status()
+            try:
+                for line in response.iter_lines():
+                    if not line:
+                        continue
+                    event = json.loads(line)
+                    kind = event.pop("type")
+                    if kind == "token":
+                        yield "token", event["text"]
+                    elif kind == "final":
+                        yield "final", event
+                        return
+                    elif kind == "error":
+                        raise RuntimeError(event["error"])
+            except (requests.exceptions.ChunkedEncodingError, requests.exceptions.ConnectionError) as e:
+                raise IncompleteStreamError(f"The agent service connection broke mid-answer ({e})") from e
+        raise IncompleteStreamError("The agent service closed the stream before the answer was complete")
+
+    def graph_png(self) -> bytes:
+        response = self.session.get(f"{self.base_url}/graph.png", timeout=self.timeout)
+        response.raise_for_status()
+        return response.content
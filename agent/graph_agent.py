@@ -1,26 +1,56 @@
+import asyncio
 import operator
 import json
 from typing import Annotated, Sequence, TypedDict, Literal
 
+from langgraph.config import get_stream_writer
 from langgraph.graph import END, StateGraph
 from langgraph.prebuilt import ToolNode
 from langchain_core.messages import BaseMessage, HumanMessage, AIMessage, ToolMessage
+from langchain_core.runnables import RunnableLambda
+from langchain_core.tools import StructuredTool
 
 from config.settings import Settings
+from rag.context_builder import ContextBuilder, TokenCounter
 from rag.gemini_api import GeminiLLMAPI
-from rag.retriever import Retriever
+from rag.llm_cache import LLMResponseCache, CachedLLMAPI
+from rag.reranker import create_reranker
+from rag.retriever import Retriever, reciprocal_rank_fusion
+from agent.intent_classifier import allm_intent, default_classifier, keyword_intent, llm_intent
+from agent.speculation import SpeculativeRetrieval
 from core.schemas import AgentState
+from utils.lazy import Lazy
 
 
 # 2. Define the tools
-retriever = Retriever()
+# Clients are built on first use and then shared, so importing this module (e.g. in
+# agent.service before it binds its port) opens no connections.
+retriever = Lazy(Retriever)
 
 def retrieve_articles_tool(query: str, filters: dict = None) -> str:
     """
     Tool to retrieve relevant legal articles.
     Accepts a JSON string representing a list of queries (Multi-Query).
-    Returns a JSON string of deduplicated results.
+    All queries are embedded in one batch and searched concurrently; the result
+    lists are merged with Reciprocal Rank Fusion.
+    Returns a JSON string of fused, deduplicated results.
     """
+    queries = _parse_tool_queries(query)
+    # Already retrieved if the router speculated on this question
+    results = speculation.get().take_results(queries) if speculation else None
+    if results is None:
+        results = retriever.get().query_many(queries, top_k=3) # Reduce k per query to avoid noise
+    return _fuse_tool_results(results)
+
+async def aretrieve_articles_tool(query: str, filters: dict = None) -> str:
+    """Async variant of retrieve_articles_tool (used by app.ainvoke)."""
+    queries = _parse_tool_queries(query)
+    results = speculation.get().take_results(queries) if speculation else None
+    if results is None:
+        results = await retriever.get().aquery_many(queries, top_k=3)
+    return _fuse_tool_results(results)
+
+def _parse_tool_queries(query: str) -> list:
     print(f"--- Calling Retriever Tool ---")
     try:
         queries = json.loads(query)
@@ -29,78 +59,108 @@ def retrieve_articles_tool(query: str, filters: dict = None) -> str:
     except:
         queries = [query]
         
-    all_results = {}
-    
     for q in queries:
         print(f"  > Searching for: {q}")
-        results = retriever.query(query_text=q, top_k=3) # Reduce k per query to avoid noise
-        for doc in results:
-            # Use link or content hash as unique key
-            doc_id = doc.get('metadata', {}).get('link', doc.get('id'))
-            if doc_id and doc_id not in all_results:
-                all_results[doc_id] = doc
-            else:
-                # Optional: Reciprocal Rank Fusion could go here.
-                # For now, we just keep the first occurrence (highest score usually).
-                pass
-                
-    final_results = list(all_results.values())
+    return queries
+
+def _fuse_tool_results(results: list) -> str:
+    # Documents found by several query variants rise to the top
+    final_results = reciprocal_rank_fusion(results)
     print(f"  > Total unique documents found: {len(final_results)}")
+    print(f"  > Query cache: {retriever.get().query_cache.report()}")
+    if speculation:
+        print(f"  > Speculation: {speculation.get().report()}")
     return json.dumps(final_results)
 
 # 3. Create the LLM
 settings = Settings()
-llm = GeminiLLMAPI(api_key=settings.GOOGLE_API_KEY, model=settings.DEFAULT_LLM_MODEL)
+llm = Lazy(lambda: GeminiLLMAPI(api_key=settings.GOOGLE_API_KEY, model=settings.DEFAULT_LLM_MODEL))
+# Nodes whose prompt fully determines the answer (router, query expansion, reranker)
+# opt into the persistent response cache; generation always calls the model.
+llm_cache = Lazy(lambda: LLMResponseCache(settings.LLM_CACHE_FILE, settings.LLM_CACHE_TTL, settings.LLM_CACHE_MAX_ENTRIES))
+cached_llm = Lazy(lambda: CachedLLMAPI(llm.get(), llm_cache.get()))
+token_counter = Lazy(lambda: TokenCounter(settings.TOKENIZER_ENCODING))
+reranker = Lazy(lambda: create_reranker(settings, cached_llm.get(), token_counter.get()))
+context_builder = Lazy(lambda: ContextBuilder(settings.CONTEXT_MAX_TOKENS, token_counter.get()))
+# Opt-in: query expansion + retrieval overlap the router's LLM call
+speculation = Lazy(lambda: SpeculativeRetrieval(retriever.get(), _expand, _aexpand, top_k=3,
+                                                workers=settings.RETRIEVAL_WORKERS)) if settings.SPECULATIVE_RETRIEVAL else None
+
+def warm_up():
+    """Builds all clients (and trains the intent classifier) now instead of on the first request (used by agent.service)."""
+    for component in (retriever, llm, llm_cache, cached_llm, token_counter, reranker, context_builder, speculation):
+        if component is not None:
+            component.get()
+    default_classifier()
+
+def is_warm() -> bool:
+    return retriever.loaded and llm.loaded
 
 # 4. Define the nodes
 
 def router_node(state: AgentState):
     """
-    Classifies the user's intent using a Hybrid Strategy (Keywords + LLM).
+    Classifies the user's intent using a Hybrid Strategy (Keywords + local classifier + LLM).
+    The LLM is only consulted when the local classifier is not confident.
     Bias: High Recall for legal queries (Safety First).
+    With SPECULATIVE_RETRIEVAL, query expansion and retrieval run while the LLM decides.
     """
     print("--- Router Node ---")
-    messages = state['messages']
-    last_message = messages[-1]
-    content = last_message.content.lower()
-    
+    content = state['messages'][-1].content
+    result = _statute_intent(content) or _local_intent(content)
+    if result:
+        return result
+
+    # 3. LLM Check (Conservative Classification)
+    if speculation:
+        speculation.get().start(content)
+    intent = llm_intent(cached_llm.get(), content)
+    print(f"--- Intent Detected: {intent} (LLM Decision) ---")
+    if speculation and intent != "legal_query":
+        speculation.get().discard(content)
+    return {"intent": intent}
+
+async def arouter_node(state: AgentState):
+    """Async variant of router_node."""
+    print("--- Router Node ---")
+    content = state['messages'][-1].content
+    # Off the event loop: the statute lookup queries SQLite (and may reopen the indexes),
+    # and the first classification trains the classifier unless warm_up() ran
+    result = await asyncio.to_thread(lambda: _statute_intent(content) or _local_intent(content))
+    if result:
+        return result
+
+    if speculation:
+        speculation.get().astart(content)
+    intent = await allm_intent(cached_llm.get(), content)
+    print(f"--- Intent Detected: {intent} (LLM Decision) ---")
+    if speculation and intent != "legal_query":
+        speculation.get().discard(content)
+    return {"intent": intent}
+
+def _statute_intent(content: str):
+    # 0. Fast Path: plain statute references ("What is BGB § 2247?") are resolved
+    # from the local section index and go straight to generation.
+    documents = retriever.get().statute_lookup(content)
+    if documents:
+        print(f"--- Intent Detected: statute_lookup ({len(documents)} cited sections) ---")
+        return {"intent": "statute_lookup", "documents": documents}
+    return None
+
+def _local_intent(content: str):
+    """Keyword and classifier steps (no LLM call). :return: State update, or None if undecided"""
     # 1. Hard Rule: Keyword Guardrails
     # If these exist, we force a search to avoid LLM missing obvious legal references.
-    legal_keywords = [
-        "§", "bgb", "law", "legal", "contract", "agreement", "sue", "court", 
-        "judge", "lawyer", "attorney", "recht", "gesetz", "vertrag", "anwalt",
-        "paragraf", "article", "regulation", "statute", "rule", "complaint"
-    ]
-    
-    if any(k in content for k in legal_keywords):
+    if keyword_intent(content):
         print("--- Intent Detected: legal_query (Keyword Trigger) ---")
         return {"intent": "legal_query"}
-    
-    # 2. LLM Check (Conservative Classification)
-    prompt = (
-        f"You are a sophisticated intent classifier for a legal assistant.\n"
-        f"Classify the User Query into 'legal_query' or 'general_chat'.\n\n"
-        f"**Guidelines:**\n"
-        f"- **legal_query**: ANY question about rights, obligations, rules, regulations, crimes, debts, family issues, work disputes, or definitions of terms. \n"
-        f"  *CRITICAL*: If you are unsure, or if the query vaguely touches on a real-world conflict (e.g., 'neighbor issue', 'broken item'), classify as 'legal_query'. **Err on the side of searching.**\n"
-        f"- **general_chat**: Pure greetings ('hi', 'hello'), thanks, or questions about completely non-legal topics (e.g., 'weather', 'recipe', 'poem').\n\n"
-        f"User Query: {last_message.content}\n\n"
-        f"Output ONLY the category name."
-    )
-    
-    try:
-        intent = llm.generate_response(prompt).strip().lower()
-        # Clean up response
-        if "legal" in intent:
-            intent = "legal_query"
-        else:
-            intent = "general_chat"
-    except:
-        # Failsafe: If LLM fails, assume it's a query to be safe
-        intent = "legal_query" 
-        
-    print(f"--- Intent Detected: {intent} (LLM Decision) ---")
-    return {"intent": intent}
+
+    # 2. Local Classifier (char n-gram model, microseconds)
+    intent, confidence = default_classifier().classify(content)
+    if confidence >= settings.INTENT_CONFIDENCE:
+        print(f"--- Intent Detected: {intent} (Local Classifier, {confidence:.2f}) ---")
+        return {"intent": intent}
+    return None
 
 def tool_decision_node(state: AgentState):
     """
@@ -108,13 +168,37 @@ def tool_decision_node(state: AgentState):
     Uses Chain-of-Thought (COT) and Multi-Query Expansion.
     """
     print("--- Tool Decision Node (Query Expansion) ---")
-    messages = state['messages']
-    last_message = messages[-1]
-    
+    question = state['messages'][-1].content
+    # Already expanded (and retrieved) if the router speculated on this question
+    queries = speculation.get().take(question) if speculation else None
+    return _tool_call(queries or _expand(question))
+
+async def atool_decision_node(state: AgentState):
+    """Async variant of tool_decision_node."""
+    print("--- Tool Decision Node (Query Expansion) ---")
+    question = state['messages'][-1].content
+    queries = await speculation.get().atake(question) if speculation else None
+    return _tool_call(queries or await _aexpand(question))
+
+def _expand(question: str) -> list:
+    try:
+        return _parse_expansion(cached_llm.get().generate_response(_expansion_prompt(question)))
+    except Exception as e:
+        print(f"!! Query Expansion Failed: {e}. Fallback to original query.")
+        return [question]
+
+async def _aexpand(question: str) -> list:
+    try:
+        return _parse_expansion(await cached_llm.get().agenerate_response(_expansion_prompt(question)))
+    except Exception as e:
+        print(f"!! Query Expansion Failed: {e}. Fallback to original query.")
+        return [question]
+
+def _expansion_prompt(question: str) -> str:
     # COT + Multi-Query Prompt
-    prompt = (
+    return (
         f"You are an expert German legal researcher. Your goal is to retrieve the most relevant sections from the BGB (German Civil Code) for the user's query.\n"
-        f"User Query: {last_message.content}\n\n"
+        f"User Query: {question}\n\n"
         f"**Task:**\n"
         f"1. **Analyze**: Briefly think step-by-step about the legal concepts. **Crucial**: If the user uses English legal terms (e.g., 'Holographic Will', 'Tort', 'Damages'), you MUST translate them to their precise German equivalents (e.g., 'Eigenhändiges Testament', 'Unerlaubte Handlung', 'Schadensersatz') for the search.\n"
         f"2. **Generate Queries**: Create 3 distinct search queries in **German**.\n"
@@ -125,22 +209,21 @@ def tool_decision_node(state: AgentState):
         f"Provide ONLY a JSON list of strings. Do not output the analysis text, just the JSON.\n"
         f"Example: [\"Query 1\", \"Query 2\", \"Query 3\"]"
     )
-    
-    try:
-        response = llm.generate_response(prompt).strip()
-        # Clean up potential markdown code blocks
-        if "```json" in response:
-            response = response.split("```json")[1].split("```")[0]
-        elif "```" in response:
-            response = response.split("```")[1].split("```")[0]
-            
-        queries = json.loads(response)
-        if not isinstance(queries, list):
-            raise ValueError("Output is not a list")
-    except Exception as e:
-        print(f"!! Query Expansion Failed: {e}. Fallback to original query.")
-        queries = [last_message.content]
 
+def _parse_expansion(response: str) -> list:
+    response = response.strip()
+    # Clean up potential markdown code blocks
+    if "```json" in response:
+        response = response.split("```json")[1].split("```")[0]
+    elif "```" in response:
+        response = response.split("```")[1].split("```")[0]
+        
+    queries = json.loads(response)
+    if not isinstance(queries, list):
+        raise ValueError("Output is not a list")
+    return queries
+
+def _tool_call(queries: list) -> dict:
     print(f"--- Generated Queries: {queries} ---")
 
     # Pass the list of queries as a JSON string to the tool
@@ -157,9 +240,32 @@ def reranker_node(state: AgentState):
     """
     Evaluates retrieved documents and filters out irrelevant ones.
     Ensures high-quality context for the generator.
+    The scoring backend is selected by settings.RERANKER (local features by default, LLM judge optional).
     """
     print("--- Reranker Node ---")
-    messages = state['messages']
+    docs, original_question, queries = _rerank_inputs(state['messages'])
+    if not docs:
+        print("--- No documents to rerank ---")
+        return {"documents": []}
+
+    filtered_docs = reranker.get().rerank(original_question, docs, queries)
+    print(f"--- Reranker ({settings.RERANKER}): Kept {len(filtered_docs)} out of {len(docs)} documents ---")
+    return {"documents": filtered_docs}
+
+async def areranker_node(state: AgentState):
+    """Async variant of reranker_node."""
+    print("--- Reranker Node ---")
+    docs, original_question, queries = _rerank_inputs(state['messages'])
+    if not docs:
+        print("--- No documents to rerank ---")
+        return {"documents": []}
+
+    filtered_docs = await reranker.get().arerank(original_question, docs, queries)
+    print(f"--- Reranker ({settings.RERANKER}): Kept {len(filtered_docs)} out of {len(docs)} documents ---")
+    return {"documents": filtered_docs}
+
+def _rerank_inputs(messages: list) -> tuple:
+    """:return: (retrieved docs from the tool messages, original question, search queries)"""
     # Find tool messages to extract docs
     tool_messages = [msg for msg in messages if isinstance(msg, ToolMessage)]
     
@@ -171,48 +277,65 @@ def reranker_node(state: AgentState):
                 docs.extend(d)
         except:
             pass
-            
-    if not docs:
-        print("--- No documents to rerank ---")
-        return {"documents": []}
 
     original_question = next(msg.content for msg in reversed(messages) if isinstance(msg, HumanMessage))
-    
-    # Prompt for LLM-based Reranking/Filtering
-    doc_previews = "\n".join([f"ID: {i} | Title: {d['metadata'].get('section_title')} | Content: {d['metadata'].get('content')[:200]}..." for i, d in enumerate(docs)])
-    
-    prompt = (
-        f"You are a legal expert judge. Your task is to evaluate the relevance of the following retrieved BGB sections to the user's question.\n\n"
-        f"**User Question:** {original_question}\n\n"
-        f"**Retrieved Documents:**\n{doc_previews}\n\n"
-        f"**Task:**\n"
-        f"1. For each document ID, determine if it is 'RELEVANT' or 'IRRELEVANT' to answering the question.\n"
-        f"2. Keep only documents that provide useful legal rules, definitions, or context for this specific case.\n\n"
-        f"**Output Format:**\n"
-        f"Provide a JSON list of IDs that are RELEVANT. Example: [0, 2]\n"
-        f"Output ONLY the JSON list."
-    )
-    
-    try:
-        response = llm.generate_response(prompt).strip()
-        # Clean JSON
-        if "[" in response and "]" in response:
-            response = "[" + response.split("[")[1].split("]")[0] + "]"
-        
-        relevant_ids = json.loads(response)
-        filtered_docs = [docs[i] for i in relevant_ids if i < len(docs)]
-        print(f"--- Reranker: Kept {len(filtered_docs)} out of {len(docs)} documents ---")
-        return {"documents": filtered_docs}
-    except Exception as e:
-        print(f"!! Reranker failed: {e}. Keeping all docs.")
-        return {"documents": docs}
+    # The German search queries from tool_decision_node help match German sections
+    # when the question itself is asked in another language
+    queries = []
+    for msg in messages:
+        for call in getattr(msg, "tool_calls", None) or []:
+            try:
+                queries.extend(json.loads(call["args"]["query"]))
+            except:
+                pass
+    return docs, original_question, queries
 
 def generation_node(state: AgentState):
     """
     Generates a final answer. 
     Uses the filtered documents from the 'documents' state field.
+    The answer is streamed token by token (see stream_agent).
     """
     print("--- Generation Node ---")
+    prompt = _generation_prompt(state)
+    writer = _stream_writer()
+    try:
+        chunks = []
+        for chunk in llm.get().stream_response(prompt):
+            chunks.append(chunk)
+            writer({"token": chunk})
+        return {"messages": [AIMessage(content="".join(chunks))]}
+    except Exception as e:
+        error_msg = f"Error generating response: {str(e)}"
+        print(f"!! {error_msg}")
+        return {"messages": [AIMessage(content="System Error: Rate limit or API issue.")]}
+
+async def ageneration_node(state: AgentState):
+    """Async variant of generation_node."""
+    print("--- Generation Node ---")
+    prompt = _generation_prompt(state)
+    writer = _stream_writer()
+    try:
+        chunks = []
+        async for chunk in llm.get().astream_response(prompt):
+            chunks.append(chunk)
+            writer({"token": chunk})
+        return {"messages": [AIMessage(content="".join(chunks))]}
+    except Exception as e:
+        error_msg = f"Error generating response: {str(e)}"
+        print(f"!! {error_msg}")
+        return {"messages": [AIMessage(content="System Error: Rate limit or API issue.")]}
+
+def _stream_writer():
+    # Tokens are pushed to app.stream(..., stream_mode="custom") consumers as they arrive;
+    # invoke() callers still receive the complete message in the state.
+    try:
+        return get_stream_writer()
+    except RuntimeError:
+        # Called outside the graph
+        return lambda chunk: None
+
+def _generation_prompt(state: AgentState) -> str:
     messages = state['messages']
     intent = state.get('intent', 'general_chat')
     
@@ -223,13 +346,13 @@ def generation_node(state: AgentState):
     # Construct Prompt
     original_question = next(msg.content for msg in reversed(messages) if isinstance(msg, HumanMessage))
     
-    if intent == "legal_query":
+    if intent in ("legal_query", "statute_lookup"):
         if not new_documents:
             document_str = "No specific legal documents found."
         else:
-            document_str = "\n\n".join(
-                [f"Citation: {doc['metadata'].get('link', 'N/A')}\nContent: {doc['metadata'].get('content', 'N/A')}" for doc in new_documents]
-            )
+            # Highest-scoring sections first, deduplicated, within CONTEXT_MAX_TOKENS
+            document_str, report = context_builder.get().build(new_documents)
+            print(f"--- Context: {context_builder.get().report(report)} ---")
 
         prompt = (
             f"You are a legal assistant. Answer based *only* on the provided documents.\n\n"
@@ -257,31 +380,29 @@ def generation_node(state: AgentState):
             f"**Response:**"
         )
 
-    try:
-        response_text = llm.generate_response(prompt)
-        return {"messages": [AIMessage(content=response_text)]}
-    except Exception as e:
-        error_msg = f"Error generating response: {str(e)}"
-        print(f"!! {error_msg}")
-        return {"messages": [AIMessage(content="System Error: Rate limit or API issue.")]}
+    print(f"--- Prompt: {token_counter.get().count(prompt)} tokens ---")
+    return prompt
 
 # 5. Define Conditional Logic
 def route_step(state: AgentState) -> Literal["tools", "generator"]:
+    # statute_lookup already carries the cited sections and skips retrieval
     if state["intent"] == "legal_query":
         return "tools"
     return "generator"
 
 # 6. Create the graph
-tool_node = ToolNode([retrieve_articles_tool])
+# Each node has a sync and an async implementation: app.invoke / app.stream run the
+# former, app.ainvoke / app.astream the latter (no thread per request)
+tool_node = ToolNode([StructuredTool.from_function(func=retrieve_articles_tool, coroutine=aretrieve_articles_tool)])
 
 workflow = StateGraph(AgentState)
 
 # Nodes
-workflow.add_node("router", router_node)
-workflow.add_node("tool_decision", tool_decision_node)
+workflow.add_node("router", RunnableLambda(router_node, afunc=arouter_node))
+workflow.add_node("tool_decision", RunnableLambda(tool_decision_node, afunc=atool_decision_node))
 workflow.add_node("tool_execution", tool_node)
-workflow.add_node("reranker", reranker_node)
-workflow.add_node("generator", generation_node)
+workflow.add_node("reranker", RunnableLambda(reranker_node, afunc=areranker_node))
+workflow.add_node("generator", RunnableLambda(generation_node, afunc=ageneration_node))
 
 # Edges
 workflow.set_entry_point("router")
@@ -306,13 +427,25 @@ app = workflow.compile()
 
 def run_agent(question: str) -> dict:
     """Helper for BDD tests"""
-    initial_state = {
+    return _agent_result(app.invoke(_initial_state(question)))
+
+async def arun_agent(question: str) -> dict:
+    """
+    Async counterpart of run_agent (app.ainvoke): all LLM, embedding and retrieval
+    I/O is awaited, so one event loop can serve many concurrent chats.
+    Call warm_up() (in a thread) first to keep client setup and classifier training
+    out of the first request's latency, as agent.service does.
+    """
+    return _agent_result(await app.ainvoke(_initial_state(question)))
+
+def _initial_state(question: str) -> dict:
+    return {
         "messages": [HumanMessage(content=question)],
         "documents": [],
         "intent": ""
     }
-    final_state = app.invoke(initial_state)
-    
+
+def _agent_result(final_state: dict) -> dict:
     retrieved_docs = []
     for msg in final_state['messages']:
         if isinstance(msg, ToolMessage):
@@ -322,12 +455,28 @@ def run_agent(question: str) -> dict:
                     retrieved_docs.extend(docs)
             except:
                 pass
+    if not retrieved_docs:
+        # Statute lookup fast path: documents come from the router, not the tool
+        retrieved_docs = final_state.get('documents', [])
                 
     return {
         "answer": final_state['messages'][-1].content,
         "documents": retrieved_docs
     }
 
+def stream_agent(question: str):
+    """
+    Streaming counterpart of run_agent.
+    Yields ("token", text) while the answer is generated, then ("final", final_state).
+    """
+    final_state = None
+    for mode, chunk in app.stream(_initial_state(question), stream_mode=["custom", "values"]):
+        if mode == "custom" and "token" in chunk:
+            yield "token", chunk["token"]
+        elif mode == "values":
+            final_state = chunk
+    yield "final", final_state
+
 def main():
     print("Agentic RAG system starting...")
     res = run_agent("Hello, who are you?")
@@ -0,0 +1,146 @@
+import json
+import os
+import threading
+import zlib
+
+import numpy as np
+
+TRAIN_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "intent_train.jsonl")
+INTENTS = ("general_chat", "legal_query")
+
+# Hard rule used by router_node before any model: these force a search
+LEGAL_KEYWORDS = [
+    "§", "bgb", "law", "legal", "contract", "agreement", "sue", "court",
+    "judge", "lawyer", "attorney", "recht", "gesetz", "vertrag", "anwalt",
+    "paragraf", "article", "regulation", "statute", "rule", "complaint"
+]
+
+
+def keyword_intent(text: str):
+    """:return: "legal_query" if a legal keyword occurs, else None (undecided)"""
+    content = text.lower()
+    if any(k in content for k in LEGAL_KEYWORDS):
+        return "legal_query"
+    return None
+
+
+def llm_intent_prompt(text: str) -> str:
+    """Conservative classification prompt for the router's LLM fallback."""
+    return (
+        f"You are a sophisticated intent classifier for a legal assistant.\n"
+        f"Classify the User Query into 'legal_query' or 'general_chat'.\n\n"
+        f"**Guidelines:**\n"
+        f"- **legal_query**: ANY question about rights, obligations, rules, regulations, crimes, debts, family issues, work disputes, or definitions of terms. \n"
+        f"  *CRITICAL*: If you are unsure, or if the query vaguely touches on a real-world conflict (e.g., 'neighbor issue', 'broken item'), classify as 'legal_query'. **Err on the side of searching.**\n"
+        f"- **general_chat**: Pure greetings ('hi', 'hello'), thanks, or questions about completely non-legal topics (e.g., 'weather', 'recipe', 'poem').\n\n"
+        f"User Query: {text}\n\n"
+        f"Output ONLY the category name."
+    )
+
+
+def parse_llm_intent(response: str) -> str:
+    # Clean up response
+    if "legal" in response.strip().lower():
+        return "legal_query"
+    return "general_chat"
+
+
+def llm_intent(llm, text: str) -> str:
+    """
+    Conservative LLM classification (the router's fallback).
+    :return: "legal_query" or "general_chat"; "legal_query" if the call fails
+    """
+    try:
+        return parse_llm_intent(llm.generate_response(llm_intent_prompt(text)))
+    except:
+        # Failsafe: If LLM fails, assume it's a query to be safe
+        return "legal_query"
+
+
+async def allm_intent(llm, text: str) -> str:
+    """Async variant of llm_intent."""
+    try:
+        return parse_llm_intent(await llm.agenerate_response(llm_intent_prompt(text)))
+    except:
+        return "legal_query"
+
+
+def load_examples(path: str) -> tuple:
+    """Reads a labelled JSONL file ({"text", "intent"} per line)."""
+    texts, labels = [], []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                example = json.loads(line)
+                texts.append(example["text"])
+                labels.append(example["intent"])
+    return texts, labels
+
+
+class IntentClassifier:
+    """
+    Local legal_query / general_chat classifier: logistic regression over hashed
+    character n-grams (2-4), so it works for German, English and Chinese queries
+    without a tokenizer. Prediction takes a few microseconds.
+    """
+
+    def __init__(self, n_features: int = 2 ** 14, ngram_range: tuple = (2, 4)):
+        self.n_features = n_features
+        self.ngram_range = ngram_range
+        self.weights = np.zeros(n_features, dtype=np.float32)
+        self.bias = 0.0
+
+    def _features(self, text: str) -> dict:
+        """L2-normalized hashed n-gram counts as {feature index: value}."""
+        text = f" {' '.join(text.lower().split())} "
+        counts = {}
+        for n in range(self.ngram_range[0], self.ngram_range[1] + 1):
+            for i in range(len(text) - n + 1):
+                index = zlib.crc32(text[i:i + n].encode("utf-8")) % self.n_features
+                counts[index] = counts.get(index, 0.0) + 1.0
+        norm = sum(v * v for v in counts.values()) ** 0.5 or 1.0
+        return {index: value / norm for index, value in counts.items()}
+
+    def fit(self, texts: list, labels: list, epochs: int = 1000, learning_rate: float = 4.0, l2: float = 1e-4):
+        """Full-batch gradient descent on the logistic loss."""
+        X = np.zeros((len(texts), self.n_features), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for index, value in self._features(text).items():
+                X[row, index] = value
+        y = np.array([INTENTS.index(label) for label in labels], dtype=np.float32)
+        self.weights = np.zeros(self.n_features, dtype=np.float32)
+        self.bias = 0.0
+        for _ in range(epochs):
+            p = 1 / (1 + np.exp(-(X @ self.weights + self.bias)))
+            error = p - y
+            self.weights -= learning_rate * (X.T @ error / len(y) + l2 * self.weights)
+            self.bias -= learning_rate * float(error.mean())
+        return self
+
+    def predict_proba(self, text: str) -> float:
+        """:return: Probability that text is a legal_query"""
+        features = self._features(text)
+        score = self.bias + sum(self.weights[index] * value for index, value in features.items())
+        return float(1 / (1 + np.exp(-score)))
+
+    def classify(self, text: str) -> tuple:
+        """:return: (intent, confidence in that intent)"""
+        p = self.predict_proba(text)
+        return ("legal_query", p) if p >= 0.5 else ("general_chat", 1 - p)
+
+
+_default = None
+_default_lock = threading.Lock()
+
+
+def default_classifier() -> IntentClassifier:
+    """
+    Classifier trained on the bundled examples (trained once per process, takes about a second).
+    Thread-safe: concurrent first calls wait for a single training run.
+    """
+    global _default
+    if _default is None:
+        with _default_lock:
+            if _default is None:
+                _default = IntentClassifier().fit(*load_examples(TRAIN_FILE))
+    return _default
@@ -0,0 +1,169 @@
+import argparse
+import asyncio
+import json
+import time
+
+from aiohttp import web
+from langchain_core.messages import AIMessage, HumanMessage
+
+from config.settings import Settings
+from agent import graph_agent
+
+
+class AgentService:
+    """
+    Long-running HTTP process around the agent graph.
+
+    The graph and its clients (retriever, Gemini, caches, reranker) are built once and
+    shared by every request, so the UI and CLI no longer pay import and connection setup
+    per session. Requests run on app.ainvoke / app.astream: one event loop serves many
+    concurrent chats. After an --embedding run the retriever reopens its vector store and
+    lexical index on the next query (see Retriever._reopen), so no restart is needed.
+
+    Endpoints:
+    - GET  /health     {"status": "ok" | "starting", "warm", "uptime", "requests", "active"}
+    - POST /chat       {"messages": [{"role", "content"}, ...]} or {"question"};
+                       returns {"answer", "documents", "intent"}. With "stream": true the
+                       response is NDJSON: {"type": "token", "text"} lines, then
+                       {"type": "final", ...} (or {"type": "error", "error"})
+    - GET  /graph.png  Mermaid rendering of the graph
+    """
+
+    def __init__(self, warm_up: bool = True):
+        self.warm_up = warm_up
+        self.started_at = time.time()
+        self.requests = 0
+        self.active = 0
+        self._warm_task = None
+        self._warm_lock = asyncio.Lock()
+        self._graph_png = None
+
+    def create_app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_get("/health", self.health)
+        app.router.add_post("/chat", self.chat)
+        app.router.add_get("/graph.png", self.graph_png)
+        app.on_startup.append(self._on_startup)
+        return app
+
+    async def _on_startup(self, app: web.Application):
+        if self.warm_up:
+            # Client construction is blocking; /health answers "starting" meanwhile
+            self._warm_task = asyncio.get_running_loop().run_in_executor(None, graph_agent.warm_up)
+
+    async def _warm(self):
+        """
+        Builds the clients in a worker thread (once; retried after a failure) and waits for it.
+        The async nodes call Lazy.get() on the event loop, so a request must not reach
+        the graph before this finished: it would block the loop on the construction.
+        """
+        async with self._warm_lock:
+            if self._warm_task is None or (self._warm_task.done() and self._warm_task.exception()):
+                self._warm_task = asyncio.get_running_loop().run_in_executor(None, graph_agent.warm_up)
+        await asyncio.shield(self._warm_task)
+
+    async def health(self, request: web.Request) -> web.Response:
+        status = "ok"
+        if self._warm_task is not None and not self._warm_task.done():
+            status = "starting"
+        elif self._warm_task is not None and self._warm_task.exception():
+            status = f"error: {self._warm_task.exception()}"
+        return web.json_response({
+            "status": status,
+            "warm": graph_agent.is_warm(),
+            "uptime": round(time.time() - self.started_at, 1),
+            "requests": self.requests,
+            "active": self.active,
+        })
+
+    @staticmethod
+    def _initial_state(payload: dict) -> dict:
+        messages = payload.get("messages")
+        if not messages:
+            question = payload.get("question")
+            if not question:
+                raise web.HTTPBadRequest(text="Expected 'messages' or 'question'")
+            messages = [{"role": "user", "content": question}]
+        history = []
+        for msg in messages:
+            if msg.get("role") == "user":
+                history.append(HumanMessage(content=msg["content"]))
+            elif msg.get("role") == "assistant":
+                history.append(AIMessage(content=msg["content"]))
+        if not history or not isinstance(history[-1], HumanMessage):
+            raise web.HTTPBadRequest(text="The last message must be from the user")
+        return {"messages": history, "documents": [], "intent": ""}
+
+    @staticmethod
+    def _result(final_state: dict) -> dict:
+        result = graph_agent._agent_result(final_state)
+        result["intent"] = final_state.get("intent", "")
+        return result
+
+    async def chat(self, request: web.Request) -> web.StreamResponse:
+        try:
+            payload = await request.json()
+        except json.JSONDecodeError:
+            raise web.HTTPBadRequest(text="Invalid JSON")
+        initial_state = self._initial_state(payload)
+
+        self.requests += 1
+        self.active += 1
+        try:
+            try:
+                await self._warm()
+            except Exception as e:
+                raise web.HTTPServiceUnavailable(text=f"Agent unavailable: {e}")
+            if payload.get("stream"):
+                return await self._stream(request, initial_state)
+            final_state = await graph_agent.app.ainvoke(initial_state)
+            return web.json_response(self._result(final_state))
+        finally:
+            self.active -= 1
+
+    async def _stream(self, request: web.Request, initial_state: dict) -> web.StreamResponse:
+        response = web.StreamResponse(headers={"Content-Type": "application/x-ndjson"})
+        await response.prepare(request)
+
+        async def send(event: dict):
+            await response.write((json.dumps(event, ensure_ascii=False) + "\n").encode("utf-8"))
+
+        final_state = initial_state
+        try:
+            async for mode, chunk in graph_agent.app.astream(initial_state, stream_mode=["custom", "values"]):
+                if mode == "custom" and "token" in chunk:
+                    await send({"type": "token", "text": chunk["token"]})
+                elif mode == "values":
+                    final_state = chunk
+            await send({"type": "final", **self._result(final_state)})
+        except Exception as e:
+            print(f"!! Agent request failed: {e}")
+            await send({"type": "error", "error": str(e)})
+        await response.write_eof()
+        return response
+
+    async def graph_png(self, request: web.Request) -> web.Response:
+        if self._graph_png is None:
+            try:
+                # Rendered by the mermaid.ink API (blocking HTTP call)
+                self._graph_png = await asyncio.get_running_loop().run_in_executor(
+                    None, lambda: graph_agent.app.get_graph().draw_mermaid_png())
+            except Exception as e:
+                raise web.HTTPServiceUnavailable(text=f"Graph visualization unavailable: {e}")
+        return web.Response(body=self._graph_png, content_type="image/png")
+
+
+def main():
+    settings = Settings()
+    parser = argparse.ArgumentParser(description="LawGPT agent service")
+    parser.add_argument("--host", default=settings.AGENT_SERVICE_HOST)
+    parser.add_argument("--port", type=int, default=settings.AGENT_SERVICE_PORT)
+    parser.add_argument("--no-warm-up", action="store_true", help="Build the clients on the first request instead of at startup")
+    args = parser.parse_args()
+
+    service = AgentService(warm_up=not args.no_warm_up)
+    web.run_app(service.create_app(), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
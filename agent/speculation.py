@@ -0,0 +1,188 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+class SpeculativeRetrieval:
+    """
+    Runs query expansion and retrieval for the question while router_node waits for the LLM.
+
+    When neither the keywords nor the local classifier decide the intent, the router calls
+    start() (or astart()) before the LLM classification call. The speculation expands the
+    question into search queries and retrieves them, exactly as tool_decision_node and
+    retrieve_articles_tool would. If the intent is legal_query, tool_decision_node take()s
+    the queries instead of calling the LLM again, and the tool take_results() the retrieval
+    instead of searching: the routing call and the expansion + retrieval round trips overlap.
+    Any other intent discards the speculation (one wasted expansion call and retrieval).
+    Pending speculations are keyed by question text (first in, first out).
+    A graph run that fails or is cancelled between the router and the tool never takes
+    its entries; they are swept (and counted as wasted) once older than max_age.
+    """
+
+    def __init__(self, retriever, expand, aexpand, top_k: int = 3, workers: int = 4, max_age: float = 120.0):
+        """
+        :param expand: question -> search queries (sync graph)
+        :param aexpand: Async variant of expand (async graph)
+        :param max_age: Seconds after which untaken speculations and results are dropped
+        """
+        self.retriever = retriever
+        self.expand = expand
+        self.aexpand = aexpand
+        self.top_k = top_k
+        self.max_age = max_age
+        # Own pool: retriever.query_many already uses the retriever pool for its vector searches
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="speculation")
+        self._pending = {}  # question -> [(started_at, future (sync graph) or task (async graph))]
+        self._ready = {}  # tuple(queries) -> (settled_at, results) taken by tool_decision_node, not yet by the tool
+        self._lock = threading.Lock()
+        self.started = 0
+        self.used = 0
+        self.wasted = 0
+        self.failed = 0
+        self.wait_seconds = 0.0
+        self.saved_seconds = 0.0
+
+    def _add(self, question: str, future):
+        with self._lock:
+            now = time.monotonic()
+            self._sweep(now)
+            self._pending.setdefault(question, []).append((now, future))
+            self.started += 1
+
+    def _pop(self, question: str):
+        with self._lock:
+            futures = self._pending.get(question)
+            if not futures:
+                return None
+            _, future = futures.pop(0)
+            if not futures:
+                del self._pending[question]
+            return future
+
+    def _sweep(self, now: float):
+        """Drops entries older than max_age (caller holds the lock)."""
+        deadline = now - self.max_age
+        for question, futures in list(self._pending.items()):
+            for started_at, future in futures:
+                if started_at < deadline:
+                    self._cancel(future)
+                    self.wasted += 1
+            futures = [entry for entry in futures if entry[0] >= deadline]
+            if futures:
+                self._pending[question] = futures
+            else:
+                del self._pending[question]
+        for queries in [queries for queries, (settled_at, _) in self._ready.items() if settled_at < deadline]:
+            del self._ready[queries]
+
+    @staticmethod
+    def _cancel(future):
+        if isinstance(future, asyncio.Task):
+            # Tasks may only be touched from their own event loop (gone if it has been closed)
+            loop = future.get_loop()
+            if not loop.is_closed():
+                loop.call_soon_threadsafe(future.cancel)
+        else:
+            future.cancel()
+
+    def pending(self, question: str) -> bool:
+        with self._lock:
+            return bool(self._pending.get(question))
+
+    def _run(self, question: str) -> tuple:
+        start = time.perf_counter()
+        queries = self.expand(question)
+        results = self.retriever.query_many(queries, top_k=self.top_k)
+        return queries, results, time.perf_counter() - start
+
+    async def _arun(self, question: str) -> tuple:
+        start = time.perf_counter()
+        queries = await self.aexpand(question)
+        results = await self.retriever.aquery_many(queries, top_k=self.top_k)
+        return queries, results, time.perf_counter() - start
+
+    def start(self, question: str):
+        """Starts expanding and retrieving question in the background (sync graph)."""
+        self._add(question, self._executor.submit(self._run, question))
+
+    def astart(self, question: str):
+        """Starts expanding and retrieving question as a task on the running event loop (async graph)."""
+        self._add(question, asyncio.create_task(self._arun(question)))
+
+    def _settle(self, outcome, waited: float):
+        """:return: The speculative queries (their results are kept for take_results), or None"""
+        with self._lock:
+            if isinstance(outcome, Exception):
+                print(f"!! Speculative retrieval failed: {outcome}")
+                self.failed += 1
+                return None
+            queries, results, duration = outcome
+            now = time.monotonic()
+            self._sweep(now)
+            self._ready[tuple(queries)] = (now, results)
+            self.used += 1
+            self.wait_seconds += waited
+            # Without speculation the whole expansion + retrieval would start only now
+            self.saved_seconds += max(duration - waited, 0.0)
+            return queries
+
+    def take(self, question: str):
+        """:return: The speculative search queries for question (waits if still running), or None"""
+        future = self._pop(question)
+        if future is None:
+            return None
+        start = time.perf_counter()
+        try:
+            outcome = future.result()
+        except Exception as e:
+            outcome = e
+        return self._settle(outcome, time.perf_counter() - start)
+
+    async def atake(self, question: str):
+        """Async variant of take()."""
+        task = self._pop(question)
+        if task is None:
+            return None
+        start = time.perf_counter()
+        try:
+            outcome = await task
+        except Exception as e:
+            outcome = e
+        return self._settle(outcome, time.perf_counter() - start)
+
+    def take_results(self, queries: list):
+        """:return: The retrieval results (one list per query) for queries returned by take(), or None"""
+        with self._lock:
+            entry = self._ready.pop(tuple(queries), None)
+            return entry[1] if entry else None
+
+    def discard(self, question: str):
+        """Drops the speculation for question (intent was not legal_query)."""
+        future = self._pop(question)
+        if future is None:
+            return
+        # Not yet started (sync pool) or still awaiting I/O (task): cancel the remaining work
+        future.cancel()
+        with self._lock:
+            self.wasted += 1
+
+    def metrics(self) -> dict:
+        with self._lock:
+            settled = self.used + self.wasted + self.failed
+            return {
+                "started": self.started,
+                "used": self.used,
+                "wasted": self.wasted,
+                "failed": self.failed,
+                "waste_rate": self.wasted / settled if settled else 0.0,
+                "wait_seconds": self.wait_seconds,
+                "saved_seconds": self.saved_seconds,
+            }
+
+    def report(self) -> str:
+        m = self.metrics()
+        saved_per_use = m["saved_seconds"] / m["used"] if m["used"] else 0.0
+        return (f"{m['started']} started, {m['used']} used, {m['wasted']} wasted ({m['waste_rate']:.1%} waste), "
+                f"{m['saved_seconds']:.2f}s saved ({saved_per_use:.2f}s per use), "
+                f"{m['wait_seconds']:.2f}s waited on speculation")
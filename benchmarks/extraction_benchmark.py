@@ -0,0 +1,109 @@
+"""
+Micro-benchmark for the law page extraction engines.
+
+Compares the reference BeautifulSoup engine with the lxml engine on saved law
+pages, checks that both produce byte-identical `sections`, and reports timings.
+
+Usage:
+    python -m benchmarks.extraction_benchmark
+    python -m benchmarks.extraction_benchmark --scale 50 --repeat 5
+    python -m benchmarks.extraction_benchmark --save https://www.gesetze-im-internet.de/bgb/BJNR001950896.html
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import warnings
+
+import requests
+from bs4 import XMLParsedAsHTMLWarning
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from crawler.extractor import parse_sections_bs4
+from crawler.lxml_extractor import parse_sections_lxml, available as lxml_available
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "law_pages")
+
+
+def save_fixtures(urls, fixture_dir=FIXTURE_DIR):
+    """Downloads law pages into the fixture directory."""
+    os.makedirs(fixture_dir, exist_ok=True)
+    for url in urls:
+        response = requests.get(url, timeout=30)
+        response.raise_for_status()
+        filename = "_".join(url.rstrip("/").split("/")[-2:])
+        with open(os.path.join(fixture_dir, filename), "wb") as f:
+            f.write(response.content)
+        print(f"Saved {url} -> {filename} ({len(response.content) / 1e6:.2f} MB)")
+
+
+def scale_page(content: bytes, factor: int) -> bytes:
+    """Repeats the <body> of a page `factor` times to emulate large codes such as the BGB."""
+    if factor <= 1:
+        return content
+    head, _, rest = content.partition(b"<body>")
+    body, _, tail = rest.partition(b"</body>")
+    return head + b"<body>" + body * factor + b"</body>" + tail
+
+
+def best_time(func, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def run(fixture_dir=FIXTURE_DIR, repeat=3, scale=1) -> bool:
+    if not lxml_available:
+        print("lxml is not installed, nothing to compare.")
+        return False
+
+    files = sorted(f for f in os.listdir(fixture_dir) if f.endswith(".html"))
+    if not files:
+        print(f"No fixtures found in {fixture_dir}. Use --save URL to add some.")
+        return False
+
+    all_identical = True
+    total_bs4 = total_lxml = 0.0
+    print(f"{'fixture':<32}{'MB':>7}{'sections':>10}{'bs4 (s)':>10}{'lxml (s)':>10}{'speedup':>9}  identical")
+    for filename in files:
+        with open(os.path.join(fixture_dir, filename), "rb") as f:
+            content = scale_page(f.read(), scale)
+        base_url = f"https://www.gesetze-im-internet.de/{filename}"
+
+        reference = parse_sections_bs4(content, base_url)
+        fast = parse_sections_lxml(content, base_url)
+        if fast is None:
+            print(f"{filename:<32} unsupported markup, the lxml engine falls back to bs4")
+            continue
+        identical = json.dumps(reference, sort_keys=True) == json.dumps(fast, sort_keys=True)
+        all_identical &= identical
+
+        t_bs4 = best_time(lambda: parse_sections_bs4(content, base_url), repeat)
+        t_lxml = best_time(lambda: parse_sections_lxml(content, base_url), repeat)
+        total_bs4 += t_bs4
+        total_lxml += t_lxml
+        print(f"{filename:<32}{len(content) / 1e6:>7.2f}{len(reference):>10}{t_bs4:>10.4f}{t_lxml:>10.4f}"
+              f"{t_bs4 / t_lxml:>8.1f}x  {'yes' if identical else 'NO'}")
+
+    if total_lxml:
+        print(f"{'total':<49}{total_bs4:>10.4f}{total_lxml:>10.4f}{total_bs4 / total_lxml:>8.1f}x")
+    return all_identical
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Extraction engine micro-benchmark")
+    parser.add_argument("--fixtures", default=FIXTURE_DIR, help="Directory of saved law pages (*.html)")
+    parser.add_argument("--repeat", type=int, default=3, help="Timing repetitions (best is reported)")
+    parser.add_argument("--scale", type=int, default=1, help="Repeat each page body N times")
+    parser.add_argument("--save", nargs="+", metavar="URL", help="Download law pages into the fixture directory")
+    args = parser.parse_args()
+
+    warnings.filterwarnings("ignore", category=XMLParsedAsHTMLWarning)
+    if args.save:
+        save_fixtures(args.save, args.fixtures)
+    sys.exit(0 if run(args.fixtures, args.repeat, args.scale) else 1)
@@ -0,0 +1,92 @@
+"""
+Accuracy / latency benchmark for intent routing.
+
+Evaluates the local classifier on a labelled set (benchmarks/fixtures/intent_eval.jsonl)
+and the router cascade used by router_node (keywords -> local classifier -> LLM):
+accuracy of the decisions taken locally and how often the LLM would still be called.
+With --llm the old router (keywords -> LLM) and the new cascade are compared end to end
+(needs GOOGLE_API_KEY).
+
+Usage:
+    python -m benchmarks.intent_benchmark
+    python -m benchmarks.intent_benchmark --confidence 0.9
+    python -m benchmarks.intent_benchmark --llm
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agent.intent_classifier import IntentClassifier, TRAIN_FILE, keyword_intent, llm_intent, load_examples
+
+EVAL_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "intent_eval.jsonl")
+
+
+def timed(fn, texts: list) -> tuple:
+    """:return: (predictions, mean latency in ms)"""
+    start = time.perf_counter()
+    predictions = [fn(text) for text in texts]
+    return predictions, (time.perf_counter() - start) * 1000 / len(texts)
+
+
+def accuracy(predictions: list, labels: list) -> float:
+    return sum(p == l for p, l in zip(predictions, labels)) / len(labels) if labels else 0.0
+
+
+def legal_recall(predictions: list, labels: list) -> float:
+    legal = [p for p, l in zip(predictions, labels) if l == "legal_query"]
+    return sum(p == "legal_query" for p in legal) / len(legal) if legal else 0.0
+
+
+def row(name: str, predictions: list, labels: list, latency_ms: float, llm_calls: int):
+    print(f"{name:<26}{accuracy(predictions, labels):>9.1%}{legal_recall(predictions, labels):>13.1%}"
+          f"{latency_ms:>12.3f}{llm_calls:>10}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Intent routing benchmark")
+    parser.add_argument("--eval", default=EVAL_FILE, help="Labelled JSONL file ({\"text\", \"intent\"})")
+    parser.add_argument("--confidence", type=float, default=None,
+                        help="Classifier confidence threshold (default: settings.INTENT_CONFIDENCE)")
+    parser.add_argument("--llm", action="store_true", help="Also run the LLM routers (needs GOOGLE_API_KEY)")
+    args = parser.parse_args()
+
+    if args.confidence is None:
+        from config.settings import Settings
+        args.confidence = Settings().INTENT_CONFIDENCE
+
+    start = time.perf_counter()
+    classifier = IntentClassifier().fit(*load_examples(TRAIN_FILE))
+    print(f"Trained classifier in {time.perf_counter() - start:.2f}s")
+    texts, labels = load_examples(args.eval)
+    print(f"Eval set: {len(texts)} queries ({labels.count('legal_query')} legal, "
+          f"{labels.count('general_chat')} general)\n")
+
+    classified, classifier_ms = timed(classifier.classify, texts)
+    decided = [keyword_intent(text) or (intent if confidence >= args.confidence else None)
+               for text, (intent, confidence) in zip(texts, classified)]
+    local = [(p, l) for p, l in zip(decided, labels) if p is not None]
+    fallback = [text for text, p in zip(texts, decided) if p is None]
+
+    print(f"{'router':<26}{'accuracy':>9}{'legal recall':>13}{'ms/query':>12}{'LLM calls':>10}")
+    row("classifier only", [intent for intent, _ in classified], labels, classifier_ms, 0)
+    if args.llm:
+        from config.settings import Settings
+        from rag.gemini_api import GeminiLLMAPI
+        settings = Settings()
+        llm = GeminiLLMAPI(api_key=settings.GOOGLE_API_KEY, model=settings.DEFAULT_LLM_MODEL)
+
+        def cascade(text):
+            intent, confidence = classifier.classify(text)
+            return keyword_intent(text) or (intent if confidence >= args.confidence else llm_intent(llm, text))
+
+        old, old_ms = timed(lambda text: keyword_intent(text) or llm_intent(llm, text), texts)
+        row("keywords + LLM (old)", old, labels, old_ms, sum(keyword_intent(t) is None for t in texts))
+        new, new_ms = timed(cascade, texts)
+        row("keywords + clf + LLM", new, labels, new_ms, len(fallback))
+
+    print(f"\nDecided locally (keywords or confidence >= {args.confidence}): {len(local)}/{len(texts)} "
+          f"({len(local) / len(texts):.1%}), accuracy {accuracy(*zip(*local)) if local else 0.0:.1%}")
+    print(f"LLM fallback rate: {len(fallback) / len(texts):.1%}")
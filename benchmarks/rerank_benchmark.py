@@ -0,0 +1,90 @@
+"""
+Latency / relevance benchmark for the reranker_node backends.
+
+Each case in benchmarks/fixtures/rerank_eval.json is a question, the German search
+queries tool_decision_node would generate, the retrieved BGB sections in retrieval
+order and the sections that are actually relevant. Reports precision / recall of
+the kept documents, MRR and latency for no reranking, the local feature reranker
+and (with --llm, needs GOOGLE_API_KEY) the LLM judge.
+
+Usage:
+    python -m benchmarks.rerank_benchmark
+    python -m benchmarks.rerank_benchmark --top-k 3 --min-score 0.5
+    python -m benchmarks.rerank_benchmark --llm
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from rag.reranker import FeatureReranker, LLMReranker, PassthroughReranker
+
+EVAL_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "rerank_eval.json")
+
+
+def load_cases(path: str) -> list:
+    """:return: [(question, queries, documents in retrieval order, relevant links)]"""
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    cases = []
+    for case in data["cases"]:
+        # Same score scale as retrieve_articles_tool (Reciprocal Rank Fusion)
+        documents = [{"id": data["sections"][key]["link"], "score": 1.0 / (60 + rank),
+                      "metadata": data["sections"][key]}
+                     for rank, key in enumerate(case["candidates"], start=1)]
+        relevant = {data["sections"][key]["link"] for key in case["relevant"]}
+        cases.append((case["question"], case["queries"], documents, relevant))
+    return cases
+
+
+def evaluate(reranker, cases: list) -> dict:
+    precision = recall = mrr = 0.0
+    start = time.perf_counter()
+    ranked = [reranker.rerank(question, documents, queries) for question, queries, documents, _ in cases]
+    latency_ms = (time.perf_counter() - start) * 1000 / len(cases)
+    for kept, (_, _, _, relevant) in zip(ranked, cases):
+        links = [doc["id"] for doc in kept]
+        hits = sum(link in relevant for link in links)
+        precision += hits / len(links) if links else 0.0
+        recall += hits / len(relevant)
+        mrr += next((1 / rank for rank, link in enumerate(links, start=1) if link in relevant), 0.0)
+    n = len(cases)
+    return {"precision": precision / n, "recall": recall / n, "mrr": mrr / n, "kept": sum(map(len, ranked)) / n,
+            "empty": sum(not kept for kept in ranked), "latency_ms": latency_ms}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Reranker latency / relevance benchmark")
+    parser.add_argument("--eval", default=EVAL_FILE, help="Labelled cases (see benchmarks/fixtures/rerank_eval.json)")
+    parser.add_argument("--top-k", type=int, default=None, help="Local reranker: max documents kept")
+    parser.add_argument("--min-score", type=float, default=None, help="Local reranker: score cutoff (0-1)")
+    parser.add_argument("--min-keep", type=int, default=None, help="Local reranker: documents kept regardless of score")
+    parser.add_argument("--llm", action="store_true", help="Also run the LLM judge (needs GOOGLE_API_KEY)")
+    args = parser.parse_args()
+
+    from config.settings import Settings
+    settings = Settings()
+    cases = load_cases(args.eval)
+    print(f"{len(cases)} cases, {sum(len(c[2]) for c in cases) / len(cases):.1f} retrieved documents each\n")
+
+    rerankers = {
+        "none (retrieval order)": PassthroughReranker(),
+        "local features": FeatureReranker(top_k=args.top_k or settings.RERANK_TOP_K,
+                                          min_score=settings.RERANK_MIN_SCORE if args.min_score is None
+                                          else args.min_score,
+                                          min_keep=settings.RERANK_MIN_KEEP if args.min_keep is None
+                                          else args.min_keep),
+    }
+    if args.llm:
+        from rag.gemini_api import GeminiLLMAPI
+        rerankers["LLM judge"] = LLMReranker(GeminiLLMAPI(api_key=settings.GOOGLE_API_KEY,
+                                                          model=settings.DEFAULT_LLM_MODEL))
+
+    print(f"{'reranker':<24}{'precision':>10}{'recall':>8}{'MRR':>7}{'kept':>6}{'empty':>7}{'ms/query':>11}")
+    for name, reranker in rerankers.items():
+        m = evaluate(reranker, cases)
+        print(f"{name:<24}{m['precision']:>10.1%}{m['recall']:>8.1%}{m['mrr']:>7.3f}{m['kept']:>6.1f}"
+              f"{m['empty']:>7}{m['latency_ms']:>11.3f}")
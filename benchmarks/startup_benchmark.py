@@ -0,0 +1,199 @@
+"""
+Startup-time benchmark for the entry points (main.py modes, main_streamlit.py, agent.service).
+
+Each target is a real invocation of an entry point, run in a fresh interpreter with
+`python -X importtime`:
+
+- main.py modes run with --dry-run, which imports the modules of the selected modes
+  (the same imports the mode runs with) and exits before any work
+- main_streamlit.py runs with a stub streamlit module; streamlit is the host process and
+  is imported once per server, measured are the modules the script adds
+- agent.service runs with --help after its module-level imports, then checks that no
+  client was built at import
+
+The benchmark reports the median import time (interpreter startup excluded) and the heaviest
+top-level packages. A target fails if:
+
+- it cannot be measured (missing dependency, syntax error, non-zero exit)
+- a forbidden module is imported, e.g. a crawl pulling in llama_index or the UI pulling in
+  LangGraph
+- the import time exceeds its budget in benchmarks/fixtures/startup_budget.json
+
+The exit status is 1 on any failure, so the benchmark can run as a regression check. Budgets
+are machine dependent; --update rewrites them from the current measurements (x1.5, at least
++50 ms).
+
+Usage:
+    python -m benchmarks.startup_benchmark
+    python -m benchmarks.startup_benchmark --repeat 10
+    python -m benchmarks.startup_benchmark --update
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BUDGET_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "startup_budget.json")
+
+# Modules no thin entry point should load
+RAG_STACK = ["langgraph", "langchain_core", "google.genai", "llama_index", "pinecone", "agent.graph_agent"]
+
+# Runs main_streamlit.py up to (not including) main(), with every st.* call a no-op
+STREAMLIT_SCRIPT = """
+import runpy, sys, types
+st = types.ModuleType("streamlit")
+st.__getattr__ = lambda name: lambda *args, **kwargs: None
+sys.modules["streamlit"] = st
+runpy.run_path("main_streamlit.py", run_name="startup_benchmark")
+"""
+
+# python -m agent.service --help; the graph is imported, but no client may be built
+# before the service binds its port
+SERVICE_SCRIPT = """
+import runpy, sys
+sys.argv = ["agent.service", "--help"]
+try:
+    runpy.run_module("agent.service", run_name="__main__", alter_sys=True)
+except SystemExit as e:
+    assert not e.code, f"exit status {e.code}"
+from agent import graph_agent
+assert not graph_agent.is_warm(), "clients built at import"
+"""
+
+# name -> (interpreter arguments, forbidden modules)
+# rich is not forbidden where google-genai or langgraph load: their httpx imports it when installed
+TARGETS = {
+    "main.py --help": (
+        ["main.py", "--help"],
+        RAG_STACK + ["crawler", "rag", "agent", "pandas", "rich", "langdetect"],
+    ),
+    "main.py --crawl": (
+        ["main.py", "--crawl", "--dry-run"],
+        RAG_STACK + ["rag", "agent", "rich"],
+    ),
+    "main.py --crawl --crawl-mode async": (
+        ["main.py", "--crawl", "--crawl-mode", "async", "--dry-run"],
+        RAG_STACK + ["rag", "agent", "rich"],
+    ),
+    "main.py --crawl --crawl-mode pipeline": (
+        ["main.py", "--crawl", "--crawl-mode", "pipeline", "--dry-run"],
+        RAG_STACK + ["rag", "agent", "rich"],
+    ),
+    "main.py --embedding": (
+        ["main.py", "--embedding", "--dry-run"],
+        ["langgraph", "langchain_core", "agent", "pinecone"],
+    ),
+    "main.py --rag": (
+        ["main.py", "--rag", "--dry-run"],
+        RAG_STACK + ["crawler", "rag", "pandas"],
+    ),
+    "main_streamlit.py": (
+        ["-c", STREAMLIT_SCRIPT],
+        RAG_STACK + ["crawler", "rag", "pandas"],
+    ),
+    "agent.service": (
+        ["-c", SERVICE_SCRIPT],
+        ["crawler", "llama_index", "pinecone"],
+    ),
+}
+
+
+def parse_importtime(stderr: str) -> list:
+    """:return: [(module, depth, self us, cumulative us)] in import order"""
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        stripped = name.lstrip()
+        depth = (len(name) - len(stripped) - 1) // 2
+        modules.append((stripped, depth, int(self_us), int(cumulative_us)))
+    return modules
+
+
+def run_importtime(arguments: list) -> tuple:
+    """
+    :param arguments: Interpreter arguments, e.g. ["main.py", "--crawl", "--dry-run"] or ["-c", code]
+    :return: (modules as in parse_importtime, error message or None)
+    """
+    result = subprocess.run([sys.executable, "-X", "importtime", *arguments],
+                            cwd=ROOT, capture_output=True, text=True)
+    error = None
+    if result.returncode != 0:
+        lines = [line for line in result.stderr.splitlines() if not line.startswith("import time:")]
+        error = lines[-1] if lines else f"exit status {result.returncode}"
+    return parse_importtime(result.stderr), error
+
+
+def measure(arguments: list, forbidden: list, baseline: set, repeat: int) -> dict:
+    totals, modules, error = [], [], None
+    for _ in range(repeat):
+        modules, error = run_importtime(arguments)
+        if error:
+            break
+        # Top-level imports of the entry point; interpreter startup (site, encodings, ...) excluded
+        totals.append(sum(cum for name, depth, _, cum in modules if depth == 0 and name not in baseline))
+    packages = {}
+    for name, _, self_us, _ in modules:
+        if name not in baseline:
+            root = name.split(".")[0]
+            packages[root] = packages.get(root, 0) + self_us
+    return {
+        "error": error,
+        "ms": statistics.median(totals) / 1000 if totals else None,
+        "modules": sum(name not in baseline for name, _, _, _ in modules),
+        "heaviest": sorted(packages.items(), key=lambda item: -item[1])[:4],
+        "forbidden": sorted({f for name, _, _, _ in modules for f in forbidden if name == f or name.startswith(f + ".")}),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Entry point startup-time benchmark")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per target (median is reported)")
+    parser.add_argument("--budget", default=BUDGET_FILE, help="JSON file {target: max import ms}")
+    parser.add_argument("--update", action="store_true", help="Rewrite the budgets from this run (x1.5, at least +50 ms)")
+    args = parser.parse_args()
+
+    budgets = {}
+    if os.path.exists(args.budget):
+        with open(args.budget, "r", encoding="utf-8") as f:
+            budgets = json.load(f)
+
+    baseline = {name for name, _, _, _ in run_importtime(["-c", "pass"])[0]}
+    print(f"{'Target':<36}{'Import ms':>11}{'Budget':>9}{'Modules':>9}  Heaviest packages (self ms)")
+    print("-" * 110)
+
+    failures, measured = [], {}
+    for name, (arguments, forbidden) in TARGETS.items():
+        result = measure(arguments, forbidden, baseline, args.repeat)
+        if result["error"]:
+            print(f"{name:<36}{'failed':>11}  ({result['error']})")
+            failures.append(f"{name}: cannot be measured ({result['error']})")
+            continue
+        measured[name] = result["ms"]
+        budget = budgets.get(name)
+        heaviest = ", ".join(f"{package} {us / 1000:.0f}" for package, us in result["heaviest"])
+        print(f"{name:<36}{result['ms']:>11.1f}{budget if budget is not None else '-':>9}{result['modules']:>9}  {heaviest}")
+        if result["forbidden"]:
+            failures.append(f"{name}: imports {', '.join(result['forbidden'])}")
+        if budget is not None and not args.update and result["ms"] > budget:
+            failures.append(f"{name}: {result['ms']:.1f} ms exceeds the {budget} ms budget")
+
+    if args.update:
+        # Targets that were renamed or removed lose their budget
+        budgets = {name: budgets[name] for name in TARGETS if name in budgets}
+        budgets.update({name: round(max(ms * 1.5, ms + 50)) for name, ms in measured.items()})
+        budgets = {name: budgets[name] for name in TARGETS if name in budgets}
+        with open(args.budget, "w", encoding="utf-8") as f:
+            json.dump(budgets, f, indent=2)
+            f.write("\n")
+        print(f"\nBudgets written to {args.budget}")
+
+    print()
+    for failure in failures:
+        print(f"FAIL {failure}")
+    print("OK" if not failures else f"{len(failures)} regression(s)")
+    sys.exit(1 if failures else 0)
@@ -0,0 +1,89 @@
+"""
+Offline throughput check for the pipelined uploader.
+
+Runs PipelinedUploader.submit_batch / flush against a LocalVectorStore (through the
+uploader's index= hook) with a simulated network round trip per upsert, for several
+max_in_flight settings, and verifies that every vector arrived intact.
+
+Usage:
+    python -m benchmarks.upload_benchmark
+    python -m benchmarks.upload_benchmark --vectors 5000 --latency 80 --in-flight 1 4 8
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from rag.uploader import PipelinedUploader
+from rag.vector_store import LocalVectorStore
+
+
+class DelayedIndex:
+    """Wraps a VectorStore and sleeps before each upsert, like a Pinecone request."""
+
+    def __init__(self, store: LocalVectorStore, latency: float):
+        self.store = store
+        self.latency = latency
+
+    def upsert(self, vectors: list) -> int:
+        time.sleep(self.latency)
+        return self.store.upsert(vectors)
+
+    def __getattr__(self, name):
+        return getattr(self.store, name)
+
+
+def run(vectors: np.ndarray, batch_size: int, in_flight: int, latency: float) -> float:
+    """:return: Seconds from the first submit_batch to flush() returning"""
+    with tempfile.TemporaryDirectory() as tmp:
+        store = LocalVectorStore(os.path.join(tmp, "store"), dimension=vectors.shape[1], initial_capacity=len(vectors))
+        uploader = PipelinedUploader("local", None, progress_file=os.path.join(tmp, "progress.json"),
+                                     index=DelayedIndex(store, latency), max_in_flight=in_flight,
+                                     queue_size=2 * in_flight)
+        start = time.perf_counter()
+        for offset in range(0, len(vectors), batch_size):
+            uploader.submit_batch([
+                {"id": f"v{i}", "values": vectors[i].tolist(), "metadata": {"filename": "bench.json", "n": i}}
+                for i in range(offset, min(offset + batch_size, len(vectors)))
+            ])
+        uploader.flush()
+        elapsed = time.perf_counter() - start
+        uploader.close()
+
+        # Every vector arrived, with its metadata and (normalized) values
+        assert store.describe()["count"] == len(vectors), store.describe()
+        sample = [f"v{i}" for i in range(0, len(vectors), max(len(vectors) // 50, 1))]
+        fetched = store.fetch(sample)
+        for vid in sample:
+            i = int(vid[1:])
+            expected = vectors[i] / np.linalg.norm(vectors[i])
+            assert fetched[vid]["metadata"]["n"] == i
+            assert np.allclose(fetched[vid]["values"], expected, atol=1e-5), vid
+        store.close()
+    return elapsed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pipelined uploader benchmark (offline)")
+    parser.add_argument("--vectors", type=int, default=2000)
+    parser.add_argument("--batch", type=int, default=100, help="Vectors per upsert (main.py uses 100)")
+    parser.add_argument("--latency", type=float, default=50, help="Simulated round trip per upsert (ms)")
+    parser.add_argument("--in-flight", type=int, nargs="+", default=[1, 2, 4, 8])
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    vectors = rng.normal(size=(args.vectors, 768)).astype(np.float32)
+    batches = -(-args.vectors // args.batch)
+    print(f"{args.vectors} vectors in {batches} batches, {args.latency:.0f} ms per upsert\n")
+    print(f"{'max_in_flight':<15}{'seconds':>9}{'vectors/s':>11}{'speedup':>9}")
+    baseline = None
+    for in_flight in args.in_flight:
+        elapsed = run(vectors, args.batch, in_flight, args.latency / 1000)
+        baseline = baseline or elapsed
+        print(f"{in_flight:<15}{elapsed:>9.2f}{args.vectors / elapsed:>11.0f}{baseline / elapsed:>8.1f}x")
+    print("\nAll vectors verified in the local store.")
@@ -15,6 +15,69 @@ class Settings:
     PINECONE_HOST = os.getenv("PINECONE_HOST")
     GEMINI_RATE_LIMIT_DELAY = float(os.getenv("GEMINI_RATE_LIMIT_DELAY", 0))
     DEFAULT_LLM_MODEL = "gemini-flash-latest"
+    # Crawl concurrency (in-flight requests; index page resolver threads in sync mode)
+    # and per-host politeness (requests/sec) shared by all requests of a crawl
+    CRAWL_CONCURRENCY = int(os.getenv("CRAWL_CONCURRENCY", 8))
+    CRAWL_RATE_LIMIT = float(os.getenv("CRAWL_RATE_LIMIT", 5))
+    CRAWL_BURST = int(os.getenv("CRAWL_BURST", 1))
+    # Pipeline crawl mode: extractor processes and bounded queue size (pages)
+    CRAWL_WORKERS = int(os.getenv("CRAWL_WORKERS", os.cpu_count() or 1))
+    CRAWL_QUEUE_SIZE = int(os.getenv("CRAWL_QUEUE_SIZE", 32))
+    # Index page -> HTML page URL cache lifetime (seconds)
+    DOC_URL_CACHE_TTL = float(os.getenv("DOC_URL_CACHE_TTL", 7 * 24 * 3600))
+    # Crawler / embedding state persistence: "json" or "sqlite" (WAL)
+    STATE_BACKEND = os.getenv("STATE_BACKEND", "json")
+    EMBEDDING_STATE_FILE = os.path.join(DATA_FOLDER, "embedding_state.json")
+    # Per-chunk fingerprints of the embedded laws (SQLite, one row per chunk)
+    CHUNK_STATE_FILE = os.getenv("CHUNK_STATE_FILE", os.path.join(DATA_FOLDER, "chunk_state.sqlite"))
+    # Local content-addressed embedding cache (SQLite), LRU-evicted above this size
+    EMBEDDING_CACHE_FILE = os.getenv("EMBEDDING_CACHE_FILE", os.path.join(DATA_FOLDER, "embedding_cache.sqlite"))
+    EMBEDDING_CACHE_MAX_MB = float(os.getenv("EMBEDDING_CACHE_MAX_MB", 1024))
+    # Pipelined Pinecone upserts: parallel batches in flight / max queued batches
+    UPLOAD_MAX_IN_FLIGHT = int(os.getenv("UPLOAD_MAX_IN_FLIGHT", 4))
+    UPLOAD_QUEUE_SIZE = int(os.getenv("UPLOAD_QUEUE_SIZE", 8))
+    # Vector store backend: "pinecone" or "local" (memory-mapped, in-process)
+    VECTOR_STORE = os.getenv("VECTOR_STORE", "pinecone")
+    LOCAL_VECTOR_STORE_DIR = os.getenv("LOCAL_VECTOR_STORE_DIR", os.path.join(CONFIG_FOLDER, "../data/vector_store"))
+    # Local store IVF index: inverted lists (0 = exact search only) and lists scanned per query
+    ANN_LISTS = int(os.getenv("ANN_LISTS", 256))
+    ANN_NPROBE = int(os.getenv("ANN_NPROBE", 16))
+    # BM25 index over the crawled sections; retrieval mode "vector", "lexical" or "hybrid"
+    LEXICAL_INDEX_DIR = os.getenv("LEXICAL_INDEX_DIR", os.path.join(CONFIG_FOLDER, "../data/lexical_index"))
+    RETRIEVAL_MODE = os.getenv("RETRIEVAL_MODE", "hybrid")
+    # Hybrid score fusion: weight of the vector score (BM25 gets 1 - HYBRID_ALPHA)
+    HYBRID_ALPHA = float(os.getenv("HYBRID_ALPHA", 0.5))
+    # Concurrent vector searches for multi-query retrieval
+    RETRIEVAL_WORKERS = int(os.getenv("RETRIEVAL_WORKERS", 4))
+    # Retrieval result cache: LRU size (0 disables), TTL (seconds), semantic reuse threshold (cosine)
+    QUERY_CACHE_SIZE = int(os.getenv("QUERY_CACHE_SIZE", 1024))
+    QUERY_CACHE_TTL = float(os.getenv("QUERY_CACHE_TTL", 3600))
+    QUERY_CACHE_SIMILARITY = float(os.getenv("QUERY_CACHE_SIMILARITY", 0.95))
+    # Persistent LLM response cache for the deterministic agent nodes (router, query expansion, reranker)
+    LLM_CACHE_FILE = os.getenv("LLM_CACHE_FILE", os.path.join(CONFIG_FOLDER, "../data/llm_cache.sqlite"))
+    LLM_CACHE_TTL = float(os.getenv("LLM_CACHE_TTL", 7 * 24 * 3600))
+    LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", 10000))
+    # router_node: the local intent classifier decides above this confidence, the LLM below it
+    INTENT_CONFIDENCE = float(os.getenv("INTENT_CONFIDENCE", 0.8))
+    # reranker_node: "local" (feature scoring, no API call), "llm" (Gemini judge) or "none"
+    RERANKER = os.getenv("RERANKER", "local")
+    # Local reranker cutoff: documents kept at most, minimum relevance score (0-1), and
+    # documents always kept regardless of score
+    RERANK_TOP_K = int(os.getenv("RERANK_TOP_K", 5))
+    RERANK_MIN_SCORE = float(os.getenv("RERANK_MIN_SCORE", 0.5))
+    RERANK_MIN_KEEP = int(os.getenv("RERANK_MIN_KEEP", 2))
+    # router_node: retrieve the raw question while the intent is being decided (discarded unless legal_query)
+    SPECULATIVE_RETRIEVAL = os.getenv("SPECULATIVE_RETRIEVAL", "false").lower() == "true"
+    # Token budgets (tiktoken encoding, approximates Gemini's tokenizer): generation context
+    # and per-document previews of the LLM reranker
+    TOKENIZER_ENCODING = os.getenv("TOKENIZER_ENCODING", "cl100k_base")
+    CONTEXT_MAX_TOKENS = int(os.getenv("CONTEXT_MAX_TOKENS", 4000))
+    RERANK_PREVIEW_TOKENS = int(os.getenv("RERANK_PREVIEW_TOKENS", 64))
+    # agent.service: address the service binds to, URL the UI / CLI clients call, client timeout (seconds)
+    AGENT_SERVICE_HOST = os.getenv("AGENT_SERVICE_HOST", "127.0.0.1")
+    AGENT_SERVICE_PORT = int(os.getenv("AGENT_SERVICE_PORT", 8765))
+    AGENT_SERVICE_URL = os.getenv("AGENT_SERVICE_URL", f"http://{AGENT_SERVICE_HOST}:{AGENT_SERVICE_PORT}")
+    AGENT_SERVICE_TIMEOUT = float(os.getenv("AGENT_SERVICE_TIMEOUT", 300))
     TARGET_LIST = ["A", "B", "C", "D", "E", "F", "G", "H", "I", "J", "K", "L",
                    "M", "N", "O", "P", "Q", "R", "S", "T", "U", "V", "W", "X",
                    "Y", "Z", "1", "2", "3", "4", "5", "6", "7", "8", "9"]
\ No newline at end of file
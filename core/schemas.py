@@ -9,4 +9,4 @@ class AgentState(TypedDict):
     """
     messages: Annotated[Sequence[BaseMessage], operator.add]
     documents: Annotated[list[dict], operator.add]
-    intent: str # 'legal_query' or 'general_chat'
+    intent: str # 'legal_query', 'statute_lookup' or 'general_chat'
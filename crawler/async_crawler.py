@@ -0,0 +1,183 @@
+import asyncio
+import time
+from urllib.parse import urlparse
+
+import aiohttp
+from tenacity import retry, wait_exponential, stop_after_attempt
+from tqdm import tqdm
+
+from .crawler import Crawler
+from .extractor import parse_sections_de, conditional_headers, response_validators
+from .url_handler import parse_doc_url, parse_target_links, index_page_url, full_doc_url
+
+
+class TokenBucket:
+    """
+    Token bucket: allows `burst` requests at once, refilled at `rate` tokens per second.
+    """
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.capacity = max(1, burst)
+        self.tokens = float(self.capacity)
+        self.updated_at = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+                self.updated_at = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class HostRateLimiter:
+    """
+    Politeness limiter keeping one TokenBucket per host.
+    A rate <= 0 disables limiting.
+    """
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.burst = burst
+        self._buckets = {}
+
+    async def acquire(self, url: str):
+        if self.rate <= 0:
+            return
+        host = urlparse(url).netloc
+        if host not in self._buckets:
+            self._buckets[host] = TokenBucket(self.rate, self.burst)
+        await self._buckets[host].acquire()
+
+
+class AsyncFetcher:
+    """
+    Pooled HTTP client shared by all requests of a crawl.
+    Concurrency is bounded by a semaphore and politeness by a HostRateLimiter.
+    """
+
+    def __init__(self, session: aiohttp.ClientSession, limiter: HostRateLimiter, concurrency: int):
+        self.session = session
+        self.limiter = limiter
+        self.semaphore = asyncio.Semaphore(concurrency)
+
+    # Same retry policy as html_extraction_de
+    @retry(wait=wait_exponential(multiplier=1, min=4, max=10), stop=stop_after_attempt(3))
+    async def fetch(self, url: str, validators: dict = None):
+        """
+        Conditional GET.
+        :return: (content, validators); content is None on 304 Not Modified
+        """
+        async with self.semaphore:
+            await self.limiter.acquire(url)
+            async with self.session.get(url, headers=conditional_headers(validators)) as response:
+                if response.status == 304:
+                    return None, validators
+                response.raise_for_status()  # Raise error for 4xx/5xx responses
+                return await response.read(), response_validators(response.headers)
+
+    async def get(self, url: str) -> bytes:
+        content, _ = await self.fetch(url)
+        return content
+
+
+class AsyncCrawler(Crawler):
+    """
+    asyncio-based crawl mode: fetches index and law pages concurrently over one
+    pooled session. Output (JSON files and crawler_state.json) is identical to Crawler.
+    """
+
+    def __init__(self, target_list, endpoint, data_folder="data", state_backend="json",
+                 url_cache_ttl: float = 7 * 24 * 3600,
+                 concurrency: int = 8, rate_limit: float = 5.0, burst: int = 1, timeout: float = 15):
+        super().__init__(target_list, endpoint, data_folder=data_folder, state_backend=state_backend,
+                         url_cache_ttl=url_cache_ttl, resolve_workers=concurrency,
+                         rate_limit=rate_limit, burst=burst)
+        self.concurrency = concurrency
+        self.timeout = timeout
+
+    def _run(self):
+        asyncio.run(self.arun())
+
+    async def arun(self):
+        connector = aiohttp.TCPConnector(limit=self.concurrency)
+        timeout = aiohttp.ClientTimeout(total=self.timeout)
+        async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+            fetcher = AsyncFetcher(session, HostRateLimiter(self.rate_limit, self.burst), self.concurrency)
+            for letter in self.target_list:
+                target_url = f"{self.endpoint}/Teilliste_{letter}.html"
+                print(f"Processing subset {letter}...")
+
+                try:
+                    print("Preparing urls")
+                    links = await self.generate_target_urls(fetcher, target_url)
+                except Exception as e:
+                    print(f"Failed to fetch list for {letter}: {e}")
+                    continue
+
+                laws = [
+                    (row["anchor_tags"].get_text().replace("/", "_"), row["full_link"], row["description"])
+                    for _, row in links.iterrows()
+                ]
+                await self.process_laws(fetcher, laws)
+
+    async def process_laws(self, fetcher: AsyncFetcher, laws: list):
+        """
+        Runs process_law for every (title, base_url, main_topic) on `concurrency` workers.
+        A worker starts the next law only when its previous one returned, so at most
+        `concurrency` pages are held at once however long the subset is.
+        """
+        pending = iter(laws)
+        progress = tqdm(total=len(laws), leave=True, desc="Processing")
+
+        async def worker():
+            # The iterator is shared: each law is taken by exactly one worker
+            for title, base_url, main_topic in pending:
+                await self.process_law(fetcher, title, base_url, main_topic)
+                progress.update()
+
+        try:
+            await asyncio.gather(*(worker() for _ in range(min(self.concurrency, len(laws)))))
+        finally:
+            progress.close()
+
+    async def generate_target_urls(self, fetcher: AsyncFetcher, target_url: str):
+        """
+        Async counterpart of url_handler.generate_target_urls.
+        Index pages already in the URL cache are not requested again.
+        Laws whose HTML link cannot be resolved are dropped.
+        """
+        links = parse_target_links(await fetcher.get(target_url))
+
+        async def resolve(link):
+            index_url = index_page_url(link, self.endpoint)
+            href = self.url_cache.get(index_url)
+            if href is None:
+                try:
+                    href = parse_doc_url(await fetcher.get(index_url))
+                except Exception as e:
+                    tqdm.write(f"Error resolving {link}: {e}")
+                    return None
+                if href:
+                    self.url_cache.set(index_url, href)
+            return full_doc_url(link, href, self.endpoint) if href else None
+
+        links["full_link"] = await asyncio.gather(*(resolve(link) for link in links["link"]))
+        self.url_cache.save()
+        return links[links["full_link"].notna()].reset_index(drop=True)
+
+    async def process_law(self, fetcher: AsyncFetcher, title, base_url, main_topic):
+        try:
+            content, validators = await fetcher.fetch(base_url, self.cached_validators(title, base_url))
+            if content is None:
+                return  # 304 Not Modified
+            # Parse off the event loop so other downloads keep progressing
+            sections = await asyncio.to_thread(parse_sections_de, content, base_url)
+            self.store_sections(title, base_url, main_topic, sections, validators)
+        except Exception as e:
+            tqdm.write(f"Error processing {base_url}: {e}")
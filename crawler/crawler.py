@@ -1,7 +1,8 @@
-from .url_handler import generate_target_urls, get_doc_url
-from .extractor import html_extraction_de
+from .url_handler import generate_target_urls, create_session, SyncRateLimiter
+from .extractor import fetch_law_page, parse_sections_de
 from .storage import save_to_json
-from .state_manager import StateManager
+from .state_manager import create_state_manager
+from .url_cache import DocUrlCache
 import os
 import json
 import pandas as pd
@@ -9,14 +10,29 @@ from tqdm import tqdm
 
 
 class Crawler:
-    def __init__(self, target_list, endpoint, data_folder="data"):
+    def __init__(self, target_list, endpoint, data_folder="data", state_backend="json",
+                 url_cache_ttl: float = 7 * 24 * 3600, resolve_workers: int = 8,
+                 rate_limit: float = 5.0, burst: int = 1):
         self.target_list = target_list
         self.endpoint = endpoint
         self.data_folder = data_folder
-        self.state_manager = StateManager(os.path.join(data_folder, "crawler_state.json"))
+        self.state_manager = create_state_manager(os.path.join(data_folder, "crawler_state.json"), state_backend)
+        self.url_cache = DocUrlCache(os.path.join(data_folder, "crawler_url_state.json"), ttl=url_cache_ttl)
+        self.resolve_workers = resolve_workers
+        # Per-host politeness (requests/sec), shared by the resolver threads and the page fetches
+        self.rate_limit = rate_limit
+        self.burst = burst
         os.makedirs(self.data_folder, exist_ok=True)
 
     def run(self):
+        try:
+            self._run()
+        finally:
+            self.state_manager.flush()
+
+    def _run(self):
+        session = create_session(self.resolve_workers)
+        limiter = SyncRateLimiter(self.rate_limit, self.burst)
         for letter in self.target_list:
             target_url = f"{self.endpoint}/Teilliste_{letter}.html"
             print(f"Processing subset {letter}...")
@@ -24,7 +40,9 @@ class Crawler:
             # 取得 URL 清單與描述
             try:
                 print("Preparing urls")
-                links = generate_target_urls(target_url, self.endpoint)
+                links = generate_target_urls(target_url, self.endpoint, session=session,
+                                             cache=self.url_cache, max_workers=self.resolve_workers,
+                                             limiter=limiter)
             except Exception as e:
                 print(f"Failed to fetch list for {letter}: {e}")
                 continue
@@ -33,32 +51,54 @@ class Crawler:
                 title = row["anchor_tags"].get_text().replace("/", "_")
                 base_url = row["full_link"]
                 main_topic = row["description"]
-                json_path = f"{self.data_folder}/{title}.json"
 
                 try:
-                    # 提取資料
-                    sections = html_extraction_de(base_url)
-                    if not sections:
+                    # Conditional GET: a 304 skips download and parsing entirely
+                    limiter.acquire(base_url)
+                    content, validators = fetch_law_page(base_url, self.cached_validators(title, base_url), session)
+                    if content is None:
                         continue
-                    
-                    # Incremental Update Check
-                    # Serialize sections to check for content changes
-                    sections_str = json.dumps(sections, sort_keys=True)
-                    has_changed = self.state_manager.update_state(base_url, sections_str)
-                    
-                    # Save only if changed OR file is missing
-                    if has_changed or not os.path.exists(json_path):
-                        # 儲存資料
-                        save_to_json({
-                            "main_topic": main_topic,
-                            "sections": sections
-                        }, json_path)
-                        action = "Updated" if has_changed else "Restored"
-                        tqdm.write(f"{action}: {title}")
-                    else:
-                        # Skipped
-                        pass
-                        
+
+                    # 提取資料
+                    sections = parse_sections_de(content, base_url)
+                    self.store_sections(title, base_url, main_topic, sections, validators)
                 except Exception as e:
                     tqdm.write(f"Error processing {base_url}: {e}")
                     continue
+
+    def json_path(self, title):
+        return f"{self.data_folder}/{title}.json"
+
+    def cached_validators(self, title, base_url):
+        """
+        HTTP validators to send for base_url. Empty when the JSON file is missing,
+        so that a 304 can never prevent restoring it.
+        """
+        if not os.path.exists(self.json_path(title)):
+            return {}
+        return self.state_manager.get_validators(base_url)
+
+    def store_sections(self, title, base_url, main_topic, sections, validators=None):
+        """
+        Commits the extracted sections of one law: updates the crawler state
+        (content hash and HTTP validators) and writes the JSON file when the
+        content changed or the file is missing.
+        """
+        if not sections:
+            return
+        json_path = self.json_path(title)
+
+        # Incremental Update Check
+        # Serialize sections to check for content changes
+        sections_str = json.dumps(sections, sort_keys=True)
+        has_changed = self.state_manager.update_state(base_url, sections_str, extra=validators)
+
+        # Save only if changed OR file is missing
+        if has_changed or not os.path.exists(json_path):
+            # 儲存資料
+            save_to_json({
+                "main_topic": main_topic,
+                "sections": sections
+            }, json_path)
+            action = "Updated" if has_changed else "Restored"
+            tqdm.write(f"{action}: {title}")
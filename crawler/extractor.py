@@ -2,6 +2,44 @@ import requests
 import pandas as pd
 from bs4 import BeautifulSoup
 from tenacity import retry, wait_exponential, stop_after_attempt
+from .lxml_extractor import parse_sections_lxml
+
+
+def conditional_headers(validators: dict = None) -> dict:
+    """
+    Builds If-None-Match / If-Modified-Since request headers from stored validators.
+    """
+    validators = validators or {}
+    headers = {}
+    if validators.get("etag"):
+        headers["If-None-Match"] = validators["etag"]
+    if validators.get("last_modified"):
+        headers["If-Modified-Since"] = validators["last_modified"]
+    return headers
+
+
+def response_validators(headers) -> dict:
+    """
+    Extracts the ETag / Last-Modified validators of a response.
+    """
+    return {
+        "etag": headers.get("ETag"),
+        "last_modified": headers.get("Last-Modified")
+    }
+
+
+@retry(wait=wait_exponential(multiplier=1, min=4, max=10), stop=stop_after_attempt(3))
+def fetch_law_page(base_url: str, validators: dict = None, session=None):
+    """
+    Conditional GET of a law page.
+    :param session: Optional shared requests.Session
+    :return: (content, validators); content is None when the server answers 304 Not Modified
+    """
+    response = (session or requests).get(base_url, headers=conditional_headers(validators), timeout=15)
+    if response.status_code == 304:
+        return None, validators
+    response.raise_for_status() # Raise error for 4xx/5xx responses
+    return response.content, response_validators(response.headers)
 
 
 @retry(wait=wait_exponential(multiplier=1, min=4, max=10), stop=stop_after_attempt(3))
@@ -11,7 +49,30 @@ def html_extraction_de(base_url: str) -> list:
     """
     response = requests.get(base_url, timeout=15)
     response.raise_for_status() # Raise error for 4xx/5xx responses
-    soup = BeautifulSoup(response.content, 'html.parser')
+    return parse_sections_de(response.content, base_url)
+
+
+def parse_sections_de(content: bytes, base_url: str, engine: str = "lxml") -> list:
+    """
+    Parse the sections of a law page that has already been downloaded.
+    :param content: Raw HTML of the law page
+    :param base_url: URL of the page, used to build the section links
+    :param engine: "lxml" (fast path, falls back to bs4 when lxml is missing or the page
+                   contains markup it cannot reproduce exactly) or "bs4"
+    :return: List of {"section", "content", "link"} dicts
+    """
+    if engine == "lxml":
+        sections = parse_sections_lxml(content, base_url)
+        if sections is not None:
+            return sections
+    return parse_sections_bs4(content, base_url)
+
+
+def parse_sections_bs4(content: bytes, base_url: str) -> list:
+    """
+    Reference BeautifulSoup (html.parser) implementation of parse_sections_de.
+    """
+    soup = BeautifulSoup(content, 'html.parser')
 
     # 尋找所有包含 "jnnorm" class 的 div 標籤，這裡是每個法條的主要容器
     norms = soup.find_all('div', class_='jnnorm')
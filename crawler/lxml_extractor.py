@@ -0,0 +1,122 @@
+"""
+Fast extraction engine for gesetze-im-internet law pages, built on lxml + XPath.
+
+It reproduces `parse_sections_de` (BeautifulSoup + html.parser) byte for byte:
+the page is decoded with the same UnicodeDammit detection, and text is collected
+with the same rules as `get_text(strip=True)` (comments and script/style/template/
+rt/rp strings skipped, every text node stripped individually). Markup that
+libxml2 treats differently from html.parser is not handled here; for such pages
+`parse_sections_lxml` returns None and the caller falls back to BeautifulSoup.
+"""
+import re
+from html.entities import name2codepoint
+
+from bs4 import UnicodeDammit
+
+try:
+    import lxml.html
+except ImportError:  # Optional dependency: without lxml only the BeautifulSoup engine is used
+    lxml = None
+
+# Strings inside these tags are not NavigableStrings in bs4 and are ignored by get_text()
+_SKIP_TEXT_TAGS = {"script", "style", "template", "rt", "rp"}
+# libxml2 normalizes CR/CRLF to LF, html.parser keeps them; CR is parked on a private-use char
+_CR_PLACEHOLDER = "\ue000"
+_XML_DECLARATION = re.compile(r"^\s*<\?xml[^>]*\?>")
+_NAMED_ENTITY = re.compile(r"&([A-Za-z][A-Za-z0-9]*)(;?)")
+_NORM_XPATH = "//div[@class]"
+
+available = lxml is not None
+
+
+def _is_supported(markup: str) -> bool:
+    """
+    Whether libxml2 and html.parser agree on this markup.
+    CDATA sections, entities unknown to HTML 4 and entities without the closing
+    semicolon are decoded differently by the two.
+    """
+    if "<![CDATA[" in markup or _CR_PLACEHOLDER in markup:
+        return False
+    return all(name in name2codepoint and semicolon for name, semicolon in _NAMED_ENTITY.findall(markup))
+
+
+def _collect_text(element, parts: list, skip: bool = False):
+    skip = skip or element.tag in _SKIP_TEXT_TAGS
+    if element.text and not skip:
+        parts.append(element.text)
+    for child in element:
+        # Comments and processing instructions have non-string tags; only their tail is text
+        if isinstance(child.tag, str):
+            _collect_text(child, parts, skip)
+        if child.tail and not skip:
+            parts.append(child.tail)
+
+
+def _get_text(element) -> str:
+    """Equivalent of bs4 Tag.get_text(strip=True)."""
+    parts = []
+    _collect_text(element, parts)
+    stripped = (part.replace(_CR_PLACEHOLDER, "\r").strip() for part in parts)
+    return "".join(part for part in stripped if part)
+
+
+def _has_class(element, class_name: str) -> bool:
+    return class_name in element.get("class", "").split()
+
+
+def _find(element, tag: str, class_name: str = None, attribute: str = None):
+    """Equivalent of bs4 Tag.find(tag, class_=...) / find(tag, {attribute: True})."""
+    for descendant in element.iterdescendants(tag):
+        if class_name and not _has_class(descendant, class_name):
+            continue
+        if attribute and descendant.get(attribute) is None:
+            continue
+        return descendant
+    return None
+
+
+def parse_sections_lxml(content: bytes, base_url: str):
+    """
+    lxml implementation of extractor.parse_sections_de.
+    :return: List of sections, or None if the page needs the BeautifulSoup engine
+    """
+    if lxml is None:
+        return None
+    markup = UnicodeDammit(content, is_html=True).unicode_markup
+    if markup is None or not _is_supported(markup):
+        return None
+    markup = _XML_DECLARATION.sub("", markup).replace("\r", _CR_PLACEHOLDER)
+    if not markup.strip():
+        return []
+    root = lxml.html.document_fromstring(markup)
+
+    sections = []
+    for norm in root.xpath(_NORM_XPATH):
+        if not _has_class(norm, "jnnorm"):
+            continue
+        current_section = None
+        title_tag = _find(norm, "h3")
+        if title_tag is not None:
+            title_span1 = _find(title_tag, "span", class_name="jnenbez")
+            title_span2 = _find(title_tag, "span", class_name="jnentitel")
+            current_section = (_get_text(title_span1) if title_span1 is not None else '') + \
+                ' ' + (_get_text(title_span2) if title_span2 is not None else '')
+
+        content_divs = [div for div in norm.iterdescendants("div") if _has_class(div, "jurAbsatz")]
+        current_content = " ".join([_get_text(div) for div in content_divs])
+
+        anchor_tag = _find(norm, "a", attribute="name")
+        if anchor_tag is not None:
+            anchor_id = anchor_tag.get("name").replace(_CR_PLACEHOLDER, "\r")
+            link = f"{base_url}#{anchor_id}"
+        else:
+            link = None
+        content_for_save = current_content.strip()
+        if (((content_for_save != "") and (content_for_save != "-")) and (link is not None)):
+            sections.append({
+                'section': current_section,
+                'content': content_for_save,
+                'link': link
+            })
+
+    return sections
@@ -0,0 +1,86 @@
+import asyncio
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from tqdm import tqdm
+
+from .async_crawler import AsyncCrawler, AsyncFetcher
+from .extractor import parse_sections_de
+
+
+class PipelineCrawler(AsyncCrawler):
+    """
+    Pipeline crawl mode that decouples network I/O from CPU-bound parsing:
+
+        fetchers (asyncio) -> raw page queue -> extractor processes -> result queue -> single writer
+
+    Both queues are bounded, so a slow stage blocks the one before it. The fetch stage
+    runs on `concurrency` workers (see AsyncCrawler.process_laws), each holding its page
+    until the raw page queue accepts it, so at most concurrency + queue_size + workers
+    raw pages, plus queue_size + 1 extracted results, are held in memory at once.
+    The writer is the only place that touches the StateManager and the JSON files; it
+    runs them on one dedicated thread, so file I/O does not block the event loop and
+    the state manager is never used from two threads at once.
+    """
+
+    def __init__(self, target_list, endpoint, data_folder="data", state_backend="json",
+                 workers: int = None, queue_size: int = 32, **kwargs):
+        super().__init__(target_list, endpoint, data_folder=data_folder, state_backend=state_backend, **kwargs)
+        self.workers = workers or os.cpu_count() or 1
+        self.queue_size = queue_size
+
+    async def arun(self):
+        self._raw_pages = asyncio.Queue(maxsize=self.queue_size)
+        results = asyncio.Queue(maxsize=self.queue_size)
+
+        with ProcessPoolExecutor(max_workers=self.workers) as pool, \
+                ThreadPoolExecutor(max_workers=1, thread_name_prefix="writer") as write_thread:
+            extractors = [asyncio.create_task(self._extract(pool, results)) for _ in range(self.workers)]
+            writer = asyncio.create_task(self._write(write_thread, results))
+            try:
+                await super().arun()
+            finally:
+                # Drain the pipeline stage by stage
+                for _ in extractors:
+                    await self._raw_pages.put(None)
+                await asyncio.gather(*extractors)
+                await results.put(None)
+                await writer
+
+    async def process_law(self, fetcher: AsyncFetcher, title, base_url, main_topic):
+        """
+        Fetch stage: downloads the page and hands the raw bytes to the extractors.
+        Returns only once the page is queued, so the worker fetches nothing new meanwhile.
+        """
+        try:
+            content, validators = await fetcher.fetch(base_url, self.cached_validators(title, base_url))
+        except Exception as e:
+            tqdm.write(f"Error processing {base_url}: {e}")
+            return
+        if content is None:
+            return  # 304 Not Modified
+        # Blocks while the queue is full (backpressure on the fetchers)
+        await self._raw_pages.put((title, base_url, main_topic, content, validators))
+
+    async def _extract(self, pool: ProcessPoolExecutor, results: asyncio.Queue):
+        """Extract stage: one coroutine per worker process keeps it busy."""
+        loop = asyncio.get_running_loop()
+        while (item := await self._raw_pages.get()) is not None:
+            title, base_url, main_topic, content, validators = item
+            try:
+                sections = await loop.run_in_executor(pool, parse_sections_de, content, base_url)
+            except Exception as e:
+                tqdm.write(f"Error processing {base_url}: {e}")
+                continue
+            await results.put((title, base_url, main_topic, sections, validators))
+
+    async def _write(self, write_thread: ThreadPoolExecutor, results: asyncio.Queue):
+        """Write stage: a single writer commits state and JSON files in arrival order."""
+        loop = asyncio.get_running_loop()
+        while (item := await results.get()) is not None:
+            title, base_url, main_topic, sections, validators = item
+            try:
+                await loop.run_in_executor(write_thread, self.store_sections,
+                                           title, base_url, main_topic, sections, validators)
+            except Exception as e:
+                tqdm.write(f"Error processing {base_url}: {e}")
@@ -1,14 +1,40 @@
+import atexit
 import json
 import os
 import hashlib
+import sqlite3
+import threading
+import time
 from typing import Dict
 
+from .storage import atomic_save_json
+
 STATE_FILE = "data/crawler_state.json"
 
 class StateManager:
-    def __init__(self, state_file=STATE_FILE):
+    """
+    Content-hash state backed by a JSON file.
+
+    Writes are batched (write-behind): changes are kept in memory and flushed
+    every `flush_every` updates, after `flush_interval` seconds, on flush()/close()
+    and at interpreter exit. Each flush atomically replaces the file
+    (temp file + rename), so a crash loses at most the last unflushed batch.
+    """
+
+    def __init__(self, state_file=STATE_FILE, flush_every: int = 50, flush_interval: float = 5.0):
         self.state_file = state_file
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
         self.state = self._load_state()
+        self._dirty = set()
+        self._last_flush = time.monotonic()
+        atexit.register(self.flush)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
 
     def _load_state(self) -> Dict:
         if os.path.exists(self.state_file):
@@ -20,9 +46,24 @@ class StateManager:
         return {}
 
     def _save_state(self):
-        os.makedirs(os.path.dirname(self.state_file), exist_ok=True)
-        with open(self.state_file, "w") as f:
-            json.dump(self.state, f, indent=2)
+        atomic_save_json(self.state, self.state_file)
+
+    def flush(self):
+        """Persists all pending changes."""
+        if self._dirty:
+            self._save_state()
+            self._dirty.clear()
+        self._last_flush = time.monotonic()
+
+    def close(self):
+        self.flush()
+        atexit.unregister(self.flush)
+
+    def _mark_dirty(self, key: str):
+        self._dirty.add(key)
+        if (len(self._dirty) >= self.flush_every
+                or time.monotonic() - self._last_flush >= self.flush_interval):
+            self.flush()
 
     def get_hash(self, key: str) -> str:
         return self.state.get(key, {}).get("hash")
@@ -36,19 +77,103 @@ class StateManager:
         old_hash = self.get_hash(key)
         return new_hash == old_hash
 
-    def update_state(self, key: str, content: str):
+    def get_field(self, key: str, field: str, default=None):
+        """
+        Returns an extra field stored with key via update_state(..., extra=...).
+        """
+        return self.state.get(key, {}).get(field, default)
+
+    def drop_field(self, key: str, field: str):
+        """
+        Removes an extra field from the entry of key (no-op if absent).
+        """
+        entry = self.state.get(key, {})
+        if field in entry:
+            self.state[key] = {k: v for k, v in entry.items() if k != field}
+            self._mark_dirty(key)
+
+    def get_validators(self, key: str) -> Dict:
+        """
+        Returns the HTTP cache validators (etag / last_modified) stored for key.
+        """
+        entry = self.state.get(key, {})
+        return {k: entry[k] for k in ("etag", "last_modified") if entry.get(k)}
+
+    def update_state(self, key: str, content: str, extra: Dict = None):
         """
         Updates the state with the new hash of the content.
+        Optional `extra` fields (e.g. HTTP validators) are stored in the same entry.
         Returns True if content has changed (or is new), False otherwise.
         """
         new_hash = hashlib.sha256(content.encode("utf-8")).hexdigest()
         old_hash = self.get_hash(key)
-        
-        if new_hash != old_hash:
-            self.state[key] = {
+        entry = self.state.get(key, {})
+        has_changed = new_hash != old_hash
+
+        if has_changed:
+            entry = {
+                **entry,
                 "hash": new_hash,
                 "last_updated": os.path.getmtime(self.state_file) if os.path.exists(self.state_file) else 0
             }
-            self._save_state()
-            return True # Changed
-        return False # Unchanged
+        if extra and any(entry.get(k) != v for k, v in extra.items()):
+            entry = {**entry, **extra}
+
+        if entry is not self.state.get(key):
+            self.state[key] = entry
+            self._mark_dirty(key)
+        return has_changed # Changed
+
+
+class SQLiteStateManager(StateManager):
+    """
+    Same API as StateManager, persisted in a SQLite database in WAL mode.
+    A flush only writes the changed rows, in a single transaction.
+    The connection may be used from any thread (e.g. the pipeline crawler's writer
+    thread and the atexit flush on the main thread); a lock serializes access.
+    """
+
+    def __init__(self, state_file=STATE_FILE, **kwargs):
+        self._conn = None
+        self._lock = threading.RLock()
+        super().__init__(state_file, **kwargs)
+
+    def _connect(self):
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.state_file) or ".", exist_ok=True)
+            self._conn = sqlite3.connect(self.state_file, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute("CREATE TABLE IF NOT EXISTS state (key TEXT PRIMARY KEY, entry TEXT NOT NULL)")
+        return self._conn
+
+    def _load_state(self) -> Dict:
+        with self._lock:
+            rows = self._connect().execute("SELECT key, entry FROM state").fetchall()
+        return {key: json.loads(entry) for key, entry in rows}
+
+    def _save_state(self):
+        with self._lock, self._connect() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO state (key, entry) VALUES (?, ?)",
+                [(key, json.dumps(self.state[key])) for key in self._dirty]
+            )
+
+    def close(self):
+        super().close()
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+def create_state_manager(state_file: str, backend: str = "json", **kwargs) -> StateManager:
+    """
+    Builds the state manager for the given backend ("json" or "sqlite").
+    For sqlite the file extension of state_file is replaced by ".sqlite".
+    """
+    if backend == "sqlite":
+        return SQLiteStateManager(os.path.splitext(state_file)[0] + ".sqlite", **kwargs)
+    if backend == "json":
+        return StateManager(state_file, **kwargs)
+    raise ValueError(f"Unknown state backend: {backend}")
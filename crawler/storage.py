@@ -1,8 +1,28 @@
 import json
 import os
+import tempfile
 
 
 def save_to_json(data, file_path):
     os.makedirs(os.path.dirname(file_path), exist_ok=True)
     with open(file_path, 'w', encoding='utf-8') as f:
         json.dump(data, f, indent=4, ensure_ascii=False)
+
+
+def atomic_save_json(data, file_path, indent=2):
+    """
+    Writes JSON to a temp file and renames it over file_path, so readers
+    (or a crash) never see a partially written file.
+    """
+    file_dir = os.path.dirname(file_path) or "."
+    os.makedirs(file_dir, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=file_dir, prefix=".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w") as f:
+            json.dump(data, f, indent=indent)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, file_path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
@@ -0,0 +1,46 @@
+import json
+import os
+import time
+from typing import Optional
+
+from .storage import atomic_save_json
+
+URL_CACHE_FILE = "data/crawler_url_state.json"
+
+
+class DocUrlCache:
+    """
+    On-disk cache of index page URL -> HTML page href, with a TTL.
+    The file name contains "state" so the --embedding flow skips it like the other state files.
+    """
+
+    def __init__(self, cache_file=URL_CACHE_FILE, ttl: float = 7 * 24 * 3600):
+        self.cache_file = cache_file
+        self.ttl = ttl
+        self.entries = self._load()
+        self._dirty = False
+
+    def _load(self) -> dict:
+        if os.path.exists(self.cache_file):
+            try:
+                with open(self.cache_file, "r") as f:
+                    return json.load(f)
+            except:
+                return {}
+        return {}
+
+    def get(self, index_url: str) -> Optional[str]:
+        """Returns the cached href, or None if missing or expired."""
+        entry = self.entries.get(index_url)
+        if entry and time.time() - entry["resolved_at"] < self.ttl:
+            return entry["href"]
+        return None
+
+    def set(self, index_url: str, href: str):
+        self.entries[index_url] = {"href": href, "resolved_at": time.time()}
+        self._dirty = True
+
+    def save(self):
+        if self._dirty:
+            atomic_save_json(self.entries, self.cache_file)
+            self._dirty = False
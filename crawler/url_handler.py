@@ -1,29 +1,124 @@
 import requests
 from bs4 import BeautifulSoup
 import pandas as pd
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
 
 
-def get_doc_url(url):
-    response = requests.get(url)
-    soup = BeautifulSoup(response.content, 'html.parser')
+def create_session(pool_size: int = 8) -> requests.Session:
+    """requests.Session whose connection pool can serve pool_size threads at once."""
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+class SyncRateLimiter:
+    """
+    Thread-safe counterpart of async_crawler.HostRateLimiter for the sync crawler:
+    one token bucket per host (`burst` requests at once, refilled at `rate` per second),
+    shared by the index page resolver threads and the law page fetches.
+    A rate <= 0 disables limiting.
+    """
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.capacity = max(1, burst)
+        self._buckets = {}  # host -> (tokens, updated_at)
+        self._lock = threading.Lock()
+
+    def acquire(self, url: str):
+        if self.rate <= 0:
+            return
+        host = urlparse(url).netloc
+        with self._lock:
+            now = time.monotonic()
+            tokens, updated_at = self._buckets.get(host, (self.capacity, now))
+            tokens = min(self.capacity, tokens + (now - updated_at) * self.rate) - 1
+            self._buckets[host] = (tokens, now)
+        # The token is reserved under the lock; a negative balance is the wait until it is refilled
+        if tokens < 0:
+            time.sleep(-tokens / self.rate)
+
+
+def parse_doc_url(content):
+    """
+    從法條索引頁面的 HTML 中找出 HTML 版本的連結
+    :param content: 索引頁面的原始 HTML
+    :return: href 或 None
+    """
+    soup = BeautifulSoup(content, 'html.parser')
 
     # 查找 <abbr> 標籤內含有 "HTML" 的 <a> 標籤
     # 此為我們目標法條的頁面
     a_tag = soup.find('a', text="HTML")
-    time.sleep(0.1)
     if a_tag:
-        href = a_tag['href']
-        return href
-    else:
-        return None
+        return a_tag['href']
+    return None
+
+
+def get_doc_url(url, session=None, limiter: SyncRateLimiter = None):
+    if limiter:
+        limiter.acquire(url)
+    response = (session or requests).get(url, timeout=15)
+    href = parse_doc_url(response.content)
+    if limiter is None:
+        time.sleep(0.1)
+    return href
+
 
+def resolve_doc_urls(index_urls, session=None, cache=None, max_workers: int = 8,
+                     limiter: SyncRateLimiter = None) -> list:
+    """
+    Resolves index page URLs to HTML page hrefs.
+    Cached entries are reused; misses are fetched concurrently and added to the cache.
+    :param limiter: Per-host rate limit shared by all resolver threads
+        (without one, every thread pauses 0.1 s after each request)
+    :return: List of hrefs (None where resolution failed), in the order of index_urls
+    """
+    hrefs = [cache.get(url) if cache else None for url in index_urls]
+    misses = [i for i, href in enumerate(hrefs) if href is None]
 
-def generate_target_urls(target_url, endpoint):
-    response = requests.get(target_url)
-    soup = BeautifulSoup(response.content, 'html.parser')
+    def resolve(url):
+        try:
+            return get_doc_url(url, session, limiter)
+        except Exception as e:
+            print(f"Failed to resolve {url}: {e}")
+            return None
+
+    if misses:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            resolved = executor.map(resolve, [index_urls[i] for i in misses])
+            for i, href in zip(misses, resolved):
+                hrefs[i] = href
+                if cache and href:
+                    cache.set(index_urls[i], href)
+        if cache:
+            cache.save()
+    return hrefs
+
+
+def index_page_url(link, endpoint):
+    """Absolute URL of a law's index page, from its relative link in the Teilliste."""
+    return link.replace("./", endpoint + "/")
+
+
+def full_doc_url(link, doc_href, endpoint):
+    """Absolute URL of a law's HTML page, from its Teilliste link and the resolved href."""
+    return endpoint + "/" + link.split("/")[1] + "/" + doc_href
+
+
+def parse_target_links(content):
+    """
+    解析 Teilliste 頁面，取得法條連結與描述 (尚未解析 HTML 頁面連結)
+    :param content: Teilliste 頁面的原始 HTML
+    :return: DataFrame with columns anchor_tags, link, description
+    """
+    soup = BeautifulSoup(content, 'html.parser')
     anchor_tags = soup.find_all('a')
-    endpoint_replace = endpoint + "/"
 
     links = pd.DataFrame(pd.Series(anchor_tags), columns=["anchor_tags"])
     links = links.iloc[15:-6].reset_index(drop=True)
@@ -31,8 +126,26 @@ def generate_target_urls(target_url, endpoint):
     links["description"] = links["anchor_tags"].apply(
         lambda x: x.abbr.get("title"))
     links = links[~links['link'].str.endswith('.pdf')].reset_index(drop=True)
-    links["full_link"] = links["link"].apply(
-        lambda x: endpoint_replace +
-        x.split("/")[1] + "/" + get_doc_url(x.replace("./", endpoint_replace))
-    )
     return links
+
+
+def generate_target_urls(target_url, endpoint, session=None, cache=None, max_workers: int = 8,
+                         limiter: SyncRateLimiter = None):
+    """
+    :param session: Shared (pooled) requests.Session
+    :param cache: Optional DocUrlCache; laws whose HTML link cannot be resolved are dropped
+    :param max_workers: Concurrent index page requests for cache misses
+    :param limiter: Optional SyncRateLimiter applied to every request
+    """
+    session = session or create_session(max_workers)
+    if limiter:
+        limiter.acquire(target_url)
+    response = session.get(target_url, timeout=15)
+    links = parse_target_links(response.content)
+    hrefs = resolve_doc_urls([index_page_url(x, endpoint) for x in links["link"]],
+                             session, cache, max_workers, limiter)
+    links["full_link"] = [
+        full_doc_url(link, href, endpoint) if href else None
+        for link, href in zip(links["link"], hrefs)
+    ]
+    return links[links["full_link"].notna()].reset_index(drop=True)
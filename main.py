@@ -2,16 +2,9 @@ import sys
 import os
 import argparse
 import json
-import time
 from config.settings import Settings
-from crawler.crawler import Crawler
-from rag.preprocessor import Preprocessor
-from rag.uploader import Uploader
-from rag.gemini_api import GeminiEmbeddingAPI, GeminiLLMAPI
-from pinecone import Pinecone
-from langdetect import detect, detect_langs
-from rich.console import Console
-from rich.panel import Panel
+# Mode-specific modules (crawler, llama_index preprocessor, vector store, Gemini, rich)
+# are imported in main() for the selected modes only, so e.g. a cron crawl never loads the RAG stack.
 
 
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
@@ -22,24 +15,79 @@ def main():
     parser = argparse.ArgumentParser(description="RAG Workflow Manager")
     parser.add_argument("--crawl", action="store_true",
                         help="Activate crawler")
+    parser.add_argument("--crawl-mode", choices=["sync", "async", "pipeline"], default="sync",
+                        help="Crawler engine: serial requests, concurrent asyncio, "
+                             "or asyncio fetchers feeding a process pool of extractors")
     parser.add_argument("--embedding", action="store_true",
                         help="Activate embedding and upload to vector database")
     parser.add_argument("--rerank", action="store_true",
                         help="Activate rerank for RAG")
     parser.add_argument("--rag", action="store_true",
                         help="Run RAG process")
+    parser.add_argument("--dry-run", action="store_true",
+                        help="Load the modules of the selected modes and exit (startup check)")
 
     args = parser.parse_args()
 
     settings = Settings()
+    run_rag = args.rag or not (args.crawl or args.embedding)
+
+    # 先載入所選模式的模組：缺少的依賴在爬蟲或嵌入開始前就會報錯
+    if args.crawl:
+        if args.crawl_mode == "pipeline":
+            from crawler.pipeline_crawler import PipelineCrawler
+        elif args.crawl_mode == "async":
+            from crawler.async_crawler import AsyncCrawler
+        else:
+            from crawler.crawler import Crawler
+    if args.embedding:
+        from rag.preprocessor import Preprocessor
+        from rag.uploader import PipelinedUploader, generate_chunk_id, chunk_fingerprint, diff_chunks
+        from rag.gemini_api import GeminiEmbeddingAPI
+        from rag.embedding_cache import EmbeddingCache, CachedEmbeddingAPI
+        from rag.chunk_state import ChunkState
+        from rag.vector_store import create_vector_store
+        from rag.lexical_index import LexicalIndex
+        from crawler.state_manager import create_state_manager
+    if run_rag:
+        from agent.client import AgentClient, IncompleteStreamError
+        from rich.console import Console
+        from rich.panel import Panel
+    if args.dry_run:
+        print("[INFO] Dry run: modules of the selected modes loaded.")
+        return
     
     # **1. 爬蟲過程**
     if args.crawl:
         print("[INFO] Running crawling process...")
 
         # 初始化並運行爬蟲
-        crawler = Crawler(settings.TARGET_LIST, settings.ENDPOINT,
-                          data_folder=settings.DATA_FOLDER)
+        if args.crawl_mode == "pipeline":
+            crawler = PipelineCrawler(settings.TARGET_LIST, settings.ENDPOINT,
+                                      data_folder=settings.DATA_FOLDER,
+                                      state_backend=settings.STATE_BACKEND,
+                                      url_cache_ttl=settings.DOC_URL_CACHE_TTL,
+                                      workers=settings.CRAWL_WORKERS,
+                                      queue_size=settings.CRAWL_QUEUE_SIZE,
+                                      concurrency=settings.CRAWL_CONCURRENCY,
+                                      rate_limit=settings.CRAWL_RATE_LIMIT,
+                                      burst=settings.CRAWL_BURST)
+        elif args.crawl_mode == "async":
+            crawler = AsyncCrawler(settings.TARGET_LIST, settings.ENDPOINT,
+                                   data_folder=settings.DATA_FOLDER,
+                                   state_backend=settings.STATE_BACKEND,
+                                   url_cache_ttl=settings.DOC_URL_CACHE_TTL,
+                                   concurrency=settings.CRAWL_CONCURRENCY,
+                                   rate_limit=settings.CRAWL_RATE_LIMIT,
+                                   burst=settings.CRAWL_BURST)
+        else:
+            crawler = Crawler(settings.TARGET_LIST, settings.ENDPOINT,
+                              data_folder=settings.DATA_FOLDER,
+                              state_backend=settings.STATE_BACKEND,
+                              url_cache_ttl=settings.DOC_URL_CACHE_TTL,
+                              resolve_workers=settings.CRAWL_CONCURRENCY,
+                              rate_limit=settings.CRAWL_RATE_LIMIT,
+                              burst=settings.CRAWL_BURST)
         crawler.run()
 
     # **2. 嵌入與上傳過程**
@@ -48,17 +96,25 @@ def main():
         print("[INFO] Executing embedding and uploading vectors...")
 
         # 初始化嵌入與上傳模組
-        embedding_api = GeminiEmbeddingAPI(settings.GOOGLE_API_KEY)
+        # Unchanged chunks are served from the local embedding cache
+        embedding_cache = EmbeddingCache(settings.EMBEDDING_CACHE_FILE, settings.EMBEDDING_CACHE_MAX_MB)
+        embedding_api = CachedEmbeddingAPI(GeminiEmbeddingAPI(settings.GOOGLE_API_KEY), embedding_cache)
         preprocessor = Preprocessor(embedding_api)
-        uploader = Uploader(settings.INDEX_NAME, settings.PINECONE_API_KEY)
+        vector_store = create_vector_store(settings, pool_threads=settings.UPLOAD_MAX_IN_FLIGHT)
+        uploader = PipelinedUploader(settings.INDEX_NAME, settings.PINECONE_API_KEY, index=vector_store,
+                                     max_in_flight=settings.UPLOAD_MAX_IN_FLIGHT,
+                                     queue_size=settings.UPLOAD_QUEUE_SIZE)
         
         # State Manager for Incremental Embedding
-        from crawler.state_manager import StateManager
-        embed_state_manager = StateManager(os.path.join(settings.DATA_FOLDER, "embedding_state.json"))
+        embed_state_manager = create_state_manager(
+            settings.EMBEDDING_STATE_FILE, settings.STATE_BACKEND)
+        # Chunk fingerprints live in SQLite so a commit writes only the changed law's rows
+        chunk_state = ChunkState(settings.CHUNK_STATE_FILE)
         
         # progress = uploader.load_progress() # Deprecated by state manager
         # current_count = progress.get("current_count", 0) 
         i = 0
+        files_updated = 0
         
         # 遍歷資料夾處理 JSON 檔案
         for root, dirs, files in os.walk(settings.DATA_FOLDER):
@@ -78,81 +134,101 @@ def main():
 
                     print(f"[INFO] Processing file: {file_path}")
 
-                    # Clean up old vectors for this file before re-uploading
-                    # This prevents zombie chunks if the new content is shorter than the old content
-                    uploader.delete_file_vectors(filename)
-
-                    # 逐筆處理每個 section
+                    # 分塊並以法條 anchor 生成穩定 ID
                     main_topic = data.get('main_topic', 'Unknown')
-                    prev_index = 0
-                    batch_vectors = []
-                    
-                    for sec_id, section_data in enumerate(data.get('sections', [])):
+                    chunks = {}
+                    for section_data in data.get('sections', []):
                         section = section_data.get('section', '')
-                        content = section_data.get('content', '')
                         link = section_data.get('link', '')
 
-                        # 嵌入並分塊
-                        processed_data = preprocessor.process_text(content)
-                        for chunk_index, item in enumerate(processed_data):
-                            # 生成符合 Pinecone 格式的物件
-                            from rag.uploader import generate_ascii_id
-                            vector_id = generate_ascii_id(main_topic, prev_index)
-                            
-                            vector_item = {
-                                "id": vector_id,
-                                "values": item["embedding"],
-                                "metadata": {
-                                    "main_topic": main_topic if main_topic else "Unknown",
-                                    "section_title": section if section else "",
-                                    "content": item["chunk"] if item["chunk"] else "",
-                                    "link": link if link else "",
-                                    "filename": filename
-                                }
+                        for chunk_index, chunk in enumerate(preprocessor.split_text(section_data.get('content', ''))):
+                            vector_id = generate_chunk_id(filename, link, chunk_index)
+                            # Duplicate anchors on one page get a suffix to keep IDs unique
+                            suffix = 1
+                            while vector_id in chunks:
+                                vector_id = generate_chunk_id(filename, link, f"{chunk_index}_{suffix}")
+                                suffix += 1
+                            chunks[vector_id] = {
+                                "main_topic": main_topic if main_topic else "Unknown",
+                                "section_title": section if section else "",
+                                "content": chunk if chunk else "",
+                                "link": link if link else "",
+                                "filename": filename
                             }
-                            batch_vectors.append(vector_item)
-                            
-                            # 當 Batch 滿 100 就上傳
-                            if len(batch_vectors) >= 100:
-                                uploader.upload_batch(batch_vectors)
-                                print(f"[INFO] Batch upload complete ({len(batch_vectors)} vectors)")
-                                batch_vectors = []
-                                
-                            prev_index += 1
-                        
-                        time.sleep(0.01) # Small delay to avoid API burst limits
-                    
-                    # 上傳該檔案剩餘的向量
-                    if batch_vectors:
-                        uploader.upload_batch(batch_vectors)
-                        print(f"[INFO] Final batch for {filename} uploaded.")
-                        
-                    # Commit State (Transaction End)
+
+                    # Chunk-level diff against the previous embedding state
+                    fingerprints = {vid: chunk_fingerprint(metadata) for vid, metadata in chunks.items()}
+                    previous = chunk_state.get(filename)
+                    if previous is None:
+                        # Record of an earlier run, kept in the embedding state
+                        previous = embed_state_manager.get_field(filename, "chunks")
+                    # No chunk record yet (new file or legacy positional IDs): upsert every chunk,
+                    # then drop the file's other vectors
+                    rebuild = previous is None
+                    if rebuild:
+                        previous = {}
+                    changed_ids, removed_ids = diff_chunks(previous, fingerprints)
+                    print(f"[INFO] {filename}: {len(changed_ids)} added/changed, "
+                          f"{len(removed_ids)} removed, {len(chunks) - len(changed_ids)} unchanged chunks")
+
+                    # 只嵌入並上傳新增或變更的 chunk：每嵌入 100 個就送出上傳，
+                    # 上傳在背景進行，同時嵌入下一批
+                    for start in range(0, len(changed_ids), 100):
+                        batch_ids = changed_ids[start:start + 100]
+                        embeddings = embedding_api.embed_batch([chunks[vid]["content"] for vid in batch_ids])
+                        # 生成符合 Pinecone 格式的物件
+                        batch_vectors = [
+                            {"id": vector_id, "values": values, "metadata": chunks[vector_id]}
+                            for vector_id, values in zip(batch_ids, embeddings)
+                        ]
+                        uploader.submit_batch(batch_vectors)
+
+                    # Barrier: all upserts of this file must succeed before anything is deleted or committed
+                    uploader.flush()
+                    if changed_ids:
+                        print(f"[INFO] Upload complete for {filename} ({len(changed_ids)} vectors)")
+
+                    # Removed chunks are deleted only after the upserts, so queries never see a half-empty law
+                    if rebuild:
+                        uploader.delete_file_vectors(filename, keep=set(chunks))
+                    elif removed_ids:
+                        uploader.delete_vectors(removed_ids)
+
+                    # Commit State (Transaction End): chunk record first, so a crash in between only
+                    # re-diffs the file on the next run
+                    chunk_state.put(filename, fingerprints)
+                    embed_state_manager.drop_field(filename, "chunks")
                     embed_state_manager.update_state(filename, content_str)
+                    files_updated += 1
+
+        # Flush batched state writes
+        uploader.close()
+        vector_store.close()
+        embed_state_manager.close()
+        chunk_state.close()
+        print(f"[INFO] Embedding cache: {embedding_cache.report()}")
+        embedding_cache.close()
+
+        # BM25 index for hybrid retrieval (rebuilt only when a law file changed)
+        if files_updated or LexicalIndex.open(settings.LEXICAL_INDEX_DIR) is None:
+            LexicalIndex.build(settings.DATA_FOLDER, settings.LEXICAL_INDEX_DIR)
 
     # **3. RAG 流程**
-    if args.rag or not (args.crawl or args.embedding):
+    if run_rag:
         # if args.rag or not (args.crawl or args.embedding):
+        # Thin client: the agent runs in agent.service (python -m agent.service)
         print("[INFO] Running RAG...")
-        pc = Pinecone(api_key=settings.PINECONE_API_KEY)
-        index = pc.Index(
-            host=settings.PINECONE_HOST)
-
-        llm = GeminiLLMAPI(
-            api_key=settings.GOOGLE_API_KEY,
-            model="models/gemini-2.0-flash-exp",
-            system_instruction="You are a law advisor. We will provide relevant material to the questions,\
-                                please answer based on the documents and following the instructions.\
-                                Don't do extra inference if the documents don't specify.\
-                                Don't talk too much about how you search the documents, but saying 'consult professional lawyers'\
-                                Don't say 'from documents' but directly answer the question with the information provided.\
-                                Extra information could be provided if they are mentioned in the documents. \
-                                Also specify which law you are referencing"
-        )
-        embedding_api = GeminiEmbeddingAPI(settings.GOOGLE_API_KEY)
+        client = AgentClient(settings.AGENT_SERVICE_URL)
+        try:
+            print(f"[INFO] Agent service at {client.base_url}: {client.health()['status']}")
+        except Exception as e:
+            print(f"[ERROR] Agent service not reachable at {client.base_url} ({e}). "
+                  f"Start it with: python -m agent.service")
+            return
 
         console = Console()
-        # **執行 Rerank（如果啟用）**
+        history = []
+        user_language = ""
         while True:
             user_input = input(
                 "Please enter your question ('lang' for language setting or 'exit' to quit): ")
@@ -162,54 +238,39 @@ def main():
                 user_language = input(
                     "Enter which language you want to use for the answer (en, zh, zh-tw etc.) :")
                 continue
-            if user_language == "":
-                user_language = "de"
-            # (a) 翻譯使用者問題到目標語言
-            translation_prompt = (
-                f"Translate the following text to de:\n\n"
-                f"{user_input}\n\n"
-                "Only provide the translated text in de."
-            )
-            translated_input = llm.generate_response(translation_prompt)
-            vector = embedding_api.embed_text(translated_input)
-            # (b) Query Engine 查詢
-            response = index.query(
-                vector=vector,
-                top_k=10,
-                include_values=True,
-                include_metadata=True
-            )
-
-            # (d) 整理結果
-            matches = response["matches"]
-
-            # 假設我們把所有相似節點的內容都串起來
-            retrieved_text = ""
-            links = []
-            for match in matches:
-                meta = match.get("metadata", {})
-                # 如果你在 metadata 裏存了原始文本
-                chunk_content = meta.get("content", "")
-                links.append(meta.get("link", ""))
-                retrieved_text += chunk_content + "\n"
-
-            # (e) 將回答翻譯回使用者原始語言
-
-            answer_translation_prompt = (
-                f"Translate the following text to the same language as the user's original question.\n\n"
-                f"User's Original Question:\n{user_input}\n\n"
-                f"Supporting documents:\n{retrieved_text}\n\n"
-                f"Only provide the answer related to the question in {user_language}."
-            )
-            translated_answer = llm.generate_response(
-                answer_translation_prompt)
-            # ------------------------------------------------------------
-            # 4. 輸出結果
-            # ------------------------------------------------------------
+            question = user_input
+            if user_language:
+                question = f"STRICT INSTRUCTION: Respond only in {user_language}.\n\n{user_input}"
+
+            # (a) 串流回答
+            answer, result = "", None
+            try:
+                for kind, chunk in client.stream(history + [{"role": "user", "content": question}]):
+                    if kind == "token":
+                        answer += chunk
+                        console.print(chunk, end="")
+                    else:
+                        result = chunk
+            except IncompleteStreamError as e:
+                if not answer:
+                    console.print(f"\n[ERROR] {e}")
+                    continue
+                # Keep the partial answer; sources only come with the final event
+                console.print(f"\n[WARNING] {e}")
+                result = {"answer": answer, "documents": []}
+            except Exception as e:
+                console.print(f"\n[ERROR] {e}")
+                continue
+            console.print()
+
+            history.append({"role": "user", "content": user_input})
+            history.append({"role": "assistant", "content": result["answer"]})
+
+            # (b) 輸出來源（回答已串流輸出）
+            links = list(dict.fromkeys(doc.get("metadata", {}).get("link", "") for doc in result["documents"]))
             output_data = {
-                "Original Question": user_input,
-                "Translated Question": translated_input,
-                "Translated Answer": translated_answer
+                "Question": user_input,
+                "Sources": "\n".join(link for link in links if link) or "-",
             }
             for key, value in output_data.items():
                 panel = Panel(value, title=key, expand=False)
@@ -1,3 +1,14 @@
+import uuid
+
+import streamlit as st
+from PIL import Image
+
+from config.settings import Settings
+# Thin client only: the LangGraph agent and its Gemini / retrieval clients live in
+# agent.service, so a fresh Streamlit worker does not import them
+from agent.client import AgentClient, IncompleteStreamError
+from utils.storage import load_sessions, save_sessions
+
 # UI Text Dictionary (i18n)
 UI_TEXTS = {
     "en": {
@@ -69,7 +80,32 @@ UI_TEXTS = {
 st.set_page_config(page_title="LawGPT", page_icon="⚖️", layout="wide")
 
 def init_session():
-# ... (init_session, create_new_chat, delete_chat implementations remain same) ...
+    """Loads the saved chats once per browser session and selects one."""
+    if "sessions" not in st.session_state:
+        st.session_state.sessions = load_sessions()
+    if not st.session_state.sessions:
+        create_new_chat()
+    if st.session_state.get("current_session_id") not in st.session_state.sessions:
+        # Most recent chat (sessions keep their creation order)
+        st.session_state.current_session_id = list(st.session_state.sessions.keys())[-1]
+
+
+def create_new_chat():
+    session_id = uuid.uuid4().hex
+    st.session_state.sessions[session_id] = {"title": "New Chat", "messages": []}
+    st.session_state.current_session_id = session_id
+    save_sessions(st.session_state.sessions)
+
+
+def delete_chat(session_id: str):
+    st.session_state.sessions.pop(session_id, None)
+    if not st.session_state.sessions:
+        # Always keep one chat to show
+        create_new_chat()
+        return
+    st.session_state.current_session_id = list(st.session_state.sessions.keys())[-1]
+    save_sessions(st.session_state.sessions)
+
 
 def main():
     settings = Settings()
@@ -151,19 +187,9 @@ def main():
     if current_session["title"] != "New Chat":
         st.caption(f"Current: {current_session['title']}")
 
-    # Initialize components (Cached)
-    if "retriever" not in st.session_state:
-        st.session_state.retriever = Retriever()
-    if "llm" not in st.session_state:
-        st.session_state.llm = GeminiLLMAPI(
-            api_key=settings.GOOGLE_API_KEY,
-            model=settings.DEFAULT_LLM_MODEL,
-            system_instruction=(
-                "You are an expert German legal advisor. "
-                "Your primary knowledge source is the German Civil Code (BGB). "
-                "Regardless of the input language, you MUST respond in the language specified by the user in the prompt."
-            )
-        )
+    # Agent service client (the graph and its clients live in agent.service)
+    if "agent_client" not in st.session_state:
+        st.session_state.agent_client = AgentClient(settings.AGENT_SERVICE_URL)
 
     # Display Chat History
     for msg in messages:
@@ -203,80 +229,76 @@ def main():
             if settings.GEMINI_RATE_LIMIT_DELAY > 0:
                 st.caption("🐢 Free Tier Mode: Slowed down to avoid rate limits.")
                 
-            with st.spinner(T["analyzing"]):
+            # Placeholder until the first token arrives, then the answer renders as it streams
+            response_placeholder = st.empty()
+            response_placeholder.markdown(f"_{T['analyzing']}_")
+            try:
+                # History (role / content only; images are not sent to the agent)
+                history_messages = [{"role": msg["role"], "content": msg["content"]} for msg in messages]
+                
+                # Prepare Input
+                enhanced_prompt = f"STRICT INSTRUCTION: Respond only in {user_language}.\n\n{prompt}"
+                input_messages = history_messages[:-1] 
+                input_messages.append({"role": "user", "content": enhanced_prompt})
+                
+                # Stream from the agent service: tokens while the answer is generated, then the result
+                response_text = ""
                 try:
-                    # History Conversion
-                    history_messages = []
-                    for msg in messages:
-                        if msg["role"] == "user":
-                            history_messages.append(HumanMessage(content=msg["content"]))
-                        elif msg["role"] == "assistant":
-                            history_messages.append(AIMessage(content=msg["content"]))
-                    
-                    # Prepare Input
-                    enhanced_prompt = f"STRICT INSTRUCTION: Respond only in {user_language}.\n\n{prompt}"
-                    input_messages = history_messages[:-1] 
-                    input_messages.append(HumanMessage(content=enhanced_prompt))
-                    
-                    initial_state = {
-                        "messages": input_messages,
-                        "documents": [] 
-                    }
-                    
-                    # Invoke Graph
-                    final_state = app.invoke(initial_state)
-                    
-                    # Extract Response
-                    new_messages = final_state['messages'][len(input_messages):] 
-                    response_text = "..."
-                    for m in reversed(new_messages):
-                        if isinstance(m, AIMessage):
-                            response_text = m.content
-                            break
-                    
-                    st.markdown(response_text)
-                    
-                    # Source Preview
-                    unique_sources = {}
-                    for msg in new_messages:
-                        if isinstance(msg, ToolMessage):
-                            try:
-                                docs = json.loads(msg.content)
-                                if isinstance(docs, list):
-                                    for doc in docs:
-                                        meta = doc.get('metadata', {})
-                                        link = meta.get('link', 'Unknown')
-                                        if link not in unique_sources:
-                                            unique_sources[link] = meta
-                            except:
-                                pass
-                    
-                    if unique_sources:
-                        with st.expander(T["source_preview"]):
-                            for link, meta in unique_sources.items():
-                                title = meta.get('section_title', 'Legal Document')
-                                content = meta.get('content', 'No content available.')
-                                st.markdown(f"**{title}**")
-                                st.caption(f"Source: {link}")
-                                st.text(content)
-                                st.divider()
+                    for kind, chunk in st.session_state.agent_client.stream(input_messages):
+                        if kind == "token":
+                            response_text += chunk
+                            response_placeholder.markdown(response_text + "▌")
+                        else:
+                            result = chunk
+                except IncompleteStreamError:
+                    if not response_text:
+                        raise
+                    # Keep what was streamed; sources only come with the final event
+                    result = {"answer": response_text, "documents": []}
+                    st.caption("⚠️ The answer may be incomplete (connection to the agent service lost).")
+                
+                # Extract Response
+                response_text = result["answer"] or response_text or "..."
+                response_placeholder.markdown(response_text)
+                
+                # Source Preview
+                unique_sources = {}
+                for doc in result["documents"]:
+                    meta = doc.get('metadata', {})
+                    link = meta.get('link', 'Unknown')
+                    if link not in unique_sources:
+                        unique_sources[link] = meta
+                
+                if unique_sources:
+                    with st.expander(T["source_preview"]):
+                        for link, meta in unique_sources.items():
+                            title = meta.get('section_title', 'Legal Document')
+                            content = meta.get('content', 'No content available.')
+                            st.markdown(f"**{title}**")
+                            st.caption(f"Source: {link}")
+                            st.text(content)
+                            st.divider()
+
+                # Disclaimer (From UI Text)
+                st.warning(T["disclaimer"], icon="⚠️")
+                
+                # Graph Visualization
+                if show_graph:
+                    with st.expander(T["graph_expander"]):
+                        try:
+                            graph_image = st.session_state.agent_client.graph_png()
+                            st.image(graph_image, caption="Agent Execution Path")
+                        except:
+                            st.info("Graph visualization unavailable.")
+
+                # Save
+                messages.append({"role": "assistant", "content": response_text})
+                save_sessions(st.session_state.sessions)
+                
+            except Exception as e:
+                error_msg = f"{T['error_prefix']}{str(e)}"
+                st.error(error_msg)
 
-                    # Disclaimer (From UI Text)
-                    st.warning(T["disclaimer"], icon="⚠️")
-                    
-                    # Graph Visualization
-                    if show_graph:
-                        with st.expander(T["graph_expander"]):
-                            try:
-                                graph_image = app.get_graph().draw_mermaid_png()
-                                st.image(graph_image, caption="Agent Execution Path")
-                            except:
-                                st.info("Graph visualization unavailable.")
 
-                    # Save
-                    messages.append({"role": "assistant", "content": response_text})
-                    save_sessions(st.session_state.sessions)
-                    
-                except Exception as e:
-                    error_msg = f"{T['error_prefix']}{str(e)}"
-                    st.error(error_msg)
\ No newline at end of file
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+import json
+import os
+
+import numpy as np
+
+
+class IVFIndex:
+    """
+    Inverted-file (IVF-Flat) approximate nearest-neighbour index over the rows of a LocalVectorStore.
+
+    - ivf_centroids.npy: spherical k-means centroids (n_lists x dimension), memory-mapped on load
+    - ivf_assign.i32: inverted list of every store slot (-1 = empty), memory-mapped
+    A query scores the centroids, then only the rows of the nprobe closest lists;
+    nprobe trades recall for latency. Inserts and deletes only update the
+    assignment of the affected slots. The index is (re)trained once the store
+    holds enough vectors, and again after it has grown retrain_factor times.
+    """
+
+    CENTROID_FILE = "ivf_centroids.npy"
+    ASSIGN_FILE = "ivf_assign.i32"
+    META_FILE = "ivf.json"
+
+    def __init__(self, path: str, dimension: int, n_lists: int = 256, nprobe: int = 16,
+                 retrain_factor: float = 4.0, seed: int = 0):
+        self.path = path
+        self.dimension = dimension
+        self.n_lists = n_lists
+        self.nprobe = nprobe
+        self.retrain_factor = retrain_factor
+        self.rng = np.random.default_rng(seed)
+        self.capacity = 0
+        self.assign = None
+        self.centroids = None
+        self.trained_size = 0
+
+        meta_file = os.path.join(path, self.META_FILE)
+        centroid_file = os.path.join(path, self.CENTROID_FILE)
+        if os.path.exists(meta_file) and os.path.exists(centroid_file):
+            with open(meta_file, "r") as f:
+                meta = json.load(f)
+            if meta.get("n_lists") == n_lists and meta.get("dimension") == dimension:
+                self.centroids = np.load(centroid_file, mmap_mode="r")
+                self.trained_size = meta["trained_size"]
+
+    @property
+    def trained(self) -> bool:
+        return self.centroids is not None
+
+    @property
+    def min_train_size(self) -> int:
+        # k-means needs a few dozen points per list
+        return self.n_lists * 39
+
+    def needs_training(self, count: int) -> bool:
+        if not self.trained:
+            return count >= self.min_train_size
+        return count >= self.trained_size * self.retrain_factor
+
+    def resize(self, capacity: int):
+        """Grows the assignment file along with the vector matrix; new slots are unassigned."""
+        if capacity <= self.capacity:
+            return
+        assign_file = os.path.join(self.path, self.ASSIGN_FILE)
+        existing = os.path.getsize(assign_file) // 4 if os.path.exists(assign_file) else 0
+        if self.assign is not None:
+            self.assign.flush()
+            self.assign = None
+        with open(assign_file, "ab") as f:
+            f.truncate(max(capacity, existing) * 4)
+        self.capacity = max(capacity, existing)
+        self.assign = np.memmap(assign_file, dtype=np.int32, mode="r+", shape=(self.capacity,))
+        if existing < self.capacity:
+            self.assign[existing:] = -1
+        if not self.trained:
+            self.assign[:] = -1
+
+    def train(self, vectors: np.ndarray, slots: np.ndarray, iterations: int = 10):
+        """
+        Spherical k-means on a sample of the (normalized) rows, then assigns every row.
+        :param vectors: The store's vector matrix
+        :param slots: Live slots
+        """
+        sample_size = min(len(slots), self.n_lists * 256)
+        sample = np.sort(self.rng.choice(slots, sample_size, replace=False))
+        data = np.asarray(vectors[sample])
+        centroids = data[self.rng.choice(sample_size, self.n_lists, replace=False)].copy()
+
+        for _ in range(iterations):
+            labels = np.argmax(data @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, labels, data)
+            counts = np.bincount(labels, minlength=self.n_lists)
+            empty = counts == 0
+            # Re-seed empty lists with random points
+            sums[empty] = data[self.rng.choice(sample_size, int(empty.sum()), replace=False)]
+            norms = np.linalg.norm(sums, axis=1, keepdims=True)
+            centroids = sums / np.where(norms == 0, 1, norms)
+
+        # Written next to the old file and swapped in: other processes may have the old one mapped
+        centroid_file = os.path.join(self.path, self.CENTROID_FILE)
+        np.save(centroid_file + ".tmp.npy", centroids.astype(np.float32))
+        os.replace(centroid_file + ".tmp.npy", centroid_file)
+        self.centroids = np.load(centroid_file, mmap_mode="r")
+        self.trained_size = len(slots)
+        with open(os.path.join(self.path, self.META_FILE), "w") as f:
+            json.dump({"n_lists": self.n_lists, "dimension": self.dimension,
+                       "trained_size": self.trained_size}, f)
+
+        self.assign[:] = -1
+        self.add(slots, vectors)
+
+    def add(self, slots, vectors: np.ndarray, chunk_size: int = 65536):
+        """Assigns slots to their nearest list (no-op before training)."""
+        if not self.trained:
+            return
+        slots = np.asarray(slots, dtype=np.int64)
+        for start in range(0, len(slots), chunk_size):
+            part = slots[start:start + chunk_size]
+            self.assign[part] = np.argmax(np.asarray(vectors[part]) @ self.centroids.T, axis=1)
+
+    def remove(self, slots):
+        self.assign[np.asarray(slots, dtype=np.int64)] = -1
+
+    def candidates(self, query: np.ndarray, size: int, nprobe: int = None) -> np.ndarray:
+        """
+        :param query: Normalized query vector
+        :param size: Number of used slots in the store
+        :return: Slots in the nprobe lists closest to the query
+        """
+        nprobe = min(nprobe or self.nprobe, self.n_lists)
+        centroid_scores = self.centroids @ query
+        lists = np.argpartition(-centroid_scores, nprobe - 1)[:nprobe]
+        return np.flatnonzero(np.isin(self.assign[:size], lists))
+
+    def flush(self):
+        if self.assign is not None:
+            self.assign.flush()
@@ -1,4 +1,6 @@
+import asyncio
 from abc import ABC, abstractmethod
+from typing import AsyncIterator, Iterator
 
 
 class BaseEmbeddingAPI(ABC):
@@ -14,6 +16,26 @@ class BaseEmbeddingAPI(ABC):
         """
         pass
 
+    def embed_batch(self, texts: list) -> list:
+        """
+        批次嵌入多段文本（預設逐一呼叫 embed_text，子類別可覆寫以減少請求次數）
+        :param texts: 要嵌入的文本列表
+        :return: 向量列表，順序與 texts 相同
+        """
+        return [self.embed_text(text) for text in texts]
+
+    async def aembed_text(self, text: str) -> list:
+        """
+        embed_text 的非同步版本（預設在 thread pool 執行，子類別可覆寫為原生 async）
+        """
+        return await asyncio.to_thread(self.embed_text, text)
+
+    async def aembed_batch(self, texts: list) -> list:
+        """
+        embed_batch 的非同步版本（預設在 thread pool 執行，子類別可覆寫為原生 async）
+        """
+        return await asyncio.to_thread(self.embed_batch, texts)
+
 
 class BaseLLMAPI(ABC):
     """
@@ -28,3 +50,24 @@ class BaseLLMAPI(ABC):
         :return: 模型生成的回答
         """
         pass
+
+    def stream_response(self, prompt, images=None) -> Iterator[str]:
+        """
+        逐段產生回答（預設一次回傳完整回答，支援串流的子類別可覆寫）
+        :param prompt: 提示詞
+        :param images: 選用的圖片
+        :return: 文字片段的 iterator，串接後即為完整回答
+        """
+        yield self.generate_response(prompt, images)
+
+    async def agenerate_response(self, prompt, images=None) -> str:
+        """
+        generate_response 的非同步版本（預設在 thread pool 執行，子類別可覆寫為原生 async）
+        """
+        return await asyncio.to_thread(self.generate_response, prompt, images)
+
+    async def astream_response(self, prompt, images=None) -> AsyncIterator[str]:
+        """
+        stream_response 的非同步版本（預設一次回傳 agenerate_response 的完整回答）
+        """
+        yield await self.agenerate_response(prompt, images)
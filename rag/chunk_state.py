@@ -0,0 +1,63 @@
+import os
+import sqlite3
+
+
+class ChunkState:
+    """
+    Per-chunk fingerprints of every embedded law, {vector_id: fingerprint} per file.
+
+    Kept in its own SQLite table (WAL) instead of the embedding state: with one
+    row per chunk, committing a law only rewrites that law's rows, whereas the
+    JSON state backend rewrites the whole file on every flush.
+    A file without a record has never been embedded with stable chunk IDs.
+    """
+
+    def __init__(self, state_file: str):
+        self.state_file = state_file
+        os.makedirs(os.path.dirname(state_file) or ".", exist_ok=True)
+        self.conn = sqlite3.connect(state_file)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS files (filename TEXT PRIMARY KEY)")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS chunks ("
+            "filename TEXT NOT NULL, vector_id TEXT NOT NULL, fingerprint TEXT NOT NULL, "
+            "PRIMARY KEY (filename, vector_id))"
+        )
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def get(self, filename: str):
+        """
+        :param filename: JSON 檔案名稱
+        :return: {vector_id: fingerprint}，若該檔案尚無紀錄則回傳 None
+        """
+        if self.conn.execute("SELECT 1 FROM files WHERE filename = ?", (filename,)).fetchone() is None:
+            return None
+        rows = self.conn.execute("SELECT vector_id, fingerprint FROM chunks WHERE filename = ?", (filename,))
+        return dict(rows.fetchall())
+
+    def put(self, filename: str, fingerprints: dict):
+        """
+        Replaces the record of a file in one transaction; only changed rows are written.
+        :param fingerprints: 新版本的 {vector_id: fingerprint}
+        """
+        previous = self.get(filename) or {}
+        with self.conn:
+            self.conn.execute("INSERT OR IGNORE INTO files (filename) VALUES (?)", (filename,))
+            self.conn.executemany(
+                "DELETE FROM chunks WHERE filename = ? AND vector_id = ?",
+                [(filename, vid) for vid in previous if vid not in fingerprints]
+            )
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO chunks (filename, vector_id, fingerprint) VALUES (?, ?, ?)",
+                [(filename, vid, fingerprint) for vid, fingerprint in fingerprints.items()
+                 if previous.get(vid) != fingerprint]
+            )
+
+    def close(self):
+        self.conn.close()
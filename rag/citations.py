@@ -0,0 +1,63 @@
+import re
+from collections import namedtuple
+
+Citation = namedtuple("Citation", ["code", "section"])
+
+# "§ 2247", "§§ 573c", "Art. 1 Abs. 1 Satz 2", "Artikel 3", "Paragraph 242", "section 823 para. 1"
+_REFERENCE_RE = re.compile(
+    r"(?:§§?|\bart(?:ikel|icle|\.)?|\bparagra(?:ph|f)\b|\bsection\b)\s*(\d+)\s?([a-z]?)\b"
+    r"(?:\s*(?:abs(?:atz|\.)?|satz|s\.|nr\.?|ziff(?:er|\.)?|para(?:graph)?\.?|sentence|no\.?)\s*\d+[a-z]?\b)*",
+    re.IGNORECASE)
+# Section number at the start of a section heading ("§ 2247 Eigenhändiges Testament", "Art 1 ")
+_HEADING_RE = re.compile(r"^\s*(?:§§?|art(?:ikel|\.)?)\s*(\d+)\s?([a-z]?)\b", re.IGNORECASE)
+_WORD_RE = re.compile(r"[^\W_][\w\-]*")
+_CONNECTORS = {"des", "der", "im", "in", "of", "the"}
+_FOLD = str.maketrans({"ä": "ae", "ö": "oe", "ü": "ue", "ß": "ss"})
+
+
+def normalize_code(code: str) -> str:
+    """Law abbreviation key: "BGB" / "bgb" -> "bgb", "BImSchG" -> "bimschg"."""
+    return re.sub(r"[^a-z0-9]", "", code.lower().translate(_FOLD))
+
+
+def heading_section(title: str):
+    """:return: Normalized section number of a section heading, or None (e.g. "Eingangsformel")"""
+    match = _HEADING_RE.match(title or "")
+    return (match.group(1) + match.group(2)).lower() if match else None
+
+
+def _code_after(text: str, position: int, codes: set):
+    """Law abbreviation following a reference ("§ 2247 BGB", "Art. 1 des GG"): (code, end) or None."""
+    for word in _WORD_RE.finditer(text, position):
+        code = normalize_code(word.group())
+        if code in codes:
+            return code, word.end()
+        if word.group().lower() not in _CONNECTORS:
+            return None
+    return None
+
+
+def find_citations(text: str, codes: set) -> list:
+    """
+    Finds statute citations (§/Art. + number + law abbreviation) in free text.
+    :param codes: Known normalized law abbreviations (references to unknown codes are ignored)
+    :return: [(Citation(code, section), start, end)], where the span includes the abbreviation
+    """
+    citations = []
+    for match in _REFERENCE_RE.finditer(text):
+        section = (match.group(1) + match.group(2)).lower()
+        start, end = match.span()
+        after = _code_after(text, end, codes)
+        if after:
+            citations.append((Citation(after[0], section), start, after[1]))
+            continue
+        # "BGB § 2247"
+        before = list(_WORD_RE.finditer(text, 0, start))
+        if before and normalize_code(before[-1].group()) in codes:
+            citations.append((Citation(normalize_code(before[-1].group()), section), before[-1].start(), end))
+    return citations
+
+
+def parse_citations(text: str, codes: set) -> list:
+    """:return: Unique Citation(code, section) tuples in order of appearance"""
+    return list(dict.fromkeys(citation for citation, _, _ in find_citations(text, codes)))
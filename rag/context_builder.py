@@ -0,0 +1,142 @@
+import math
+
+# Shortest suffix/prefix overlap (characters) treated as a chunk overlap rather than coincidence
+MIN_OVERLAP = 20
+
+
+class TokenCounter:
+    """
+    Fast local token counts with tiktoken. Gemini uses its own tokenizer, so counts
+    are an approximation that is close enough for budgeting. If the encoding is not
+    available (tiktoken downloads it on first use), falls back to ~4 characters per token.
+    """
+
+    CHARS_PER_TOKEN = 4
+
+    def __init__(self, encoding: str = "cl100k_base"):
+        try:
+            import tiktoken
+            self.encoding = tiktoken.get_encoding(encoding)
+        except Exception as e:
+            print(f"[WARNING] tiktoken encoding {encoding} unavailable ({type(e).__name__}), "
+                  f"estimating {self.CHARS_PER_TOKEN} characters per token.")
+            self.encoding = None
+
+    def count(self, text: str) -> int:
+        if self.encoding is None:
+            return math.ceil(len(text) / self.CHARS_PER_TOKEN)
+        return len(self.encoding.encode(text, disallowed_special=()))
+
+    def truncate(self, text: str, max_tokens: int, suffix: str = "...") -> str:
+        """Cuts text to at most max_tokens (plus suffix), at a word boundary where possible."""
+        if self.count(text) <= max_tokens:
+            return text
+        if self.encoding is None:
+            cut = text[:max_tokens * self.CHARS_PER_TOKEN]
+        else:
+            cut = self.encoding.decode(self.encoding.encode(text, disallowed_special=())[:max_tokens])
+        if " " in cut[len(cut) // 2:]:
+            cut = cut[:cut.rindex(" ")]
+        return cut.rstrip() + suffix
+
+
+def merge_chunks(a: str, b: str) -> str:
+    """
+    Merges two chunks of the same section: drops a chunk contained in the other and
+    joins overlapping chunks (the splitter repeats the end of a chunk at the start
+    of the next) without repeating the overlap.
+    """
+    if b in a:
+        return a
+    if a in b:
+        return b
+    for first, second in ((a, b), (b, a)):
+        for k in range(min(len(first), len(second)) - 1, MIN_OVERLAP - 1, -1):
+            if first.endswith(second[:k]):
+                return first + second[k:]
+    return a + "\n" + b
+
+
+class ContextBuilder:
+    """
+    Assembles the generation context from retrieved documents within a token budget:
+
+    1. Deduplicates documents of the same section (link), merging overlapping chunks
+    2. Orders sections by score (rerank_score if the reranker set one, else the retrieval score)
+    3. Packs them highest-first; the first section that does not fit is truncated to the
+       remaining budget if at least min_doc_tokens are left, otherwise it is skipped
+    """
+
+    def __init__(self, max_tokens: int = 4000, counter: TokenCounter = None, min_doc_tokens: int = 64):
+        self.max_tokens = max_tokens
+        self.counter = counter or TokenCounter()
+        self.min_doc_tokens = min_doc_tokens
+
+    @staticmethod
+    def _score(doc: dict) -> float:
+        return doc.get("rerank_score", doc.get("score")) or 0.0
+
+    @staticmethod
+    def format(doc: dict, content: str) -> str:
+        return f"Citation: {doc['metadata'].get('link', 'N/A')}\nContent: {content}"
+
+    def dedupe(self, documents: list) -> list:
+        """:return: One document per section (best score, merged content), in first-seen order"""
+        sections = {}
+        for doc in documents:
+            metadata = doc.get("metadata", {})
+            key = metadata.get("link") or doc.get("id")
+            content = metadata.get("content") or ""
+            if key not in sections:
+                sections[key] = {**doc, "metadata": {**metadata, "content": content}}
+                continue
+            entry = sections[key]
+            entry["metadata"]["content"] = merge_chunks(entry["metadata"]["content"], content)
+            if self._score(doc) > self._score(entry):
+                entry.update({k: v for k, v in doc.items() if k != "metadata"})
+        return list(sections.values())
+
+    def build(self, documents: list) -> tuple:
+        """
+        :return: (context string, report {"documents", "sections", "packed", "truncated",
+            "skipped", "tokens", "budget"})
+        """
+        sections = sorted(self.dedupe(documents), key=lambda doc: -self._score(doc))
+        separator = self.counter.count("\n\n")
+        blocks, used, truncated, skipped = [], 0, 0, 0
+        for doc in sections:
+            content = doc["metadata"]["content"]
+            block = self.format(doc, content)
+            cost = self.counter.count(block) + (separator if blocks else 0)
+            if used + cost > self.max_tokens:
+                remaining = self.max_tokens - used - (separator if blocks else 0)
+                header = self.counter.count(self.format(doc, ""))
+                if remaining - header < self.min_doc_tokens:
+                    skipped += 1
+                    continue
+                limit = remaining - header - 1  # "..."
+                block = self.format(doc, self.counter.truncate(content, limit))
+                cost = self.counter.count(block) + (separator if blocks else 0)
+                # Re-encoding the cut text can differ by a token or two
+                while used + cost > self.max_tokens and limit > 0:
+                    limit -= used + cost - self.max_tokens
+                    block = self.format(doc, self.counter.truncate(content, limit))
+                    cost = self.counter.count(block) + (separator if blocks else 0)
+                truncated += 1
+            blocks.append(block)
+            used += cost
+        report = {
+            "documents": len(documents),
+            "sections": len(sections),
+            "packed": len(blocks),
+            "truncated": truncated,
+            "skipped": skipped,
+            "tokens": used,
+            "budget": self.max_tokens,
+        }
+        return "\n\n".join(blocks), report
+
+    @staticmethod
+    def report(report: dict) -> str:
+        return (f"{report['tokens']}/{report['budget']} tokens, {report['packed']} of {report['sections']} sections "
+                f"({report['documents']} documents, {report['truncated']} truncated, {report['skipped']} skipped)")
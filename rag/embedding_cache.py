@@ -0,0 +1,130 @@
+import array
+import hashlib
+import os
+import sqlite3
+import time
+
+from rag.base_api import BaseEmbeddingAPI
+
+
+class EmbeddingCache:
+    """
+    Persistent, content-addressed embedding store keyed by (model, sha256(text)).
+    Vectors are stored as float32 blobs in SQLite; once the stored vectors exceed
+    max_size_mb the least recently used entries are evicted.
+    """
+
+    def __init__(self, cache_file: str, max_size_mb: float = 1024):
+        self.cache_file = cache_file
+        self.max_bytes = int(max_size_mb * 1024 * 1024)
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(os.path.dirname(cache_file) or ".", exist_ok=True)
+        self.conn = sqlite3.connect(cache_file)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "model TEXT NOT NULL, hash TEXT NOT NULL, vector BLOB NOT NULL, last_used REAL NOT NULL, "
+            "PRIMARY KEY (model, hash))"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_last_used ON embeddings (last_used)")
+        self.size_bytes = self.conn.execute("SELECT COALESCE(SUM(LENGTH(vector)), 0) FROM embeddings").fetchone()[0]
+
+    @staticmethod
+    def text_hash(text: str) -> str:
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    def get_many(self, model: str, texts: list) -> list:
+        """
+        :return: Cached vector or None for every text, in order
+        """
+        hashes = [self.text_hash(text) for text in texts]
+        found = {}
+        unique = list(set(hashes))
+        # Stay below SQLite's bound-parameter limit
+        for start in range(0, len(unique), 500):
+            part = unique[start:start + 500]
+            rows = self.conn.execute(
+                f"SELECT hash, vector FROM embeddings WHERE model = ? AND hash IN ({','.join('?' * len(part))})",
+                [model, *part]
+            ).fetchall()
+            found.update((h, array.array("f", blob).tolist()) for h, blob in rows)
+
+        if found:
+            now = time.time()
+            with self.conn:
+                self.conn.executemany(
+                    "UPDATE embeddings SET last_used = ? WHERE model = ? AND hash = ?",
+                    [(now, model, h) for h in found]
+                )
+        vectors = [found.get(h) for h in hashes]
+        hit_count = sum(vector is not None for vector in vectors)
+        self.hits += hit_count
+        self.misses += len(vectors) - hit_count
+        return vectors
+
+    def put_many(self, model: str, texts: list, vectors: list):
+        now = time.time()
+        rows = [(model, self.text_hash(text), array.array("f", vector).tobytes(), now)
+                for text, vector in zip(texts, vectors)]
+        with self.conn:
+            for row in rows:
+                old = self.conn.execute(
+                    "SELECT LENGTH(vector) FROM embeddings WHERE model = ? AND hash = ?", row[:2]
+                ).fetchone()
+                self.size_bytes += len(row[2]) - (old[0] if old else 0)
+            self.conn.executemany("INSERT OR REPLACE INTO embeddings VALUES (?, ?, ?, ?)", rows)
+        self._evict()
+
+    def _evict(self):
+        """Drops least recently used vectors until the cache fits in max_bytes."""
+        while self.size_bytes > self.max_bytes:
+            rows = self.conn.execute(
+                "SELECT rowid, LENGTH(vector) FROM embeddings ORDER BY last_used LIMIT 1000"
+            ).fetchall()
+            if not rows:
+                self.size_bytes = 0
+                break
+            evicted = []
+            for rowid, size in rows:
+                evicted.append((rowid,))
+                self.size_bytes -= size
+                if self.size_bytes <= self.max_bytes:
+                    break
+            with self.conn:
+                self.conn.executemany("DELETE FROM embeddings WHERE rowid = ?", evicted)
+
+    def report(self) -> str:
+        total = self.hits + self.misses
+        rate = self.hits / total if total else 0
+        return f"{self.hits} hits, {self.misses} misses ({rate:.1%} hit rate), {self.size_bytes / 1e6:.1f} MB stored"
+
+    def close(self):
+        self.conn.close()
+
+
+class CachedEmbeddingAPI(BaseEmbeddingAPI):
+    """
+    Wraps another BaseEmbeddingAPI: chunks already in the EmbeddingCache are
+    served locally and only the misses are sent to the wrapped API.
+    """
+
+    def __init__(self, embedding_api: BaseEmbeddingAPI, cache: EmbeddingCache, model: str = None):
+        self.embedding_api = embedding_api
+        self.cache = cache
+        self.model = model or getattr(embedding_api, "MODEL", type(embedding_api).__name__)
+
+    def embed_text(self, text: str) -> list:
+        return self.embed_batch([text])[0]
+
+    def embed_batch(self, texts: list) -> list:
+        vectors = self.cache.get_many(self.model, texts)
+        missing = [i for i, vector in enumerate(vectors) if vector is None]
+        if missing:
+            # Identical chunks inside one batch are embedded once
+            missing_texts = list(dict.fromkeys(texts[i] for i in missing))
+            embedded = dict(zip(missing_texts, self.embedding_api.embed_batch(missing_texts)))
+            self.cache.put_many(self.model, missing_texts, [embedded[text] for text in missing_texts])
+            for i in missing:
+                vectors[i] = embedded[texts[i]]
+        return vectors
@@ -1,7 +1,9 @@
 from google.genai import Client
 from rag.base_api import BaseEmbeddingAPI, BaseLLMAPI
 from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception_type
+import asyncio
 import time
+from typing import AsyncIterator, Iterator
 from config.settings import Settings
 
 
@@ -9,6 +11,9 @@ class GeminiEmbeddingAPI(BaseEmbeddingAPI):
     """
     Implementation of Embedding API using the new google.genai SDK
     """
+    MODEL = "text-embedding-004"
+    # Maximum number of texts per embed_content request
+    MAX_BATCH_SIZE = 100
 
     def __init__(self, api_key: str):
         """
@@ -25,12 +30,55 @@ class GeminiEmbeddingAPI(BaseEmbeddingAPI):
         """
         # The new SDK typically uses just the model name, e.g., "text-embedding-004"
         result = self.client.models.embed_content(
-            model="text-embedding-004",
+            model=self.MODEL,
             contents=text
         )
         # Accessing the first embedding's values (Native 768 dimension)
         return result.embeddings[0].values
 
+    def embed_batch(self, texts: list) -> list:
+        """
+        Embed many texts, packing up to MAX_BATCH_SIZE texts into each request
+        :param texts: Texts to embed
+        :return: Vectors in the same order as texts
+        """
+        vectors = []
+        for start in range(0, len(texts), self.MAX_BATCH_SIZE):
+            batch = texts[start:start + self.MAX_BATCH_SIZE]
+            result = self.client.models.embed_content(
+                model=self.MODEL,
+                contents=batch
+            )
+            if len(result.embeddings) != len(batch):
+                raise Exception(f"Embedding mismatch! Expected {len(batch)}, got {len(result.embeddings)}")
+            vectors.extend(embedding.values for embedding in result.embeddings)
+        return vectors
+
+    async def aembed_text(self, text: str) -> list:
+        """
+        Async embed_text on the SDK's native asyncio client
+        """
+        result = await self.client.aio.models.embed_content(
+            model=self.MODEL,
+            contents=text
+        )
+        return result.embeddings[0].values
+
+    async def aembed_batch(self, texts: list) -> list:
+        """
+        Async embed_batch; the MAX_BATCH_SIZE requests are sent concurrently
+        """
+        batches = [texts[start:start + self.MAX_BATCH_SIZE] for start in range(0, len(texts), self.MAX_BATCH_SIZE)]
+        results = await asyncio.gather(*[
+            self.client.aio.models.embed_content(model=self.MODEL, contents=batch) for batch in batches
+        ])
+        vectors = []
+        for batch, result in zip(batches, results):
+            if len(result.embeddings) != len(batch):
+                raise Exception(f"Embedding mismatch! Expected {len(batch)}, got {len(result.embeddings)}")
+            vectors.extend(embedding.values for embedding in result.embeddings)
+        return vectors
+
 
 class GeminiLLMAPI(BaseLLMAPI):
     """
@@ -49,28 +97,77 @@ class GeminiLLMAPI(BaseLLMAPI):
         self.model = model.replace("models/", "") 
         self.system_instruction = system_instruction
 
-    def generate_response(self, prompt, images=None) -> str:
-        """
-        Generate response based on context and question, optionally with images.
-        :param prompt: User prompt
-        :param images: Optional image or list of images (PIL.Image or bytes)
-        :return: Generated response text
-        """
+    @staticmethod
+    def _rate_limit_delay() -> float:
         # Rate Limit Protection
-        settings = Settings()
-        if settings.GEMINI_RATE_LIMIT_DELAY > 0:
-            time.sleep(settings.GEMINI_RATE_LIMIT_DELAY)
+        return Settings().GEMINI_RATE_LIMIT_DELAY
 
+    @staticmethod
+    def _contents(prompt, images=None) -> list:
         contents = [prompt]
         if images:
             if isinstance(images, list):
                 contents.extend(images)
             else:
                 contents.append(images)
+        return contents
 
+    def generate_response(self, prompt, images=None) -> str:
+        """
+        Generate response based on context and question, optionally with images.
+        :param prompt: User prompt
+        :param images: Optional image or list of images (PIL.Image or bytes)
+        :return: Generated response text
+        """
+        if self._rate_limit_delay() > 0:
+            time.sleep(self._rate_limit_delay())
         response = self.client.models.generate_content(
             model=self.model,
-            contents=contents,
+            contents=self._contents(prompt, images),
+            config={"system_instruction": self.system_instruction}
+        )
+        return response.text
+
+    def stream_response(self, prompt, images=None) -> Iterator[str]:
+        """
+        Stream the response as it is generated.
+        :param prompt: User prompt
+        :param images: Optional image or list of images (PIL.Image or bytes)
+        :return: Iterator over text chunks
+        """
+        if self._rate_limit_delay() > 0:
+            time.sleep(self._rate_limit_delay())
+        for chunk in self.client.models.generate_content_stream(
+            model=self.model,
+            contents=self._contents(prompt, images),
+            config={"system_instruction": self.system_instruction}
+        ):
+            if chunk.text:
+                yield chunk.text
+
+    async def agenerate_response(self, prompt, images=None) -> str:
+        """
+        Async generate_response on the SDK's native asyncio client (no thread per call).
+        """
+        if self._rate_limit_delay() > 0:
+            await asyncio.sleep(self._rate_limit_delay())
+        response = await self.client.aio.models.generate_content(
+            model=self.model,
+            contents=self._contents(prompt, images),
             config={"system_instruction": self.system_instruction}
         )
-        return response.text
\ No newline at end of file
+        return response.text
+
+    async def astream_response(self, prompt, images=None) -> AsyncIterator[str]:
+        """
+        Async stream_response on the SDK's native asyncio client.
+        """
+        if self._rate_limit_delay() > 0:
+            await asyncio.sleep(self._rate_limit_delay())
+        async for chunk in await self.client.aio.models.generate_content_stream(
+            model=self.model,
+            contents=self._contents(prompt, images),
+            config={"system_instruction": self.system_instruction}
+        ):
+            if chunk.text:
+                yield chunk.text
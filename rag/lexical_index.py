@@ -0,0 +1,290 @@
+import json
+import math
+import os
+import re
+import shutil
+import sqlite3
+import tempfile
+import time
+from collections import Counter
+
+import numpy as np
+
+from rag.citations import find_citations, heading_section, normalize_code
+
+# "§ 2247", "§§ 2247", "§2247a", "Paragraph 2247", "Art. 1", "Artikel 1", "Article 1" -> "§2247", "§1"
+_SECTION_RE = re.compile(
+    r"(?:§§?|\bparagra(?:ph|f)(?:en|s)?\b\.?|\bpara\b\.?|\bart(?:ikel|icle|\.)?)\s*(\d+)\s?([a-z]?)\b",
+    re.IGNORECASE)
+_WORD_RE = re.compile(r"§\d+[a-z]?|[a-z0-9]+")
+_FOLD = str.maketrans({"ä": "ae", "ö": "oe", "ü": "ue", "ß": "ss"})
+_SUFFIXES = ("ern", "em", "er", "en", "es", "e", "n", "s")
+STOPWORDS = {
+    # Deutsch
+    "aber", "als", "am", "an", "auch", "auf", "aus", "bei", "bin", "bis", "das", "dass", "dem", "den",
+    "der", "des", "die", "ein", "eine", "einem", "einen", "einer", "eines", "er", "es", "fuer", "hat",
+    "ich", "im", "in", "ist", "mit", "nach", "nicht", "oder", "sich", "sie", "sind", "so", "um", "und",
+    "vom", "von", "vor", "was", "wenn", "wie", "wir", "wird", "zu", "zum", "zur", "ueber",
+    # English
+    "a", "about", "an", "and", "are", "can", "do", "does", "for", "how", "i", "is", "it", "my", "of",
+    "on", "or", "say", "says", "the", "to", "what", "when", "which", "who", "with",
+}
+
+
+def normalize_sections(text: str) -> str:
+    """Rewrites statute references to a single canonical token (§ + number + optional letter)."""
+    return _SECTION_RE.sub(lambda m: f" §{m.group(1)}{m.group(2).lower()} ", text)
+
+
+def _stem(word: str) -> str:
+    """Light German suffix stripping (Kündigungen -> kuendigung, Testaments -> testament)."""
+    if len(word) <= 4 or word[0] == "§" or word.isdigit():
+        return word
+    for suffix in _SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= 4:
+            return word[:-len(suffix)]
+    return word
+
+
+def tokenize(text: str) -> list:
+    """
+    German-aware tokenizer shared by indexing and querying:
+    § normalization, case and umlaut folding, stopword removal, light stemming.
+    """
+    text = normalize_sections(text).lower().translate(_FOLD)
+    return [_stem(token) for token in _WORD_RE.findall(text) if token not in STOPWORDS]
+
+
+class LexicalIndex:
+    """
+    On-disk BM25 inverted index over the crawled `sections` JSON files.
+
+    - lexical.sqlite: vocabulary (term -> postings range), section metadata, corpus statistics
+    - postings_doc.npy / postings_tf.npy: CSR postings, memory-mapped on open
+    - doc_len.npy: token count per section
+    Every build writes a fresh version-* directory; the CURRENT file names the live one.
+    Each section is one document; its title and law abbreviation (file name) are
+    weighted TITLE_WEIGHT times, so "BGB § 2247" hits the section heading directly.
+    The statutes table maps (law abbreviation, section number) to a section for
+    exact citation lookups.
+    """
+
+    DB_FILE = "lexical.sqlite"
+    CURRENT_FILE = "CURRENT"
+    ARRAYS = ("postings_doc", "postings_tf", "doc_len")
+    TITLE_WEIGHT = 2
+
+    def __init__(self, index_dir: str, k1: float = 1.2, b: float = 0.75):
+        self.index_dir = index_dir
+        self.k1 = k1
+        self.b = b
+        version_dir = self._version_dir(index_dir)
+        self.conn = sqlite3.connect(os.path.join(version_dir, self.DB_FILE), check_same_thread=False)
+        meta = dict(self.conn.execute("SELECT key, value FROM meta").fetchall())
+        self.n_docs = int(meta["n_docs"])
+        self.avgdl = float(meta["avgdl"]) or 1.0
+        self.codes = set(json.loads(meta["codes"]))
+        self.statute_codes = {row[0] for row in self.conn.execute("SELECT DISTINCT code FROM statutes")}
+        for name in self.ARRAYS:
+            setattr(self, name, np.load(os.path.join(version_dir, f"{name}.npy"), mmap_mode="r"))
+
+    @classmethod
+    def _version_dir(cls, index_dir: str) -> str:
+        """:return: Directory of the live version (index_dir itself for indexes built before versioning)"""
+        try:
+            with open(os.path.join(index_dir, cls.CURRENT_FILE), "r") as f:
+                return os.path.join(index_dir, f.read().strip())
+        except FileNotFoundError:
+            return index_dir
+
+    @classmethod
+    def open(cls, index_dir: str):
+        """:return: LexicalIndex, or None if it has not been built yet"""
+        if not os.path.exists(os.path.join(cls._version_dir(index_dir), cls.DB_FILE)):
+            return None
+        return cls(index_dir)
+
+    @classmethod
+    def build(cls, data_folder: str, index_dir: str):
+        """
+        Rebuilds the index from every law JSON file in data_folder (state files are skipped).
+        The new version is written to its own directory and published by replacing the
+        CURRENT file, so a reader always opens a complete version. The previous version
+        is kept for readers that still have it open; older ones are removed.
+        """
+        os.makedirs(index_dir, exist_ok=True)
+        previous_dir = cls._version_dir(index_dir)
+        tmp_dir = tempfile.mkdtemp(dir=index_dir, prefix=".build")
+        conn = sqlite3.connect(os.path.join(tmp_dir, cls.DB_FILE))
+        conn.execute("CREATE TABLE terms (term TEXT PRIMARY KEY, start INTEGER, count INTEGER) WITHOUT ROWID")
+        conn.execute("CREATE TABLE docs (doc INTEGER PRIMARY KEY, main_topic TEXT, section_title TEXT, "
+                     "content TEXT, link TEXT, filename TEXT)")
+        conn.execute("CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT)")
+        conn.execute("CREATE TABLE statutes (code TEXT, section TEXT, doc INTEGER, PRIMARY KEY (code, section)) "
+                     "WITHOUT ROWID")
+
+        postings = {}
+        doc_len = []
+        codes = set()
+        for root, dirs, files in os.walk(data_folder):
+            for filename in sorted(files):
+                if not filename.endswith('.json') or "state" in filename:
+                    continue
+                with open(os.path.join(root, filename), 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                code = os.path.splitext(filename)[0]
+                codes.update(tokenize(code))
+                docs = []
+                for section_data in data.get('sections', []):
+                    doc = len(doc_len)
+                    title = section_data.get('section') or ""
+                    content = section_data.get('content') or ""
+                    counts = Counter(tokenize(content))
+                    for token in tokenize(f"{code} {title}"):
+                        counts[token] += cls.TITLE_WEIGHT
+                    for token, tf in counts.items():
+                        postings.setdefault(token, []).append((doc, tf))
+                    doc_len.append(sum(counts.values()))
+                    docs.append((doc, data.get('main_topic') or "Unknown", title, content,
+                                 section_data.get('link') or "", filename))
+                conn.executemany("INSERT INTO docs VALUES (?, ?, ?, ?, ?, ?)", docs)
+                # First section wins if a heading number repeats (e.g. in annexes)
+                conn.executemany("INSERT OR IGNORE INTO statutes VALUES (?, ?, ?)", [
+                    (normalize_code(code), heading_section(title), doc)
+                    for doc, _, title, _, _, _ in docs if heading_section(title)
+                ])
+
+        terms = []
+        postings_doc = []
+        postings_tf = []
+        for term in sorted(postings):
+            terms.append((term, len(postings_doc), len(postings[term])))
+            for doc, tf in postings[term]:
+                postings_doc.append(doc)
+                postings_tf.append(tf)
+        conn.executemany("INSERT INTO terms VALUES (?, ?, ?)", terms)
+        conn.executemany("INSERT INTO meta VALUES (?, ?)", [
+            ("n_docs", str(len(doc_len))),
+            ("avgdl", str(sum(doc_len) / len(doc_len) if doc_len else 0)),
+            ("codes", json.dumps(sorted(codes))),
+        ])
+        conn.commit()
+        conn.close()
+
+        arrays = {
+            "postings_doc": np.asarray(postings_doc, dtype=np.int32),
+            "postings_tf": np.asarray(postings_tf, dtype=np.float32),
+            "doc_len": np.asarray(doc_len, dtype=np.float32),
+        }
+        for name, array in arrays.items():
+            np.save(os.path.join(tmp_dir, f"{name}.npy"), array)
+        version = f"version-{time.time_ns()}"
+        os.rename(tmp_dir, os.path.join(index_dir, version))
+        with open(os.path.join(index_dir, cls.CURRENT_FILE + ".tmp"), "w") as f:
+            f.write(version)
+        os.replace(os.path.join(index_dir, cls.CURRENT_FILE + ".tmp"), os.path.join(index_dir, cls.CURRENT_FILE))
+
+        keep = {version, os.path.basename(previous_dir)}
+        for name in os.listdir(index_dir):
+            if name.startswith("version-") and name not in keep:
+                shutil.rmtree(os.path.join(index_dir, name), ignore_errors=True)
+        print(f"[INFO] Lexical index built: {len(doc_len)} sections, {len(terms)} terms")
+        return cls(index_dir)
+
+    def is_exact_lookup(self, query: str) -> bool:
+        """
+        True when the query is only a statute reference (e.g. "BGB § 2247", "Art. 1 GG"),
+        which the lexical index answers on its own.
+        """
+        tokens = tokenize(query)
+        return (any(token[0] == "§" for token in tokens)
+                and all(token[0] == "§" or token in self.codes for token in tokens))
+
+    def statute_lookup(self, query: str, max_extra_terms: int = 3) -> list:
+        """
+        Resolves a citation-only query ("What is BGB § 2247?", "Art. 1 Abs. 1 GG") to the
+        exact cited sections.
+        :param max_extra_terms: Content words allowed besides the citations; longer
+            questions that merely mention a statute need regular retrieval
+        :return: Cited sections in VectorStore.query format, or [] if the query is not a
+            plain lookup or a citation cannot be resolved
+        """
+        citations = find_citations(query, self.statute_codes)
+        if not citations:
+            return []
+        rest, position = [], 0
+        for _, start, end in citations:
+            rest.append(query[position:start])
+            position = end
+        rest.append(query[position:])
+        if len(tokenize(" ".join(rest))) > max_extra_terms:
+            return []
+
+        docs = []
+        for citation in dict.fromkeys(citation for citation, _, _ in citations):
+            row = self.conn.execute("SELECT doc FROM statutes WHERE code = ? AND section = ?", citation).fetchone()
+            if row is None:
+                return []
+            docs.append(row[0])
+        metadata = self._metadata(docs)
+        return [{"id": metadata[doc]["link"], "score": 1.0, "metadata": metadata[doc]} for doc in docs]
+
+    def _metadata(self, docs: list) -> dict:
+        return {
+            row[0]: {"main_topic": row[1], "section_title": row[2], "content": row[3],
+                     "link": row[4], "filename": row[5]}
+            for row in self.conn.execute(
+                f"SELECT doc, main_topic, section_title, content, link, filename FROM docs "
+                f"WHERE doc IN ({','.join('?' * len(docs))})", docs)
+        }
+
+    def search(self, query: str, top_k: int = 10) -> list:
+        """
+        BM25 search.
+        :return: [{"id", "score", "metadata"}] in the same format as VectorStore.query (id = section link)
+        """
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms or not self.n_docs:
+            return []
+        rows = self.conn.execute(
+            f"SELECT start, count FROM terms WHERE term IN ({','.join('?' * len(terms))})", terms
+        ).fetchall()
+        if not rows:
+            return []
+
+        scores = {}
+        for start, count in rows:
+            docs = self.postings_doc[start:start + count]
+            tf = self.postings_tf[start:start + count]
+            idf = math.log(1 + (self.n_docs - count + 0.5) / (count + 0.5))
+            norm = self.k1 * (1 - self.b + self.b * self.doc_len[docs] / self.avgdl)
+            for doc, score in zip(docs.tolist(), (idf * tf * (self.k1 + 1) / (tf + norm)).tolist()):
+                scores[doc] = scores.get(doc, 0.0) + score
+
+        top = sorted(scores.items(), key=lambda item: -item[1])[:top_k]
+        metadata = self._metadata([doc for doc, _ in top])
+        return [{"id": metadata[doc]["link"], "score": score, "metadata": metadata[doc]} for doc, score in top]
+
+    def close(self):
+        self.conn.close()
+
+
+def fuse_scores(vector_results: list, lexical_results: list, top_k: int, alpha: float = 0.5) -> list:
+    """
+    Convex combination of max-normalized vector and BM25 scores, merged by section link.
+    Several chunks of one section count once, with their best score; the fused entry
+    carries the metadata of the best vector chunk (or the BM25 section if none matched).
+    :param alpha: Weight of the vector score (1.0 = vector only, 0.0 = BM25 only)
+    """
+    fused = {}
+    for results, weight in ((vector_results, alpha), (lexical_results, 1 - alpha)):
+        best = max((doc["score"] for doc in results), default=0) or 1.0
+        per_link = {}
+        for doc in results:
+            key = doc.get("metadata", {}).get("link") or doc.get("id")
+            if key not in per_link or doc["score"] > per_link[key]["score"]:
+                per_link[key] = doc
+        for key, doc in per_link.items():
+            entry = fused.setdefault(key, {**doc, "score": 0.0})
+            entry["score"] += weight * doc["score"] / best
+    return sorted(fused.values(), key=lambda doc: -doc["score"])[:top_k]
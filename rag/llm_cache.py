@@ -0,0 +1,104 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from rag.base_api import BaseLLMAPI
+
+
+class LLMResponseCache:
+    """
+    Persistent LLM response store keyed by sha256(model, system_instruction, prompt).
+    Entries expire after ttl seconds; above max_entries the least recently used are evicted.
+    Backed by SQLite (WAL) so it survives process and Streamlit restarts.
+    """
+
+    def __init__(self, cache_file: str, ttl: float = 7 * 24 * 3600, max_entries: int = 10000):
+        self.cache_file = cache_file
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(cache_file) or ".", exist_ok=True)
+        self.conn = sqlite3.connect(cache_file, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, response TEXT NOT NULL, created REAL NOT NULL, last_used REAL NOT NULL)"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_last_used ON responses (last_used)")
+
+    @staticmethod
+    def make_key(model: str, system_instruction: str, prompt: str) -> str:
+        payload = json.dumps([model, system_instruction, prompt], ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str):
+        """:return: Cached response text, or None if missing or expired"""
+        now = time.time()
+        with self._lock:
+            row = self.conn.execute("SELECT response, created FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None or now - row[1] > self.ttl:
+                self.misses += 1
+                return None
+            with self.conn:
+                self.conn.execute("UPDATE responses SET last_used = ? WHERE key = ?", (now, key))
+            self.hits += 1
+            return row[0]
+
+    def put(self, key: str, response: str):
+        now = time.time()
+        with self._lock, self.conn:
+            self.conn.execute("INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?)", (key, response, now, now))
+            self.conn.execute("DELETE FROM responses WHERE created < ?", (now - self.ttl,))
+            self.conn.execute(
+                "DELETE FROM responses WHERE key IN ("
+                "SELECT key FROM responses ORDER BY last_used DESC LIMIT -1 OFFSET ?)", (self.max_entries,)
+            )
+
+    def report(self) -> str:
+        total = self.hits + self.misses
+        rate = self.hits / total if total else 0
+        return f"{self.hits} hits, {self.misses} misses ({rate:.1%} hit rate)"
+
+    def close(self):
+        self.conn.close()
+
+
+class CachedLLMAPI(BaseLLMAPI):
+    """
+    Wraps another BaseLLMAPI and serves repeated prompts from an LLMResponseCache.
+    Only use it for calls whose output is fully determined by the prompt (routing,
+    query expansion, reranking); requests with images are never cached.
+    """
+
+    def __init__(self, llm: BaseLLMAPI, cache: LLMResponseCache):
+        self.llm = llm
+        self.cache = cache
+        self.model = getattr(llm, "model", type(llm).__name__)
+        self.system_instruction = getattr(llm, "system_instruction", None)
+
+    def generate_response(self, prompt, images=None) -> str:
+        if images:
+            return self.llm.generate_response(prompt, images)
+        key = self.cache.make_key(self.model, self.system_instruction, prompt)
+        response = self.cache.get(key)
+        if response is None:
+            response = self.llm.generate_response(prompt)
+            if response is not None:
+                self.cache.put(key, response)
+        return response
+
+    async def agenerate_response(self, prompt, images=None) -> str:
+        if images:
+            return await self.llm.agenerate_response(prompt, images)
+        key = self.cache.make_key(self.model, self.system_instruction, prompt)
+        response = self.cache.get(key)
+        if response is None:
+            response = await self.llm.agenerate_response(prompt)
+            if response is not None:
+                self.cache.put(key, response)
+        return response
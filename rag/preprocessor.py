@@ -20,17 +20,19 @@ class Preprocessor:
         self.splitter = SentenceSplitter(
             chunk_size=chunk_size, chunk_overlap=chunk_overlap)
 
-    def process_text(self, text: str) -> List[dict]:
+    def split_text(self, text: str) -> List[str]:
         """
         Structural Chunking:
         - If text < chunk_size, keep it whole (preserve section integrity).
         - If text > chunk_size, split it using SentenceSplitter.
         """
         if len(text) <= self.chunk_size:
-            chunks = [text]
-        else:
-            chunks = self.splitter.split_text(text)
-            
+            return [text]
+        return self.splitter.split_text(text)
+
+    def process_text(self, text: str) -> List[dict]:
+        chunks = self.split_text(text)
         results = [{"chunk": chunk, "embedding": self.embedding_api.embed_text(
             chunk)} for chunk in chunks]
         return results
+
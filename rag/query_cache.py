@@ -0,0 +1,149 @@
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+
+def file_version(paths: list) -> tuple:
+    """(mtime, size) of every existing path; changes whenever one of the files is rewritten."""
+    version = []
+    for path in paths:
+        try:
+            stat = os.stat(path)
+        except OSError:
+            continue
+        version.append((path, stat.st_mtime_ns, stat.st_size))
+    return tuple(version)
+
+
+class QueryCache:
+    """
+    Two-level cache for retrieval results.
+
+    - Exact: keyed by the normalized query text (case, whitespace and punctuation folded)
+    - Semantic: reuses the results of a cached query whose embedding has cosine
+      similarity >= similarity_threshold with the new query's embedding
+    Both levels share one LRU of max_entries with a TTL, and are keyed by the search
+    parameters (top_k, mode, ...). The whole cache is dropped when the watched files
+    (embedding state, lexical index) change, i.e. after an --embedding run.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl: float = 3600, similarity_threshold: float = 0.95,
+                 watch_paths: list = None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.similarity_threshold = similarity_threshold
+        self.watch_paths = watch_paths or []
+        self._entries = OrderedDict()  # (normalized text, params) -> entry
+        self._matrix = None  # (keys, normalized vectors) for the semantic level
+        self._lock = threading.Lock()
+        self._version = file_version(self.watch_paths)
+        self.exact_hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+        self.saved_seconds = 0.0
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        return " ".join(re.sub(r"[^\w§]+", " ", text.casefold()).split())
+
+    def _check(self):
+        """Drops everything if the index changed, and expired entries (caller holds the lock)."""
+        version = file_version(self.watch_paths)
+        if version != self._version:
+            self._version = version
+            self._entries.clear()
+            self._matrix = None
+        now = time.time()
+        expired = [key for key, entry in self._entries.items() if now - entry["created"] > self.ttl]
+        for key in expired:
+            del self._entries[key]
+        if expired:
+            self._matrix = None
+
+    def get(self, text: str, params: tuple):
+        """Exact lookup. :return: Cached results or None"""
+        if not self.max_entries:
+            return None
+        key = (self.normalize(text), params)
+        with self._lock:
+            self._check()
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+            self.exact_hits += 1
+            self.saved_seconds += entry["embed_latency"] + entry["search_latency"]
+            return entry["results"]
+
+    def get_similar(self, vector: list, params: tuple):
+        """
+        Semantic lookup for a query that missed the exact level.
+        :return: Results of the most similar cached query above the threshold, or None
+        """
+        if not self.max_entries:
+            return None
+        query = np.asarray(vector, dtype=np.float32)
+        query = query / (np.linalg.norm(query) or 1.0)
+        with self._lock:
+            self._check()
+            if self._matrix is None:
+                keys = [key for key, entry in self._entries.items() if entry["vector"] is not None]
+                vectors = np.array([self._entries[key]["vector"] for key in keys], dtype=np.float32)
+                self._matrix = (keys, vectors.reshape(len(keys), len(query)))
+            keys, vectors = self._matrix
+            if keys:
+                similarities = vectors @ query
+                for i in np.argsort(-similarities):
+                    if similarities[i] < self.similarity_threshold:
+                        break
+                    if keys[i][1] == params and keys[i] in self._entries:
+                        entry = self._entries[keys[i]]
+                        self._entries.move_to_end(keys[i])
+                        self.semantic_hits += 1
+                        self.saved_seconds += entry["search_latency"]
+                        return entry["results"]
+            return None
+
+    def put(self, text: str, params: tuple, results: list, vector: list = None,
+            embed_latency: float = 0.0, search_latency: float = 0.0):
+        """Stores freshly computed results (every put is one cache miss)."""
+        if not self.max_entries:
+            self.misses += 1
+            return
+        if vector is not None:
+            vector = np.asarray(vector, dtype=np.float32)
+            vector = vector / (np.linalg.norm(vector) or 1.0)
+        key = (self.normalize(text), params)
+        with self._lock:
+            self.misses += 1
+            self._entries[key] = {
+                "results": results,
+                "vector": vector,
+                "created": time.time(),
+                "embed_latency": embed_latency,
+                "search_latency": search_latency,
+            }
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self._matrix = None
+
+    def metrics(self) -> dict:
+        total = self.exact_hits + self.semantic_hits + self.misses
+        return {
+            "exact_hits": self.exact_hits,
+            "semantic_hits": self.semantic_hits,
+            "misses": self.misses,
+            "hit_rate": (self.exact_hits + self.semantic_hits) / total if total else 0.0,
+            "saved_seconds": self.saved_seconds,
+            "entries": len(self._entries),
+        }
+
+    def report(self) -> str:
+        m = self.metrics()
+        return (f"{m['exact_hits']} exact + {m['semantic_hits']} semantic hits, {m['misses']} misses "
+                f"({m['hit_rate']:.1%} hit rate), {m['saved_seconds']:.2f}s saved")
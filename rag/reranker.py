@@ -0,0 +1,210 @@
+import json
+import os
+from abc import ABC, abstractmethod
+
+from rag.base_api import BaseLLMAPI
+from rag.citations import find_citations, heading_section, normalize_code
+from rag.context_builder import TokenCounter
+from rag.lexical_index import tokenize
+
+
+class Reranker(ABC):
+    """
+    抽象類別：定義重排序器的接口
+    Documents use the Retriever result format: {"id", "score", "metadata"}.
+    """
+
+    @abstractmethod
+    def rerank(self, question: str, documents: list, queries: list = None) -> list:
+        """
+        依與問題的相關性重新排序並過濾文件
+        :param question: 使用者原始問題
+        :param documents: 檢索結果（score 為檢索分數）
+        :param queries: 改寫後的搜尋查詢（例如 tool_decision_node 產生的德文查詢）
+        :return: 保留的文件，依相關性由高到低；每份文件附上 "rerank_score"
+        """
+        pass
+
+    async def arerank(self, question: str, documents: list, queries: list = None) -> list:
+        """
+        rerank 的非同步版本（預設直接呼叫 rerank：本地重排序不涉及 I/O）
+        """
+        return self.rerank(question, documents, queries)
+
+
+class FeatureReranker(Reranker):
+    """
+    CPU-only reranker scoring each (query, section) pair on cheap features:
+
+    - term: IDF-weighted coverage of the query terms by title + content (IDF over the candidates)
+    - title: share of the query terms found in the section heading
+    - proximity: share of adjacent query term pairs that also occur adjacently in the section
+    - retrieval: the retriever's score relative to the best candidate
+    Lexical features take the best of the question and its rewritten queries, since
+    the question may be English while the sections are German. A section cited
+    explicitly ("§ 551 BGB") scores 1.0. Takes well under a millisecond per document.
+    The min_score cutoff only applies beyond the best min_keep documents: a query with no
+    lexical match (e.g. an English question whose expansion failed) scores at most the
+    retrieval weight, and must not leave generation without any context.
+    """
+
+    WEIGHTS = {"term": 0.4, "title": 0.15, "proximity": 0.1, "retrieval": 0.35}
+
+    def __init__(self, top_k: int = 5, min_score: float = 0.5, min_keep: int = 2):
+        """
+        :param top_k: Maximum number of documents kept
+        :param min_score: Documents scoring below this (0-1) are dropped
+        :param min_keep: Documents always kept (best first), whatever their score
+        """
+        self.top_k = top_k
+        self.min_score = min_score
+        self.min_keep = min_keep
+
+    @staticmethod
+    def _code(doc: dict) -> str:
+        return normalize_code(os.path.splitext(doc["metadata"].get("filename") or "")[0])
+
+    def features(self, queries: list, documents: list) -> list:
+        """:return: One {feature: value in [0, 1]} dict per document"""
+        query_terms = [list(dict.fromkeys(tokenize(q))) for q in queries]
+        doc_tokens = [tokenize(doc["metadata"].get("content") or "") for doc in documents]
+        title_terms = [set(tokenize(doc["metadata"].get("section_title") or "")) for doc in documents]
+        doc_terms = [set(tokens) | title for tokens, title in zip(doc_tokens, title_terms)]
+        n = len(documents)
+        idf = {}
+        for terms in query_terms:
+            for term in terms:
+                if term not in idf:
+                    df = sum(term in d for d in doc_terms)
+                    idf[term] = 1.0 + (n - df) / n if df else 0.0
+
+        best_retrieval = max((doc.get("score") or 0.0 for doc in documents), default=0.0) or 1.0
+        results = []
+        for tokens, titles, terms, doc in zip(doc_tokens, title_terms, doc_terms, documents):
+            bigrams = set(zip(tokens, tokens[1:]))
+            feature = {"term": 0.0, "title": 0.0, "proximity": 0.0,
+                       "retrieval": (doc.get("score") or 0.0) / best_retrieval}
+            for q in query_terms:
+                if not q:
+                    continue
+                weight = sum(idf[t] for t in q) or 1.0
+                feature["term"] = max(feature["term"], sum(idf[t] for t in q if t in terms) / weight)
+                feature["title"] = max(feature["title"], sum(t in titles for t in q) / len(q))
+                pairs = list(zip(q, q[1:]))
+                if pairs:
+                    feature["proximity"] = max(feature["proximity"], sum(p in bigrams for p in pairs) / len(pairs))
+            results.append(feature)
+
+        # IDF weights are relative to this candidate set, so normalize to the best match
+        best_term = max((f["term"] for f in results), default=0.0) or 1.0
+        for feature in results:
+            feature["term"] /= best_term
+        return results
+
+    def rerank(self, question: str, documents: list, queries: list = None) -> list:
+        if not documents:
+            return []
+        queries = [question] + [q for q in (queries or []) if q != question]
+        codes = {self._code(doc) for doc in documents}
+        cited = {citation for q in queries for citation, _, _ in find_citations(q, codes)}
+
+        scored = []
+        for doc, feature in zip(documents, self.features(queries, documents)):
+            score = sum(self.WEIGHTS[name] * value for name, value in feature.items())
+            if (self._code(doc), heading_section(doc["metadata"].get("section_title"))) in cited:
+                score = 1.0
+            scored.append({**doc, "rerank_score": score})
+        scored.sort(key=lambda doc: -doc["rerank_score"])
+        kept = [doc for rank, doc in enumerate(scored) if rank < self.min_keep or doc["rerank_score"] >= self.min_score]
+        return kept[:self.top_k]
+
+
+class LLMReranker(Reranker):
+    """
+    LLM judge: sends every document preview in one prompt and keeps the IDs the
+    model marks as relevant. Keeps all documents if the answer cannot be parsed.
+    """
+
+    def __init__(self, llm: BaseLLMAPI, preview_tokens: int = 64, counter: TokenCounter = None):
+        """
+        :param preview_tokens: Content tokens shown per document (cut at a word boundary)
+        """
+        self.llm = llm
+        self.preview_tokens = preview_tokens
+        self.counter = counter or TokenCounter()
+
+    def _prompt(self, question: str, documents: list) -> str:
+        doc_previews = "\n".join([f"ID: {i} | Title: {d['metadata'].get('section_title')} | Content: {self.counter.truncate(d['metadata'].get('content') or '', self.preview_tokens)}" for i, d in enumerate(documents)])
+
+        return (
+            f"You are a legal expert judge. Your task is to evaluate the relevance of the following retrieved BGB sections to the user's question.\n\n"
+            f"**User Question:** {question}\n\n"
+            f"**Retrieved Documents:**\n{doc_previews}\n\n"
+            f"**Task:**\n"
+            f"1. For each document ID, determine if it is 'RELEVANT' or 'IRRELEVANT' to answering the question.\n"
+            f"2. Keep only documents that provide useful legal rules, definitions, or context for this specific case.\n\n"
+            f"**Output Format:**\n"
+            f"Provide a JSON list of IDs that are RELEVANT. Example: [0, 2]\n"
+            f"Output ONLY the JSON list."
+        )
+
+    @staticmethod
+    def _parse(response: str, documents: list) -> list:
+        response = response.strip()
+        # Clean JSON
+        if "[" in response and "]" in response:
+            response = "[" + response.split("[")[1].split("]")[0] + "]"
+
+        relevant_ids = json.loads(response)
+        kept = [i for i in dict.fromkeys(relevant_ids) if isinstance(i, int) and 0 <= i < len(documents)]
+        return [{**documents[i], "rerank_score": 1.0} for i in kept]
+
+    @staticmethod
+    def _keep_all(documents: list, error: Exception) -> list:
+        print(f"!! LLM reranker failed: {error}. Keeping all docs.")
+        return [{**doc, "rerank_score": 0.0} for doc in documents]
+
+    def rerank(self, question: str, documents: list, queries: list = None) -> list:
+        if not documents:
+            return []
+        try:
+            return self._parse(self.llm.generate_response(self._prompt(question, documents)), documents)
+        except Exception as e:
+            return self._keep_all(documents, e)
+
+    async def arerank(self, question: str, documents: list, queries: list = None) -> list:
+        if not documents:
+            return []
+        try:
+            return self._parse(await self.llm.agenerate_response(self._prompt(question, documents)), documents)
+        except Exception as e:
+            return self._keep_all(documents, e)
+
+
+class PassthroughReranker(Reranker):
+    """Keeps the retrieval order (reranking disabled)."""
+
+    def __init__(self, top_k: int = None):
+        self.top_k = top_k
+
+    def rerank(self, question: str, documents: list, queries: list = None) -> list:
+        return [{**doc, "rerank_score": doc.get("score") or 0.0} for doc in documents[:self.top_k]]
+
+
+def create_reranker(settings, llm: BaseLLMAPI = None, counter: TokenCounter = None) -> Reranker:
+    """
+    Builds the reranker selected by settings.RERANKER ("local", "llm" or "none").
+    :param llm: Required for "llm"
+    :param counter: Token counter for the LLM judge's previews
+    """
+    if settings.RERANKER == "local":
+        return FeatureReranker(top_k=settings.RERANK_TOP_K, min_score=settings.RERANK_MIN_SCORE,
+                               min_keep=settings.RERANK_MIN_KEEP)
+    if settings.RERANKER == "llm":
+        if llm is None:
+            raise ValueError("The llm reranker needs an LLM")
+        return LLMReranker(llm, preview_tokens=settings.RERANK_PREVIEW_TOKENS,
+                           counter=counter or TokenCounter(settings.TOKENIZER_ENCODING))
+    if settings.RERANKER == "none":
+        return PassthroughReranker(top_k=settings.RERANK_TOP_K)
+    raise ValueError(f"Unknown reranker: {settings.RERANKER}")
@@ -1,48 +1,244 @@
-import pinecone
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
 from rag.gemini_api import GeminiEmbeddingAPI
+from rag.vector_store import VectorStore, create_vector_store
+from rag.lexical_index import LexicalIndex, fuse_scores
+from rag.query_cache import QueryCache, file_version
 from config.settings import Settings
 
+
+def reciprocal_rank_fusion(result_lists: list[list[dict]], k: int = 60) -> list[dict]:
+    """
+    Merges several ranked result lists with Reciprocal Rank Fusion:
+    score(doc) = sum over lists of 1 / (k + rank). Documents are identified by
+    their section link (falling back to the vector ID).
+
+    Returns:
+        Unique documents sorted by fused score; "score" holds the RRF score.
+    """
+    fused = {}
+    for results in result_lists:
+        for rank, doc in enumerate(results, start=1):
+            doc_id = doc.get('metadata', {}).get('link') or doc.get('id')
+            entry = fused.setdefault(doc_id, {**doc, "score": 0.0})
+            entry["score"] += 1.0 / (k + rank)
+    return sorted(fused.values(), key=lambda doc: -doc["score"])
+
+
 class Retriever:
     """
     Handles retrieval of documents from the vector database.
     """
 
-    def __init__(self):
+    def __init__(self, vector_store: VectorStore = None, lexical_index: LexicalIndex = None):
         """
-        Initializes the retriever with Pinecone and embedding API.
+        Initializes the retriever with a vector store, lexical index and embedding API.
+
+        Args:
+            vector_store: Optional store to query; defaults to the backend selected
+                by Settings.VECTOR_STORE (Pinecone or the local memory-mapped store).
+            lexical_index: Optional BM25 index; defaults to the one in
+                Settings.LEXICAL_INDEX_DIR (vector-only retrieval if it is not built).
         """
         self.settings = Settings()
-        pc = pinecone.Pinecone(api_key=self.settings.PINECONE_API_KEY)
-        self.index = pc.Index(host=self.settings.PINECONE_HOST)
+        # Indexes built here (not passed in) are reopened after an --embedding run rewrote them
+        self._own_vector_store = vector_store is None
+        self._own_lexical_index = lexical_index is None
+        self.vector_store = vector_store or create_vector_store(self.settings)
+        self.lexical_index = lexical_index or LexicalIndex.open(self.settings.LEXICAL_INDEX_DIR)
         self.embedding_api = GeminiEmbeddingAPI(self.settings.GOOGLE_API_KEY)
+        # Shared pool for concurrent vector searches (see query_many)
+        self._executor = ThreadPoolExecutor(max_workers=self.settings.RETRIEVAL_WORKERS,
+                                            thread_name_prefix="retriever")
+        # Invalidated whenever an --embedding run rewrites the embedding state or the lexical index
+        state_file = self.settings.EMBEDDING_STATE_FILE
+        sqlite_state = os.path.splitext(state_file)[0] + ".sqlite"
+        self.watch_paths = [state_file, sqlite_state, sqlite_state + "-wal",
+                            os.path.join(self.settings.LEXICAL_INDEX_DIR, LexicalIndex.CURRENT_FILE)]
+        self.query_cache = QueryCache(
+            max_entries=self.settings.QUERY_CACHE_SIZE,
+            ttl=self.settings.QUERY_CACHE_TTL,
+            similarity_threshold=self.settings.QUERY_CACHE_SIMILARITY,
+            watch_paths=self.watch_paths,
+        )
+        self._index_version = file_version(self.watch_paths)
+        self._reopen_lock = threading.Lock()
+
+    def _indexes_changed(self) -> bool:
+        return file_version(self.watch_paths) != self._index_version
 
-    def query(self, query_text: str, top_k: int = 10) -> list[dict]:
+    def _reopen(self):
+        """
+        Reopens the vector store and lexical index this retriever built, after an --embedding
+        run changed the watched files. A long-lived process (agent.service) would otherwise
+        keep serving the old BM25 tables and slot metadata. Queries already running finish
+        on the previous objects.
         """
-        Embeds a query and retrieves the top_k most relevant documents.
+        with self._reopen_lock:
+            version = file_version(self.watch_paths)
+            if version == self._index_version:
+                return
+            if self._own_vector_store:
+                self.vector_store = create_vector_store(self.settings)
+            if self._own_lexical_index:
+                self.lexical_index = LexicalIndex.open(self.settings.LEXICAL_INDEX_DIR)
+            # Taken before reopening: a write meanwhile only causes one more reopen
+            self._index_version = version
+
+    def query(self, query_text: str, top_k: int = 10, mode: str = None, **search_params) -> list[dict]:
+        """
+        Retrieves the top_k most relevant documents.
+
+        In "hybrid" mode, BM25 and vector scores are fused; pure statute references
+        such as "BGB § 2247" are answered from the lexical index alone, without an
+        embedding call.
 
         Args:
             query_text: The text to search for.
             top_k: The number of documents to return.
+            mode: "vector", "lexical" or "hybrid" (default: Settings.RETRIEVAL_MODE).
+            **search_params: Recall/latency knobs passed to the vector store, e.g.
+                nprobe (inverted lists scanned by the local ANN index) or
+                exact=True (brute-force search).
 
         Returns:
             A list of dictionaries, where each dictionary represents a retrieved document
             with its metadata and score.
         """
-        vector = self.embedding_api.embed_text(query_text)
-        response = self.index.query(
-            vector=vector,
-            top_k=top_k,
-            include_metadata=True
-        )
-        matches = response.get("matches", [])
-        return [
-            {
-                "id": match.get("id"),
-                "score": match.get("score"),
-                "metadata": match.get("metadata", {}),
-            }
-            for match in matches
-        ]
+        return self.query_many([query_text], top_k, mode, **search_params)[0]
+
+    def query_many(self, query_texts: list[str], top_k: int = 10, mode: str = None,
+                   **search_params) -> list[list[dict]]:
+        """
+        Retrieves documents for several queries (e.g. multi-query expansion) at once:
+        all queries that need a vector search are embedded in one batched call, and
+        the vector searches run concurrently. Results are served from the query cache
+        when the same (normalized) query, or a semantically equivalent one, was seen.
+
+        Args:
+            query_texts: The texts to search for.
+            top_k, mode, **search_params: As in query().
+
+        Returns:
+            One result list per query, in the order of query_texts.
+        """
+        if self._indexes_changed():
+            self._reopen()
+        mode = mode or self.settings.RETRIEVAL_MODE
+        params = (top_k, mode, tuple(sorted(search_params.items())))
+        results, lexical_results, pending = self._lookup(query_texts, top_k, mode, params)
+        if not pending:
+            return results
+
+        start = time.perf_counter()
+        vectors = self.embedding_api.embed_batch([query_texts[i] for i in pending])
+        embed_latency = (time.perf_counter() - start) / len(pending)
+
+        searches = {}
+        for i, vector in zip(pending, vectors):
+            results[i] = self.query_cache.get_similar(vector, params)
+            if results[i] is None:
+                searches[i] = (vector, self._executor.submit(self._timed_search, vector, top_k, search_params))
+        for i, (vector, future) in searches.items():
+            results[i] = self._finish(query_texts[i], params, vector, lexical_results[i], *future.result(),
+                                      embed_latency)
+        return results
+
+    async def aquery(self, query_text: str, top_k: int = 10, mode: str = None, **search_params) -> list[dict]:
+        """Async variant of query()."""
+        return (await self.aquery_many([query_text], top_k, mode, **search_params))[0]
+
+    async def aquery_many(self, query_texts: list[str], top_k: int = 10, mode: str = None,
+                          **search_params) -> list[list[dict]]:
+        """
+        Async variant of query_many(): the embedding request is awaited on the
+        embedding API's async client, and the vector searches are awaited on the
+        shared retriever pool, so the event loop keeps serving other requests.
+        """
+        if self._indexes_changed():
+            # Opening the indexes reads from disk: keep it off the event loop
+            await asyncio.to_thread(self._reopen)
+        mode = mode or self.settings.RETRIEVAL_MODE
+        params = (top_k, mode, tuple(sorted(search_params.items())))
+        results, lexical_results, pending = self._lookup(query_texts, top_k, mode, params)
+        if not pending:
+            return results
+
+        start = time.perf_counter()
+        vectors = await self.embedding_api.aembed_batch([query_texts[i] for i in pending])
+        embed_latency = (time.perf_counter() - start) / len(pending)
+
+        loop = asyncio.get_running_loop()
+        searches = {}
+        for i, vector in zip(pending, vectors):
+            results[i] = self.query_cache.get_similar(vector, params)
+            if results[i] is None:
+                searches[i] = (vector, loop.run_in_executor(self._executor, self._timed_search, vector, top_k,
+                                                            search_params))
+        for i, (vector, future) in searches.items():
+            results[i] = self._finish(query_texts[i], params, vector, lexical_results[i], *(await future),
+                                      embed_latency)
+        return results
+
+    def _lookup(self, query_texts: list[str], top_k: int, mode: str, params: tuple):
+        """
+        Cache and lexical phase shared by query_many / aquery_many.
+
+        Returns:
+            (results with cached and lexical-only answers filled in, BM25 results of
+            the cache misses, indices of the queries that still need a vector search)
+        """
+        results = [self.query_cache.get(q, params) for q in query_texts]
+        misses = [i for i, cached in enumerate(results) if cached is None]
+
+        use_lexical = self.lexical_index is not None and mode != "vector"
+        lexical_results = {i: self.lexical_index.search(query_texts[i], top_k) if use_lexical else [] for i in misses}
+        pending = []
+        for i in misses:
+            if self._needs_vector_search(query_texts[i], lexical_results[i], mode):
+                pending.append(i)
+            else:
+                results[i] = lexical_results[i]
+                self.query_cache.put(query_texts[i], params, results[i])
+        return results, lexical_results, pending
+
+    def _finish(self, query_text: str, params: tuple, vector: list, lexical_results: list[dict],
+                vector_results: list[dict], search_latency: float, embed_latency: float) -> list[dict]:
+        """Fuses a query's vector and BM25 results and caches them."""
+        top_k, mode, _ = params
+        results = (fuse_scores(vector_results, lexical_results, top_k, self.settings.HYBRID_ALPHA)
+                   if self.lexical_index is not None and mode != "vector" else vector_results)
+        self.query_cache.put(query_text, params, results, vector, embed_latency, search_latency)
+        return results
+
+    def _timed_search(self, vector: list, top_k: int, search_params: dict):
+        start = time.perf_counter()
+        results = self.vector_store.query(vector, top_k=top_k, **search_params)
+        return results, time.perf_counter() - start
+
+    def _needs_vector_search(self, query_text: str, lexical_results: list[dict], mode: str) -> bool:
+        """Lexical mode and exact statute lookups are answered without an embedding."""
+        if self.lexical_index is None or mode == "vector":
+            return True
+        return mode != "lexical" and not (lexical_results and self.lexical_index.is_exact_lookup(query_text))
+
+    def statute_lookup(self, query_text: str) -> list[dict]:
+        """
+        Fast path for citation-only queries such as "What is BGB § 2247?".
+
+        Returns:
+            The exact cited sections from the lexical index (no embedding or vector
+            search), or an empty list if the query is not a plain statute lookup.
+        """
+        if self._indexes_changed():
+            self._reopen()
+        if self.lexical_index is None:
+            return []
+        return self.lexical_index.statute_lookup(query_text)
 
     def get_definition(self, term: str) -> str:
         """
@@ -62,7 +258,7 @@ class Retriever:
     def list_related_articles(self, article_id: str) -> list[dict]:
         """
         Finds articles related to a given article_id.
-        This could be implemented using Pinecone's `fetch` and then finding
+        This could be implemented using the vector store's `fetch` and then finding
         related articles based on metadata, or by using the vector of the given
         article to find similar vectors.
 
@@ -1,10 +1,14 @@
-import pinecone
 import json
 import os
 import time
 import re
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
 from tenacity import retry, stop_after_attempt, wait_exponential
 
+from rag.vector_store import PineconeVectorStore
+
 
 def sanitize_topic(topic):
     """
@@ -45,33 +49,65 @@ def generate_ascii_id(topic, index):
     return f"{topic_ascii}_{index}"
 
 
+def generate_chunk_id(filename, link, chunk_index):
+    """
+    根據檔案名稱、法條 anchor 與 chunk 序號生成穩定 ID
+    (插入新條文不會改變其他條文的 ID)
+    :param filename: JSON 檔案名稱
+    :param link: 法條連結 (含 #anchor)
+    :param chunk_index: 該法條內的 chunk 序號
+    :return: ASCII 安全的 ID
+    """
+    stem = os.path.splitext(filename)[0]
+    if link and "#" in link:
+        anchor = link.split("#", 1)[1]
+    else:
+        anchor = hashlib.sha256((link or "").encode("utf-8")).hexdigest()[:16]
+    return sanitize_topic(f"{stem}__{anchor}__{chunk_index}")
+
+
+def chunk_fingerprint(metadata: dict) -> str:
+    """Hash of everything stored with a vector; a changed fingerprint means the vector must be upserted."""
+    return hashlib.sha256(json.dumps(metadata, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+def diff_chunks(previous: dict, current: dict):
+    """
+    比較前後兩版的 {vector_id: fingerprint}
+    :return: (新增或變更的 ID 列表, 已移除的 ID 列表)
+    """
+    changed = [vid for vid, fingerprint in current.items() if previous.get(vid) != fingerprint]
+    removed = [vid for vid in previous if vid not in current]
+    return changed, removed
+
+
 class Uploader:
     """
     上傳模組：負責將向量與對應的 metadata 上傳至向量資料庫
     """
 
-    def __init__(self, index_name: str, api_key: str, progress_file: str = "../progress.json"):
+    def __init__(self, index_name: str, api_key: str, progress_file: str = "../progress.json", index=None):
         """
         初始化上傳模組
         :param index_name: Pinecone 索引名稱
         :param api_key: Pinecone API 密鑰
         :param environment: Pinecone 環境名稱
         :param progress_file: 本地記錄上傳進度的檔案
+        :param index: 可選，直接注入 VectorStore (例如 LocalVectorStore)；預設連線至 Pinecone
         """
         PROJECT_ROOT = os.path.dirname(os.path.abspath(__file__))
 
         # 指定存放檔案的目錄
         PROGRESS_PATH = os.path.abspath(
             os.path.join(PROJECT_ROOT, progress_file))
-        pc = pinecone.Pinecone(api_key=api_key)
-        self.index = pc.Index(index_name)
+        self.index = index if index is not None else self._connect(index_name, api_key)
         self.progress_file = PROGRESS_PATH
         
         # Safety Check: Dimension Mismatch
         try:
-            stats = self.index.describe_index_stats()
+            stats = self.index.describe()
             if stats.get('dimension') != 768:
-                print(f"[WARN] ⚠️  Pinecone Index Dimension Mismatch! Found: {stats.get('dimension')}, Expected: 768.")
+                print(f"[WARN] ⚠️  Vector Store Dimension Mismatch! Found: {stats.get('dimension')}, Expected: 768.")
                 print(f"[WARN] Please run 'python reset_db.py' to fix this, otherwise upserts will fail.")
         except Exception as e:
             # Index might not exist yet or connection error, ignore in init
@@ -82,6 +118,9 @@ class Uploader:
             with open(self.progress_file, "w") as f:
                 json.dump({}, f)
 
+    def _connect(self, index_name: str, api_key: str):
+        return PineconeVectorStore(api_key, index_name=index_name)
+
     def load_progress(self):
         """載入上傳進度"""
         with open(self.progress_file, "r") as f:
@@ -110,7 +149,7 @@ class Uploader:
                 "link": section["link"] if section["link"] else ""
             }
         }
-        self.index.upsert(vectors=[item])
+        self.index.upsert([item])
 
     @retry(wait=wait_exponential(multiplier=1, min=2, max=10), stop=stop_after_attempt(3))
     def upload_batch(self, vectors: list):
@@ -122,19 +161,33 @@ class Uploader:
             return
         
         # Pinecone recommendation is to upload in batches of 100
-        response = self.index.upsert(vectors=vectors)
+        upserted_count = self.index.upsert(vectors)
         
         # Verify upload count
-        if response.upserted_count != len(vectors):
-            raise Exception(f"Upload mismatch! Expected {len(vectors)}, uploaded {response.upserted_count}")
+        if upserted_count != len(vectors):
+            raise Exception(f"Upload mismatch! Expected {len(vectors)}, uploaded {upserted_count}")
 
-    def delete_file_vectors(self, filename: str):
+    @retry(wait=wait_exponential(multiplier=1, min=2, max=10), stop=stop_after_attempt(3))
+    def delete_vectors(self, ids: list):
+        """
+        依 ID 刪除向量 (每次請求最多 1000 個)
+        :param ids: 要刪除的向量 ID 列表
+        """
+        for start in range(0, len(ids), 1000):
+            self.index.delete(ids=ids[start:start + 1000])
+
+    def delete_file_vectors(self, filename: str, keep: set = None):
         """
         刪除特定檔案的所有向量 (用於更新前的清理)
         :param filename: 要刪除的檔案名稱 (metadata.filename)
+        :param keep: 保留的向量 ID (例如剛上傳的新版本)；其餘向量依 ID 刪除
         """
         try:
-            self.index.delete(filter={"filename": {"$eq": filename}})
+            if keep is None:
+                self.index.delete(filter={"filename": {"$eq": filename}})
+            else:
+                stale = [vid for vid in self.index.list_ids({"filename": {"$eq": filename}}) if vid not in keep]
+                self.delete_vectors(stale)
             print(f"[INFO] Cleared old vectors for {filename}")
         except Exception as e:
             print(f"[WARN] Failed to delete old vectors for {filename}: {e}")
@@ -164,3 +217,58 @@ class Uploader:
 
     #         # 更新進度
     #         self.save_progress(i + 1)
+
+
+class PipelinedUploader(Uploader):
+    """
+    上傳模組 (管線模式)：upload_batch 在背景執行緒中並行執行，
+    呼叫端可以在上傳進行時繼續嵌入下一批。
+
+    - submit_batch: 排入上傳佇列；佇列滿時阻塞 (最多 queue_size 個批次等待或執行中)
+    - flush: 等待所有已排入的批次完成，任何批次失敗 (重試後) 即拋出例外
+    """
+
+    def __init__(self, index_name: str, api_key: str, progress_file: str = "../progress.json", index=None,
+                 max_in_flight: int = 4, queue_size: int = 8):
+        self.max_in_flight = max_in_flight
+        super().__init__(index_name, api_key, progress_file=progress_file, index=index)
+        self._executor = ThreadPoolExecutor(max_workers=max_in_flight, thread_name_prefix="upsert")
+        self._slots = threading.BoundedSemaphore(max(queue_size, max_in_flight))
+        self._pending = []
+
+    def _connect(self, index_name: str, api_key: str):
+        # One connection per in-flight upsert
+        return PineconeVectorStore(api_key, index_name=index_name, pool_threads=self.max_in_flight)
+
+    def submit_batch(self, vectors: list):
+        """
+        非同步上傳一個批次 (沿用 upload_batch 的重試與數量驗證)
+        :param vectors: 符合 Pinecone 格式的向量列表
+        """
+        if not vectors:
+            return
+        self._slots.acquire()
+        try:
+            future = self._executor.submit(self.upload_batch, vectors)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        self._pending.append(future)
+
+    def flush(self):
+        """
+        Barrier: 等待所有已送出的批次完成
+        """
+        pending, self._pending = self._pending, []
+        wait(pending)
+        for future in pending:
+            error = future.exception()
+            if error is not None:
+                raise error
+
+    def close(self):
+        try:
+            self.flush()
+        finally:
+            self._executor.shutdown(wait=True)
@@ -0,0 +1,428 @@
+import json
+import os
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+
+import numpy as np
+
+from rag.ann_index import IVFIndex
+
+
+class VectorStore(ABC):
+    """
+    抽象類別：定義向量資料庫的接口
+    Vectors use the Pinecone record format: {"id": str, "values": list[float], "metadata": dict}.
+    Filters use the Pinecone filter syntax ($eq, $ne, $in, $nin, $gt, $gte, $lt, $lte, $and, $or).
+    """
+
+    @abstractmethod
+    def upsert(self, vectors: list) -> int:
+        """
+        新增或覆寫向量
+        :return: 實際寫入的向量數
+        """
+        pass
+
+    @abstractmethod
+    def query(self, vector: list, top_k: int = 10, filter: dict = None, **search_params) -> list:
+        """
+        以 cosine 相似度查詢最接近的向量
+        :param search_params: 後端專屬的搜尋參數 (例如 LocalVectorStore 的 nprobe / exact)
+        :return: [{"id", "score", "metadata"}]，依分數由高到低
+        """
+        pass
+
+    @abstractmethod
+    def delete(self, ids: list = None, filter: dict = None):
+        """
+        依 ID 或 metadata filter 刪除向量
+        """
+        pass
+
+    @abstractmethod
+    def fetch(self, ids: list) -> dict:
+        """
+        :return: {id: {"id", "values", "metadata"}}，不存在的 ID 不會出現
+        """
+        pass
+
+    @abstractmethod
+    def list_ids(self, filter: dict) -> list:
+        """
+        :return: 符合 metadata filter 的所有向量 ID
+        """
+        pass
+
+    @abstractmethod
+    def describe(self) -> dict:
+        """
+        :return: {"dimension": int, "count": int}
+        """
+        pass
+
+    def close(self):
+        pass
+
+
+class PineconeVectorStore(VectorStore):
+    """
+    VectorStore backed by a Pinecone index.
+    """
+
+    def __init__(self, api_key: str, index_name: str = None, host: str = None, pool_threads: int = 1):
+        import pinecone
+
+        pc = pinecone.Pinecone(api_key=api_key)
+        if host:
+            self.index = pc.Index(host=host, pool_threads=pool_threads)
+        else:
+            self.index = pc.Index(index_name, pool_threads=pool_threads)
+
+    def upsert(self, vectors: list) -> int:
+        return self.index.upsert(vectors=vectors).upserted_count
+
+    def query(self, vector: list, top_k: int = 10, filter: dict = None, **search_params) -> list:
+        response = self.index.query(vector=vector, top_k=top_k, filter=filter, include_metadata=True)
+        return [
+            {
+                "id": match.get("id"),
+                "score": match.get("score"),
+                "metadata": match.get("metadata", {}),
+            }
+            for match in response.get("matches", [])
+        ]
+
+    def delete(self, ids: list = None, filter: dict = None):
+        if ids is not None:
+            self.index.delete(ids=ids)
+        elif filter is not None:
+            self.index.delete(filter=filter)
+
+    # Largest top_k a Pinecone query accepts
+    MAX_TOP_K = 10000
+
+    def list_ids(self, filter: dict) -> list:
+        """
+        Pinecone cannot list IDs by metadata, so this queries with the filter and a probe
+        vector: every match is returned as long as at most MAX_TOP_K vectors match (one law
+        has a few thousand chunks at most).
+        """
+        dimension = self.describe()["dimension"]
+        response = self.index.query(vector=[1.0] + [0.0] * (dimension - 1), top_k=self.MAX_TOP_K,
+                                    filter=filter, include_metadata=False)
+        return [match.get("id") for match in response.get("matches", [])]
+
+    def fetch(self, ids: list) -> dict:
+        vectors = self.index.fetch(ids=ids).vectors
+        return {
+            vid: {"id": vid, "values": list(v.values), "metadata": dict(v.metadata or {})}
+            for vid, v in vectors.items()
+        }
+
+    def describe(self) -> dict:
+        stats = self.index.describe_index_stats()
+        return {"dimension": stats.get("dimension"), "count": stats.get("total_vector_count")}
+
+
+def _as_list(value):
+    return value if isinstance(value, list) else [value]
+
+
+_FILTER_OPS = {
+    "$eq": lambda value, operand: operand in _as_list(value),
+    "$ne": lambda value, operand: operand not in _as_list(value),
+    "$in": lambda value, operand: any(v in operand for v in _as_list(value)),
+    "$nin": lambda value, operand: not any(v in operand for v in _as_list(value)),
+    "$gt": lambda value, operand: value is not None and value > operand,
+    "$gte": lambda value, operand: value is not None and value >= operand,
+    "$lt": lambda value, operand: value is not None and value < operand,
+    "$lte": lambda value, operand: value is not None and value <= operand,
+}
+
+
+def match_filter(metadata: dict, filter: dict) -> bool:
+    """Evaluates a Pinecone-style metadata filter against one metadata dict."""
+    for key, condition in filter.items():
+        if key == "$and":
+            if not all(match_filter(metadata, sub) for sub in condition):
+                return False
+        elif key == "$or":
+            if not any(match_filter(metadata, sub) for sub in condition):
+                return False
+        else:
+            if not isinstance(condition, dict):
+                condition = {"$eq": condition}
+            value = metadata.get(key)
+            if not all(_FILTER_OPS[op](value, operand) for op, operand in condition.items()):
+                return False
+    return True
+
+
+class LocalVectorStore(VectorStore):
+    """
+    In-process vector store for offline use and benchmarking.
+
+    - vectors.f32: float32 matrix (capacity x dimension), memory-mapped; rows are
+      L2-normalized on upsert, so cosine similarity is a single matrix-vector product
+    - store.sqlite: slot -> (id, metadata); loaded into memory on open
+    Exact queries score every row and take the top-k via np.argpartition. With
+    ann_lists > 0, an IVFIndex restricts scoring to the nprobe closest inverted
+    lists once enough vectors are stored (pass exact=True to bypass it).
+    With a filter, candidates are taken in score order and widened until top_k
+    matches are found; ANN queries that run out of candidates fall back to exact.
+    Note that fetch() returns the normalized vectors.
+
+    Every write bumps a generation counter in store.sqlite. Each call first compares it
+    with the generation it loaded and, when another process (e.g. an --embedding run)
+    wrote since, reloads the slot maps, the vector file and the ANN index: deleted slots
+    can be reused, so stale maps would attach old ids and metadata to new vectors.
+    """
+
+    VECTOR_FILE = "vectors.f32"
+    META_FILE = "store.sqlite"
+
+    def __init__(self, path: str, dimension: int = 768, initial_capacity: int = 1024,
+                 ann_lists: int = 0, nprobe: int = 16):
+        self.path = path
+        self.dimension = dimension
+        self.ann_lists = ann_lists
+        self.nprobe = nprobe
+        self._lock = threading.RLock()
+        os.makedirs(path, exist_ok=True)
+
+        self.conn = sqlite3.connect(os.path.join(path, self.META_FILE), check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        with self.conn:
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS items (slot INTEGER PRIMARY KEY, id TEXT UNIQUE NOT NULL, metadata TEXT NOT NULL)"
+            )
+            self.conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+            self.conn.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('generation', 0)")
+
+        self.vectors = None
+        self.ann = None
+        self._load(initial_capacity)
+        if self.ann:
+            live = np.flatnonzero(self.alive)
+            if self.ann.trained:
+                # Repair assignments left stale by an unclean shutdown
+                assign = self.ann.assign[:self.size]
+                self.ann.remove(np.flatnonzero(~self.alive[:self.size] & (assign >= 0)))
+                self.ann.add(live[assign[live] < 0], self.vectors)
+            elif self.ann.needs_training(len(live)):
+                self.ann.train(self.vectors, live)
+
+    def _stored_generation(self) -> int:
+        return self.conn.execute("SELECT value FROM meta WHERE key = 'generation'").fetchone()[0]
+
+    def _load(self, min_capacity: int = 0):
+        """(Re)reads the slot maps from store.sqlite and maps the vector file and the ANN index."""
+        # Read before the rows: a write in between only causes one more reload
+        self.generation = self._stored_generation()
+        rows = self.conn.execute("SELECT slot, id, metadata FROM items").fetchall()
+        self.size = max((slot for slot, _, _ in rows), default=-1) + 1
+        self.ids = [None] * self.size
+        self.metadata = [None] * self.size
+        self.alive = np.zeros(self.size, dtype=bool)
+        self.slot_of = {}
+        for slot, vid, metadata in rows:
+            self.ids[slot] = vid
+            self.metadata[slot] = json.loads(metadata)
+            self.alive[slot] = True
+            self.slot_of[vid] = slot
+        self.free_slots = [slot for slot in range(self.size) if not self.alive[slot]]
+
+        vector_file = os.path.join(self.path, self.VECTOR_FILE)
+        existing = os.path.getsize(vector_file) // (4 * self.dimension) if os.path.exists(vector_file) else 0
+        if self.vectors is not None:
+            self.vectors.flush()
+            self.vectors = None
+        self._open_vectors(max(existing, self.size, min_capacity))
+
+        if self.ann:
+            self.ann.flush()
+        self.ann = IVFIndex(self.path, self.dimension, self.ann_lists, self.nprobe) if self.ann_lists else None
+        if self.ann:
+            self.ann.resize(self.capacity)
+
+    def _refresh(self):
+        """Reloads when another process wrote since the last load (call under the lock)."""
+        if self._stored_generation() != self.generation:
+            self._load()
+
+    def _bump_generation(self):
+        """Inside a write transaction: tells other processes their maps are stale."""
+        stored = self._stored_generation()
+        self.conn.execute("UPDATE meta SET value = ? WHERE key = 'generation'", (stored + 1,))
+        # stored != self.generation: another process wrote meanwhile, reload on the next call
+        self.generation = stored + 1 if stored == self.generation else -1
+
+    def _open_vectors(self, capacity: int):
+        vector_file = os.path.join(self.path, self.VECTOR_FILE)
+        with open(vector_file, "ab") as f:
+            f.truncate(capacity * self.dimension * 4)
+        self.capacity = capacity
+        self.vectors = np.memmap(vector_file, dtype=np.float32, mode="r+", shape=(capacity, self.dimension))
+        # alive spans the whole capacity (slots >= size stay False), so it grows geometrically with it
+        alive = np.zeros(capacity, dtype=bool)
+        alive[:len(self.alive)] = self.alive
+        self.alive = alive
+
+    def _grow(self, needed: int):
+        if needed <= self.capacity:
+            return
+        self.vectors.flush()
+        del self.vectors
+        self._open_vectors(max(needed, self.capacity * 2))
+        if self.ann:
+            self.ann.resize(self.capacity)
+
+    def _allocate(self) -> int:
+        if self.free_slots:
+            return self.free_slots.pop()
+        slot = self.size
+        self.size += 1
+        self._grow(self.size)
+        self.ids.append(None)
+        self.metadata.append(None)
+        return slot
+
+    def upsert(self, vectors: list) -> int:
+        with self._lock:
+            self._refresh()
+            rows = []
+            for item in vectors:
+                values = np.asarray(item["values"], dtype=np.float32)
+                if values.shape != (self.dimension,):
+                    raise ValueError(f"Vector dimension {values.shape} does not match {self.dimension}")
+                norm = np.linalg.norm(values)
+                slot = self.slot_of.get(item["id"])
+                if slot is None:
+                    slot = self._allocate()
+                self.vectors[slot] = values / norm if norm else values
+                metadata = item.get("metadata") or {}
+                self.ids[slot] = item["id"]
+                self.metadata[slot] = metadata
+                self.alive[slot] = True
+                self.slot_of[item["id"]] = slot
+                rows.append((slot, item["id"], json.dumps(metadata, ensure_ascii=False)))
+            with self.conn:
+                self.conn.executemany("INSERT OR REPLACE INTO items (slot, id, metadata) VALUES (?, ?, ?)", rows)
+                if self.ann:
+                    live = np.flatnonzero(self.alive)
+                    if self.ann.needs_training(len(live)):
+                        self.ann.train(self.vectors, live)
+                    else:
+                        self.ann.add([slot for slot, _, _ in rows], self.vectors)
+                # Last: other processes reload only once the ANN index matches the new rows
+                self._bump_generation()
+            return len(rows)
+
+    def query(self, vector: list, top_k: int = 10, filter: dict = None,
+              nprobe: int = None, exact: bool = False) -> list:
+        """
+        :param nprobe: Inverted lists to scan (ANN only); higher is slower but more accurate
+        :param exact: Score every vector even when an ANN index is available
+        """
+        query = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        if norm:
+            query = query / norm
+        with self._lock:
+            self._refresh()
+            top_k = min(top_k, len(self.slot_of))
+            if top_k <= 0:
+                return []
+            if self.ann and self.ann.trained and not exact:
+                slots = self.ann.candidates(query, self.size, nprobe)
+                matches = self._rank(slots, np.asarray(self.vectors[slots]) @ query, top_k, filter)
+                if len(matches) == top_k:
+                    return matches
+            slots = np.flatnonzero(self.alive)
+            return self._rank(slots, (self.vectors[:self.size] @ query)[slots], top_k, filter)
+
+    def _rank(self, slots: np.ndarray, scores: np.ndarray, top_k: int, filter: dict = None) -> list:
+        """Turns candidate slots and their scores into the top_k matches, applying the metadata filter."""
+        top_k = min(top_k, len(slots))
+        if top_k <= 0:
+            return []
+
+        matches = []
+        seen = 0
+        candidates = top_k if filter is None else top_k * 4
+        while True:
+            candidates = min(candidates, len(slots))
+            part = np.argpartition(-scores, candidates - 1)[:candidates]
+            ordered = part[np.argsort(-scores[part], kind="stable")]
+            for i in ordered[seen:]:
+                slot = slots[i]
+                if filter is None or match_filter(self.metadata[slot], filter):
+                    matches.append({"id": self.ids[slot], "score": float(scores[i]), "metadata": self.metadata[slot]})
+                    if len(matches) == top_k:
+                        return matches
+            if candidates == len(slots):
+                return matches
+            seen = candidates
+            candidates *= 4
+
+    def delete(self, ids: list = None, filter: dict = None):
+        with self._lock:
+            self._refresh()
+            if ids is not None:
+                slots = [self.slot_of[vid] for vid in ids if vid in self.slot_of]
+            elif filter is not None:
+                slots = [slot for slot in range(self.size) if self.alive[slot] and match_filter(self.metadata[slot], filter)]
+            else:
+                return
+            for slot in slots:
+                del self.slot_of[self.ids[slot]]
+                self.ids[slot] = None
+                self.metadata[slot] = None
+                self.alive[slot] = False
+                self.vectors[slot] = 0
+                self.free_slots.append(slot)
+            if self.ann:
+                self.ann.remove(slots)
+            with self.conn:
+                self.conn.executemany("DELETE FROM items WHERE slot = ?", [(slot,) for slot in slots])
+                self._bump_generation()
+
+    def fetch(self, ids: list) -> dict:
+        with self._lock:
+            self._refresh()
+            return {
+                vid: {"id": vid, "values": self.vectors[self.slot_of[vid]].tolist(), "metadata": self.metadata[self.slot_of[vid]]}
+                for vid in ids if vid in self.slot_of
+            }
+
+    def list_ids(self, filter: dict) -> list:
+        with self._lock:
+            self._refresh()
+            return [self.ids[slot] for slot in range(self.size)
+                    if self.alive[slot] and match_filter(self.metadata[slot], filter)]
+
+    def describe(self) -> dict:
+        with self._lock:
+            self._refresh()
+            return {"dimension": self.dimension, "count": len(self.slot_of)}
+
+    def close(self):
+        with self._lock:
+            self.vectors.flush()
+            if self.ann:
+                self.ann.flush()
+            self.conn.close()
+
+
+def create_vector_store(settings, pool_threads: int = 1) -> VectorStore:
+    """
+    Builds the vector store selected by settings.VECTOR_STORE ("pinecone" or "local").
+    """
+    if settings.VECTOR_STORE == "local":
+        return LocalVectorStore(settings.LOCAL_VECTOR_STORE_DIR, ann_lists=settings.ANN_LISTS,
+                                nprobe=settings.ANN_NPROBE)
+    if settings.VECTOR_STORE == "pinecone":
+        return PineconeVectorStore(settings.PINECONE_API_KEY, index_name=settings.INDEX_NAME,
+                                   host=settings.PINECONE_HOST, pool_threads=pool_threads)
+    raise ValueError(f"Unknown vector store: {settings.VECTOR_STORE}")
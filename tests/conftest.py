@@ -0,0 +1,109 @@
+import hashlib
+import os
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+
+LAW_PAGES = os.path.join(ROOT, "benchmarks", "fixtures", "law_pages")
+
+
+class LawSite:
+    """
+    Local stand-in for gesetze-im-internet.de:
+    - /Teilliste_A.html lists `laws` laws (with the 15 leading / 6 trailing links the parser skips)
+    - /law<i>/index.html links the HTML page of law i
+    - /law<i>/law<i>.html serves a page of benchmarks/fixtures/law_pages, with an ETag
+      (If-None-Match -> 304)
+    """
+
+    def __init__(self, laws: int):
+        self.laws = laws
+        self.pages = []
+        for name in sorted(os.listdir(LAW_PAGES)):
+            with open(os.path.join(LAW_PAGES, name), "rb") as f:
+                self.pages.append(f.read())
+        self.requests = []  # (path, status)
+        self._lock = threading.Lock()
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self.endpoint = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def teilliste(self) -> bytes:
+        padding = "".join(f'<a href="#nav{i}">nav</a>' for i in range(15))
+        laws = "".join(
+            f'<a href="./law{i}/index.html"><abbr title="Law number {i}">LAW {i}/X</abbr></a>'
+            for i in range(self.laws)
+        )
+        footer = "".join(f'<a href="#foot{i}">foot</a>' for i in range(6))
+        return f"<html><body>{padding}{laws}{footer}</body></html>".encode("utf-8")
+
+    def route(self, path: str, headers) -> tuple:
+        """:return: (status, body, extra headers)"""
+        if path == "/Teilliste_A.html":
+            return 200, self.teilliste(), {}
+        parts = path.strip("/").split("/")
+        if len(parts) == 2 and parts[0].startswith("law") and parts[0][3:].isdigit():
+            law = parts[0]
+            if parts[1] == "index.html":
+                return 200, f'<html><body><abbr><a href="{law}.html">HTML</a></abbr></body></html>'.encode(), {}
+            if parts[1] == f"{law}.html":
+                body = self.pages[int(law[3:]) % len(self.pages)]
+                etag = '"' + hashlib.md5(body).hexdigest() + '"'
+                if headers.get("If-None-Match") == etag:
+                    return 304, b"", {"ETag": etag}
+                return 200, body, {"ETag": etag}
+        return 404, b"not found", {}
+
+    def _handler(self):
+        site = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                status, body, headers = site.route(self.path, self.headers)
+                with site._lock:
+                    site.requests.append((self.path, status))
+                self.send_response(status)
+                for key, value in headers.items():
+                    self.send_header(key, value)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def statuses(self, suffix: str = ".html") -> list:
+        """Statuses of the law page requests (index pages and the Teilliste excluded)."""
+        with self._lock:
+            return [status for path, status in self.requests
+                    if path.endswith(suffix) and not path.endswith("index.html") and "Teilliste" not in path]
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def law_site():
+    """Factory: law_site(laws) starts a LawSite for the duration of the test."""
+    sites = []
+
+    def start(laws: int = 4) -> LawSite:
+        site = LawSite(laws).__enter__()
+        sites.append(site)
+        return site
+
+    yield start
+    for site in sites:
+        site.__exit__(None, None, None)
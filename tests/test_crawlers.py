@@ -0,0 +1,91 @@
+import threading
+import time
+
+import pytest
+
+from crawler.async_crawler import AsyncCrawler, AsyncFetcher
+from crawler.crawler import Crawler
+from crawler.pipeline_crawler import PipelineCrawler
+
+
+class PageCounter:
+    """Counts law pages between download and store_sections (raw page or extracted result)."""
+
+    def __init__(self, monkeypatch, crawler_class):
+        self.held = self.peak = 0
+        self._lock = threading.Lock()
+        fetch, store_sections = AsyncFetcher.fetch, crawler_class.store_sections
+        counter = self
+
+        async def counting_fetch(fetcher, url, validators=None):
+            content, new_validators = await fetch(fetcher, url, validators)
+            if content is not None and not url.endswith(("index.html", "Teilliste_A.html")):
+                with counter._lock:
+                    counter.held += 1
+                    counter.peak = max(counter.peak, counter.held)
+            return content, new_validators
+
+        def slow_store_sections(crawler, *args, **kwargs):
+            time.sleep(0.005)  # A slow writer: the fetchers run ahead until backpressure stops them
+            with counter._lock:
+                counter.held -= 1
+            return store_sections(crawler, *args, **kwargs)
+
+        monkeypatch.setattr(AsyncFetcher, "fetch", counting_fetch)
+        monkeypatch.setattr(crawler_class, "store_sections", slow_store_sections)
+
+
+@pytest.mark.parametrize("crawler_class, options, bound", [
+    # concurrency + queue_size + workers raw pages, queue_size + 1 results
+    (PipelineCrawler, {"queue_size": 4, "workers": 2}, 8 + 4 + 2 + 4 + 1),
+    (AsyncCrawler, {}, 8),
+])
+def test_pages_held_are_bounded(law_site, tmp_path, monkeypatch, crawler_class, options, bound):
+    site = law_site(120)
+    counter = PageCounter(monkeypatch, crawler_class)
+    crawler_class(["A"], site.endpoint, data_folder=str(tmp_path), concurrency=8, rate_limit=0, **options).run()
+
+    assert len(list(tmp_path.glob("LAW*.json"))) == 120
+    assert counter.held == 0
+    assert counter.peak <= bound
+
+
+def test_sync_crawler_is_rate_limited(law_site, tmp_path):
+    site = law_site(12)
+    start = time.monotonic()
+    Crawler(["A"], site.endpoint, data_folder=str(tmp_path), resolve_workers=8, rate_limit=50).run()
+    elapsed = time.monotonic() - start
+
+    # Teilliste + 12 index pages (8 resolver threads) + 12 law pages share one bucket of 50 requests/s
+    assert len(site.requests) == 25
+    assert elapsed >= 24 / 50
+    assert len(list(tmp_path.glob("LAW*.json"))) == 12
+
+
+def law_files(folder) -> dict:
+    return {path.name: path.read_bytes() for path in sorted(folder.glob("LAW*.json"))}
+
+
+def test_crawl_modes_write_identical_laws(law_site, tmp_path):
+    site = law_site(6)
+    crawlers = {
+        "sync": lambda folder: Crawler(["A"], site.endpoint, data_folder=folder, rate_limit=0),
+        "async": lambda folder: AsyncCrawler(["A"], site.endpoint, data_folder=folder, rate_limit=0),
+        "pipeline": lambda folder: PipelineCrawler(["A"], site.endpoint, data_folder=folder, rate_limit=0, workers=2),
+    }
+    outputs = {}
+    for mode, crawler in crawlers.items():
+        folder = tmp_path / mode
+        crawler(str(folder)).run()
+        outputs[mode] = law_files(folder)
+
+        # Rerun: every law page answers 304 Not Modified and no file is rewritten
+        mtimes = {path.name: path.stat().st_mtime_ns for path in folder.glob("LAW*.json")}
+        seen = len(site.statuses())
+        crawler(str(folder)).run()
+        assert site.statuses()[seen:] == [304] * 6
+        assert {path.name: path.stat().st_mtime_ns for path in folder.glob("LAW*.json")} == mtimes
+
+    assert len(outputs["sync"]) == 6
+    assert outputs["async"] == outputs["sync"]
+    assert outputs["pipeline"] == outputs["sync"]
@@ -0,0 +1,139 @@
+import json
+import os
+import sys
+
+import pytest
+
+import main
+import rag.gemini_api
+from config.settings import Settings
+from conftest import ROOT
+from rag.chunk_state import ChunkState
+from rag.uploader import generate_ascii_id
+from rag.vector_store import LocalVectorStore
+
+
+class FakeEmbeddingAPI:
+    MODEL = "fake-embedding"
+
+    def __init__(self, api_key=None):
+        pass
+
+    def embed_batch(self, texts: list) -> list:
+        return [[float(len(text) % 7 + 1)] + [1.0] * 767 for text in texts]
+
+
+def write_law(data_folder, name: str, sections: list):
+    with open(os.path.join(data_folder, name), "w", encoding="utf-8") as f:
+        json.dump({"main_topic": name, "sections": [
+            {"section": f"§ {number}", "content": content, "link": f"https://example.org/{name}#p{number}"}
+            for number, content in sections
+        ]}, f)
+
+
+@pytest.fixture
+def embedding_run(tmp_path, monkeypatch):
+    """main.py --embedding against a local vector store under tmp_path, with a fake embedding API."""
+    data_folder = tmp_path / "de"
+    data_folder.mkdir()
+    for name, value in {
+        "DATA_FOLDER": str(data_folder),
+        "EMBEDDING_STATE_FILE": str(data_folder / "embedding_state.json"),
+        "CHUNK_STATE_FILE": str(data_folder / "chunk_state.sqlite"),
+        "EMBEDDING_CACHE_FILE": str(tmp_path / "embedding_cache.sqlite"),
+        "LOCAL_VECTOR_STORE_DIR": str(tmp_path / "vector_store"),
+        "LEXICAL_INDEX_DIR": str(tmp_path / "lexical_index"),
+        "VECTOR_STORE": "local",
+    }.items():
+        monkeypatch.setattr(Settings, name, value)
+    monkeypatch.setattr(rag.gemini_api, "GeminiEmbeddingAPI", FakeEmbeddingAPI)
+    # The uploader keeps its (unused) progress file next to the repository
+    progress_file = os.path.join(ROOT, "progress.json")
+    created = not os.path.exists(progress_file)
+
+    def run():
+        monkeypatch.setattr(sys, "argv", ["main.py", "--embedding"])
+        main.main()
+
+    yield data_folder, run
+    if created and os.path.exists(progress_file):
+        os.remove(progress_file)
+
+
+def test_rebuild_upserts_before_deleting(embedding_run, monkeypatch):
+    data_folder, run = embedding_run
+    write_law(data_folder, "BGB.json", [(1, "Erster Paragraph"), (2, "Zweiter Paragraph")])
+    write_law(data_folder, "GG.json", [(1, "Würde des Menschen")])
+
+    # Vectors from the positional-ID scheme, without a chunk record in the embedding state
+    store = LocalVectorStore(Settings.LOCAL_VECTOR_STORE_DIR)
+    store.upsert([{"id": generate_ascii_id("BGB", i), "values": [1.0] * 768, "metadata": {"filename": "BGB.json"}}
+                  for i in range(3)])
+    store.close()
+
+    operations = []
+    upsert, delete = LocalVectorStore.upsert, LocalVectorStore.delete
+
+    def recording_upsert(self, vectors):
+        operations.append(("upsert", {vector["id"] for vector in vectors}))
+        return upsert(self, vectors)
+
+    def recording_delete(self, ids=None, filter=None):
+        operations.append(("delete", set(ids or [])))
+        return delete(self, ids=ids, filter=filter)
+
+    monkeypatch.setattr(LocalVectorStore, "upsert", recording_upsert)
+    monkeypatch.setattr(LocalVectorStore, "delete", recording_delete)
+    run()
+
+    legacy = {generate_ascii_id("BGB", i) for i in range(3)}
+    deletes = [i for i, (kind, ids) in enumerate(operations) if kind == "delete"]
+    assert [operations[i][1] for i in deletes] == [legacy]
+    # Every new BGB vector was upserted before the legacy ones were deleted
+    upserted = set().union(*(ids for kind, ids in operations[:deletes[0]] if kind == "upsert"))
+    store = LocalVectorStore(Settings.LOCAL_VECTOR_STORE_DIR)
+    bgb = set(store.list_ids({"filename": {"$eq": "BGB.json"}}))
+    assert len(bgb) == 2 and bgb <= upserted
+    assert not bgb & legacy
+    assert len(store.list_ids({"filename": {"$eq": "GG.json"}})) == 1
+    store.close()
+
+
+def test_changed_sections_are_diffed(embedding_run):
+    data_folder, run = embedding_run
+    write_law(data_folder, "BGB.json", [(1, "Erster Paragraph"), (2, "Zweiter Paragraph"), (3, "Dritter")])
+    run()
+    write_law(data_folder, "BGB.json", [(1, "Erster Paragraph"), (2, "Geänderter Paragraph")])
+    run()
+
+    store = LocalVectorStore(Settings.LOCAL_VECTOR_STORE_DIR)
+    vectors = store.fetch(store.list_ids({"filename": {"$eq": "BGB.json"}}))
+    assert sorted(vector["metadata"]["content"] for vector in vectors.values()) == [
+        "Erster Paragraph", "Geänderter Paragraph"]
+    store.close()
+
+
+def test_chunk_records_are_kept_out_of_the_json_state(embedding_run, monkeypatch):
+    data_folder, run = embedding_run
+    write_law(data_folder, "BGB.json", [(1, "Erster Paragraph"), (2, "Zweiter Paragraph")])
+    run()
+    with open(Settings.EMBEDDING_STATE_FILE) as f:
+        state = json.load(f)
+    assert set(state["BGB.json"]) == {"hash", "last_updated"}
+    with ChunkState(Settings.CHUNK_STATE_FILE) as chunk_state:
+        records = chunk_state.get("BGB.json")
+    assert len(records) == 2
+
+    # Record written by an earlier version into the JSON state: diffed against, then moved
+    os.remove(Settings.CHUNK_STATE_FILE)
+    state["BGB.json"] = {"hash": "old", "chunks": records}
+    with open(Settings.EMBEDDING_STATE_FILE, "w") as f:
+        json.dump(state, f)
+    upserts = []
+    monkeypatch.setattr(LocalVectorStore, "upsert", lambda self, vectors: upserts.append(vectors))
+    run()
+    assert upserts == []
+    with open(Settings.EMBEDDING_STATE_FILE) as f:
+        assert "chunks" not in json.load(f)["BGB.json"]
+    with ChunkState(Settings.CHUNK_STATE_FILE) as chunk_state:
+        assert chunk_state.get("BGB.json") == records
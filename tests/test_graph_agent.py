@@ -0,0 +1,115 @@
+import asyncio
+import threading
+
+import pytest
+from langchain_core.messages import HumanMessage
+
+from agent import graph_agent
+from utils.lazy import Lazy
+
+TOKENS = ["Hallo", ", ich bin", " LawGPT."]
+SYSTEM_ERROR = "System Error: Rate limit or API issue."
+
+
+class FakeClassifier:
+    def classify(self, text: str) -> tuple:
+        return "general_chat", 0.99
+
+
+class FakeLLM:
+    """Streams TOKENS; with fail_after, raises once that many tokens have been sent."""
+
+    def __init__(self, fail_after: int = None):
+        self.fail_after = fail_after
+
+    def _tokens(self):
+        for i, token in enumerate(TOKENS):
+            if i == self.fail_after:
+                raise RuntimeError("429 Resource exhausted")
+            yield token
+
+    def stream_response(self, prompt: str):
+        yield from self._tokens()
+
+    async def astream_response(self, prompt: str):
+        for token in self._tokens():
+            await asyncio.sleep(0)
+            yield token
+
+
+@pytest.fixture
+def chat(monkeypatch):
+    """Routes every question to the generator (general chat) and answers with a FakeLLM."""
+    monkeypatch.setattr(graph_agent, "_statute_intent", lambda content: None)
+    monkeypatch.setattr(graph_agent, "default_classifier", FakeClassifier)
+    monkeypatch.setattr(graph_agent, "_generation_prompt", lambda state: "prompt")
+
+    def use(fake_llm: FakeLLM):
+        monkeypatch.setattr(graph_agent, "llm", Lazy(lambda: fake_llm))
+    return use
+
+
+def astream_events(question: str) -> list:
+    """Token and final events as agent.service sends them for a streamed /chat request."""
+    async def collect():
+        events, final_state = [], None
+        initial_state = graph_agent._initial_state(question)
+        async for mode, chunk in graph_agent.app.astream(initial_state, stream_mode=["custom", "values"]):
+            if mode == "custom" and "token" in chunk:
+                events.append(("token", chunk["token"]))
+            elif mode == "values":
+                final_state = chunk
+        return events + [("final", final_state)]
+    return asyncio.run(collect())
+
+
+streams = pytest.mark.parametrize("stream", [lambda question: list(graph_agent.stream_agent(question)),
+                                             astream_events], ids=["stream_agent", "app.astream"])
+
+
+@streams
+def test_answer_is_streamed_token_by_token(chat, stream):
+    chat(FakeLLM())
+    events = stream("Hallo, wer bist du?")
+
+    assert events[:-1] == [("token", token) for token in TOKENS]
+    kind, final_state = events[-1]
+    assert kind == "final"
+    assert final_state["intent"] == "general_chat"
+    assert final_state["messages"][-1].content == "".join(TOKENS)
+
+
+@streams
+def test_mid_stream_failure_ends_with_system_error(chat, stream):
+    chat(FakeLLM(fail_after=2))
+    events = stream("Hallo, wer bist du?")
+
+    # The tokens already shown stay; the final message replaces the partial answer
+    assert events[:-1] == [("token", token) for token in TOKENS[:2]]
+    assert events[-1][1]["messages"][-1].content == SYSTEM_ERROR
+
+
+def test_async_router_keeps_blocking_steps_off_the_event_loop(monkeypatch):
+    threads = {}
+
+    def statute_intent(content):
+        threads["statute_lookup"] = threading.current_thread()
+        return None
+
+    def default_classifier():
+        # Stands in for the first call, which trains the classifier
+        threads["classifier"] = threading.current_thread()
+        return FakeClassifier()
+
+    monkeypatch.setattr(graph_agent, "_statute_intent", statute_intent)
+    monkeypatch.setattr(graph_agent, "default_classifier", default_classifier)
+
+    async def route():
+        loop_thread = threading.current_thread()
+        result = await graph_agent.arouter_node({"messages": [HumanMessage(content="Hallo, wie geht es dir?")]})
+        return loop_thread, result
+
+    loop_thread, result = asyncio.run(route())
+    assert result == {"intent": "general_chat"}
+    assert threads["statute_lookup"] is not loop_thread
+    assert threads["classifier"] is not loop_thread
@@ -0,0 +1,56 @@
+import json
+import os
+
+import pytest
+
+from rag.lexical_index import LexicalIndex, fuse_scores
+
+
+def chunk(vector_id: str, link: str, score: float, content: str = "") -> dict:
+    return {"id": vector_id, "score": score, "metadata": {"link": link, "content": content}}
+
+
+def test_fusion_counts_each_section_once():
+    vector_results = [
+        chunk("a_0", "bgb#535", 0.6, "first chunk"),
+        chunk("a_1", "bgb#535", 0.8, "best chunk"),
+        chunk("a_2", "bgb#535", 0.5),
+        chunk("b_0", "bgb#536", 0.8),
+    ]
+    lexical_results = [chunk("bgb#536", "bgb#536", 4.0), chunk("bgb#535", "bgb#535", 2.0)]
+
+    fused = fuse_scores(vector_results, lexical_results, top_k=10, alpha=0.5)
+
+    # Three chunks of § 535 must not outweigh § 536, which leads on both lists
+    assert [doc["metadata"]["link"] for doc in fused] == ["bgb#536", "bgb#535"]
+    assert fused[0]["score"] == pytest.approx(1.0)
+    assert fused[1]["score"] == pytest.approx(0.5 * 1.0 + 0.5 * 0.5)
+    assert fused[1]["metadata"]["content"] == "best chunk"
+
+
+def write_law(data_folder, content: str):
+    with open(data_folder / "BGB.json", "w", encoding="utf-8") as f:
+        json.dump({"main_topic": "Bürgerliches Gesetzbuch", "sections": [
+            {"section": "§ 535 Inhalt des Mietvertrags", "content": content, "link": "https://example.org/bgb/__535.html"},
+        ]}, f)
+
+
+def test_rebuild_does_not_disturb_open_readers(tmp_path):
+    data_folder, index_dir = tmp_path / "de", str(tmp_path / "lexical_index")
+    data_folder.mkdir()
+    write_law(data_folder, "Der Vermieter überlässt die Mietsache.")
+    LexicalIndex.build(str(data_folder), index_dir)
+    reader = LexicalIndex.open(index_dir)
+
+    write_law(data_folder, "Die Mietsache wird in gebrauchsfähigem Zustand übergeben, samt Schlüssel und Keller.")
+    LexicalIndex.build(str(data_folder), index_dir)
+
+    # The open reader keeps a consistent view of its version: tables and postings match
+    assert "überlässt" in reader.search("Mietsache")[0]["metadata"]["content"]
+    assert reader.search("Schlüssel") == []
+    assert "übergeben" in LexicalIndex.open(index_dir).search("Schlüssel")[0]["metadata"]["content"]
+
+    # Only the live and the previous version are kept
+    LexicalIndex.build(str(data_folder), index_dir)
+    assert len([name for name in os.listdir(index_dir) if name.startswith("version-")]) == 2
+    reader.close()
@@ -0,0 +1,69 @@
+import json
+
+import pytest
+
+import rag.retriever
+from config.settings import Settings
+from rag.lexical_index import LexicalIndex
+from rag.retriever import Retriever
+from rag.vector_store import LocalVectorStore
+
+
+class FakeEmbeddingAPI:
+    def __init__(self, api_key=None):
+        pass
+
+    def embed_batch(self, texts: list) -> list:
+        return [[1.0] + [0.0] * 767 for _ in texts]
+
+
+def write_law(data_folder, content: str):
+    with open(data_folder / "BGB.json", "w", encoding="utf-8") as f:
+        json.dump({"main_topic": "Bürgerliches Gesetzbuch", "sections": [
+            {"section": "§ 535 Inhalt des Mietvertrags", "content": content, "link": "https://example.org/bgb/__535.html"},
+        ]}, f)
+
+
+@pytest.fixture
+def data_folder(tmp_path, monkeypatch):
+    """Points the retriever settings at a local store and indexes under tmp_path."""
+    data_folder = tmp_path / "de"
+    data_folder.mkdir()
+    monkeypatch.setattr(Settings, "DATA_FOLDER", str(data_folder))
+    monkeypatch.setattr(Settings, "EMBEDDING_STATE_FILE", str(data_folder / "embedding_state.json"))
+    monkeypatch.setattr(Settings, "LEXICAL_INDEX_DIR", str(tmp_path / "lexical_index"))
+    monkeypatch.setattr(Settings, "LOCAL_VECTOR_STORE_DIR", str(tmp_path / "vector_store"))
+    monkeypatch.setattr(Settings, "VECTOR_STORE", "local")
+    monkeypatch.setattr(rag.retriever, "GeminiEmbeddingAPI", FakeEmbeddingAPI)
+    return data_folder
+
+
+def test_reopens_indexes_after_an_embedding_run(data_folder):
+    settings = Settings()
+    write_law(data_folder, "Der Vermieter überlässt die Mietsache.")
+    LexicalIndex.build(settings.DATA_FOLDER, settings.LEXICAL_INDEX_DIR)
+
+    retriever = Retriever()
+    assert "überlässt" in retriever.query("Mietsache", mode="lexical")[0]["metadata"]["content"]
+    assert "überlässt" in retriever.statute_lookup("BGB § 535")[0]["metadata"]["content"]
+    store = retriever.vector_store
+
+    # --embedding in another process: new law text, rebuilt BM25 index, new embedding state
+    write_law(data_folder, "Die Mietsache wird in gebrauchsfähigem Zustand übergeben.")
+    LexicalIndex.build(settings.DATA_FOLDER, settings.LEXICAL_INDEX_DIR)
+    with open(settings.EMBEDDING_STATE_FILE, "w") as f:
+        json.dump({"BGB.json": {"hash": "new"}}, f)
+
+    assert "übergeben" in retriever.query("Mietsache", mode="lexical")[0]["metadata"]["content"]
+    assert "übergeben" in retriever.statute_lookup("BGB § 535")[0]["metadata"]["content"]
+    assert retriever.vector_store is not store
+
+
+def test_injected_indexes_are_kept(data_folder):
+    settings = Settings()
+    store = LocalVectorStore(settings.LOCAL_VECTOR_STORE_DIR, dimension=768)
+    retriever = Retriever(vector_store=store)
+    with open(settings.EMBEDDING_STATE_FILE, "w") as f:
+        json.dump({}, f)
+    assert retriever.query("Mietsache", mode="vector") == []
+    assert retriever.vector_store is store
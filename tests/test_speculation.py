@@ -0,0 +1,77 @@
+import asyncio
+import time
+
+from agent.speculation import SpeculativeRetrieval
+
+
+class FakeRetriever:
+    def query_many(self, queries: list, top_k: int = 3) -> list:
+        return [[{"id": query}] for query in queries]
+
+    async def aquery_many(self, queries: list, top_k: int = 3) -> list:
+        return self.query_many(queries, top_k)
+
+
+def expand(question: str) -> list:
+    if question == "fail":
+        raise RuntimeError("expansion failed")
+    return [question, f"{question} BGB"]
+
+
+async def aexpand(question: str) -> list:
+    return expand(question)
+
+
+def speculation(**kwargs) -> SpeculativeRetrieval:
+    return SpeculativeRetrieval(FakeRetriever(), expand, aexpand, **kwargs)
+
+
+def counters(spec: SpeculativeRetrieval) -> tuple:
+    m = spec.metrics()
+    return m["started"], m["used"], m["wasted"], m["failed"]
+
+
+def test_used_wasted_and_failed_are_counted():
+    spec = speculation()
+    spec.start("Testament")
+    queries = spec.take("Testament")
+    assert queries == ["Testament", "Testament BGB"]
+    assert spec.take_results(queries) == [[{"id": "Testament"}], [{"id": "Testament BGB"}]]
+    assert spec.take_results(queries) is None
+
+    spec.start("Hallo")
+    spec.discard("Hallo")
+    spec.start("fail")
+    assert spec.take("fail") is None
+    assert spec.take("never started") is None
+
+    assert counters(spec) == (3, 1, 1, 1)
+    assert spec.metrics()["waste_rate"] == 1 / 3
+
+
+def test_async_graph_counts_the_same():
+    async def run(spec):
+        spec.astart("Testament")
+        queries = await spec.atake("Testament")
+        assert spec.take_results(queries) is not None
+        spec.astart("Hallo")
+        spec.discard("Hallo")
+
+    spec = speculation()
+    asyncio.run(run(spec))
+    assert counters(spec) == (2, 1, 1, 0)
+
+
+def test_abandoned_runs_are_swept():
+    spec = speculation(max_age=0.05)
+    # A run that failed after the router: never taken
+    spec.start("Testament")
+    # A run that failed after tool_decision_node: results never taken by the tool
+    spec.start("Erbe")
+    queries = spec.take("Erbe")
+    time.sleep(0.1)
+
+    spec.start("Miete")
+    assert not spec.pending("Testament") and spec.pending("Miete")
+    assert spec.take_results(queries) is None
+    assert counters(spec) == (3, 1, 1, 0)
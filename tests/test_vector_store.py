@@ -0,0 +1,46 @@
+import subprocess
+import sys
+
+import numpy as np
+
+from conftest import ROOT
+from rag.vector_store import LocalVectorStore
+
+REEMBED = """
+import sys
+sys.path.append({root!r})
+from rag.vector_store import LocalVectorStore
+store = LocalVectorStore({path!r}, dimension=8)
+store.delete(ids=["old"])
+store.upsert([{{"id": "new", "values": [0, 1, 0, 0, 0, 0, 0, 0], "metadata": {{"content": "NEW SECTION"}}}}])
+store.close()
+"""
+
+
+def test_reader_reloads_after_another_process_reuses_slots(tmp_path):
+    axes = np.eye(8)
+    writer = LocalVectorStore(str(tmp_path), dimension=8)
+    writer.upsert([{"id": "old", "values": axes[0].tolist(), "metadata": {"content": "OLD SECTION"}}])
+    writer.close()
+
+    reader = LocalVectorStore(str(tmp_path), dimension=8)
+    assert reader.query(axes[0].tolist(), top_k=1)[0]["id"] == "old"
+
+    # An --embedding run in another process frees the slot of "old" and reuses it for "new"
+    subprocess.run([sys.executable, "-c", REEMBED.format(root=ROOT, path=str(tmp_path))], check=True)
+
+    match = reader.query(axes[1].tolist(), top_k=1)[0]
+    assert (match["id"], match["metadata"]) == ("new", {"content": "NEW SECTION"})
+    assert reader.describe()["count"] == 1
+    assert list(reader.fetch(["old", "new"])) == ["new"]
+    reader.close()
+
+
+def test_own_writes_do_not_reload(tmp_path):
+    store = LocalVectorStore(str(tmp_path), dimension=8)
+    store.upsert([{"id": "a", "values": np.eye(8)[0].tolist()}])
+    generation = store.generation
+    ids = store.ids
+    store.query(np.eye(8)[0].tolist(), top_k=1)
+    assert store.generation == generation and store.ids is ids
+    store.close()
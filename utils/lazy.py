@@ -0,0 +1,28 @@
+import threading
+
+
+class Lazy:
+    """
+    Builds an object on the first get() and returns the same instance afterwards.
+    Used for module-level clients (LLM, retriever, ...) so importing a module does not
+    open network connections; the first caller pays the construction, later callers
+    (in any thread) share the instance.
+    Deliberately no attribute forwarding: RunnableLambda resolves attributes of the
+    globals a node uses when the graph is compiled, which would build every client.
+    """
+
+    def __init__(self, factory):
+        self._factory = factory
+        self._value = None
+        self._lock = threading.Lock()
+
+    def get(self):
+        if self._value is None:
+            with self._lock:
+                if self._value is None:
+                    self._value = self._factory()
+        return self._value
+
+    @property
+    def loaded(self) -> bool:
+        return self._value is not None
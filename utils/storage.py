@@ -11,6 +11,7 @@ def save_sessions(sessions: Dict):
     Save sessions to disk.
     Handles image serialization by saving them as files and storing the path.
     """
+    os.makedirs(IMAGE_DIR, exist_ok=True)  # Also creates the HISTORY_FILE folder
     serializable_sessions = {}
     
     for session_id, session_data in sessions.items():